@@ -1,3 +1,5 @@
 from .api import HarvesterAPI
+from .aio import AsyncHarvesterAPI
 
 API = HarvesterAPI
+AsyncAPI = AsyncHarvesterAPI
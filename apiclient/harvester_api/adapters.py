@@ -0,0 +1,122 @@
+import socket
+from threading import Lock
+from time import monotonic
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import TimeoutError
+
+#: Max connections to keep per host
+POOL_MAXSIZE = 32
+#: Seconds of idle before sending TCP keep-alive probes
+KEEPALIVE_IDLE = 60
+
+
+def keepalive_options(idle=KEEPALIVE_IDLE, interval=10, count=6):
+    ''' Socket options to enable TCP keep-alive, so idle pooled connections are kept warm
+    through load balancers and NAT.
+    '''
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in (("TCP_KEEPIDLE", idle), ("TCP_KEEPINTVL", interval),
+                        ("TCP_KEEPCNT", count)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class PoolStats:
+    ''' Counters of connections in pools of the adapter '''
+    def __init__(self):
+        self._lock = Lock()
+        self.created = 0
+        self.requests = 0
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__} created={self.created} reused={self.reused}"
+                f" requests={self.requests}>")
+
+    @property
+    def reused(self):
+        return max(0, self.requests - self.created)
+
+    def count(self, created=0, requests=0):
+        with self._lock:
+            self.created += created
+            self.requests += requests
+
+    def as_dict(self):
+        return dict(created=self.created, reused=self.reused, requests=self.requests)
+
+
+def _instrumented(pool_cls, stats, limiter=None):
+    class InstrumentedPool(pool_cls):
+        def _new_conn(self):
+            stats.count(created=1)
+            return super()._new_conn()
+
+        def _make_request(self, conn, method, url, body=None, *args, **kwargs):
+            stats.count(requests=1)
+            if limiter is None:
+                return super()._make_request(conn, method, url, body, *args, **kwargs)
+
+            # each attempt (retries included) is limited
+            with limiter.acquire():
+                started = monotonic()
+                try:
+                    resp = super()._make_request(conn, method, url, body, *args, **kwargs)
+                except TimeoutError:
+                    limiter.backoff()
+                    raise
+                # latency of uploads depends on the size of the body
+                streamed = body is not None and not isinstance(body, (bytes, str))
+                limiter.feedback(resp.status, None if streamed else monotonic() - started)
+            return resp
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_cls.__name__}"
+    return InstrumentedPool
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    ''' `HTTPAdapter` with a larger pool, TCP keep-alive and counters of connections
+
+    :ivar PoolStats stats: connections created and reused by the adapter
+    :ivar RateLimiter limiter: limiter of requests, None for unlimited
+    '''
+    __attrs__ = HTTPAdapter.__attrs__ + ["keepalive"]
+
+    def __init__(self, pool_connections=10, pool_maxsize=POOL_MAXSIZE, pool_block=False,
+                 keepalive=KEEPALIVE_IDLE, limiter=None, **kwargs):
+        '''
+        :param int pool_connections: number of hosts to cache pools
+        :param int pool_maxsize: max connections to keep per host
+        :param bool pool_block: block when no free connections instead of creating
+                                a connection which will be discarded after use
+        :param int keepalive: idle seconds before TCP keep-alive probes, None to disable
+        :param RateLimiter limiter: limiter of requests (see `limiters.limiter_for`)
+        :param kwargs: other arguments of `HTTPAdapter`, e.g. `max_retries`
+        '''
+        self.keepalive = keepalive
+        self.limiter = limiter
+        self.stats = PoolStats()
+        super().__init__(pool_connections, pool_maxsize, pool_block=pool_block, **kwargs)
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__} maxsize={self._pool_maxsize}"
+                f" block={self._pool_block} {self.stats!r}>")
+
+    def __setstate__(self, state):
+        # limiter is bound to the process, not picklable
+        self.limiter = None
+        self.stats = PoolStats()
+        super().__setstate__(state)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        if self.keepalive:
+            pool_kwargs.setdefault('socket_options', HTTPConnection.default_socket_options
+                                   + keepalive_options(self.keepalive))
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(
+            http=_instrumented(HTTPConnectionPool, self.stats, self.limiter),
+            https=_instrumented(HTTPSConnectionPool, self.stats, self.limiter)
+        )
@@ -0,0 +1,173 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .api import HarvesterAPI
+from .managers.base import BaseManager
+
+DEFAULT_MAX_WORKERS = 64
+
+#: sentinel of exhausted iterators
+_exhausted = object()
+
+
+class AsyncIterator:
+    ''' Async iterator over a blocking iterator, which is created and advanced in the executor,
+    e.g. `async for etype, obj in api.vms.watch(name, timeout=60)`
+    '''
+    def __init__(self, func, executor):
+        self._func = func
+        self._executor = executor
+        self._iterable = self._iterator = None
+
+    def __repr__(self):
+        source = self._func if self._iterable is None else self._iterable
+        return f"<{self.__class__.__name__} {source!r}>"
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_running_loop()
+        if self._iterator is None:
+            self._iterable = await loop.run_in_executor(self._executor, self._func)
+            self._iterator = iter(self._iterable)
+        # StopIteration can't be raised into a Future
+        item = await loop.run_in_executor(self._executor, next, self._iterator, _exhausted)
+        if item is _exhausted:
+            raise StopAsyncIteration
+        return item
+
+    async def aclose(self):
+        ''' Close the underlying iterator, e.g. to stop a watch '''
+        close = getattr(self._iterable, "close", None)
+        if close is not None:
+            close()
+
+
+class AsyncManager:
+    ''' Awaitable view of a manager, every API call is dispatched to the executor.
+
+    Payload builders (e.g. `create_data`) and nested classes (e.g. `Spec`) are returned as-is,
+    so the same version-aware manager logic is shared with the blocking client. Iterating
+    methods (e.g. `watch`) return `AsyncIterator` to be consumed by `async for`.
+    '''
+    #: methods which don't touch the network
+    SYNC_METHODS = frozenset({"create_data", "is_support", "for_version"})
+    #: methods returning blocking iterators, which are wrapped as `AsyncIterator`
+    ITER_METHODS = frozenset({"watch", "iter_list", "iter_views"})
+
+    def __init__(self, manager, executor):
+        self._manager = manager
+        self._executor = executor
+
+    def __repr__(self):
+        return f"<Async{self._manager!r}>"
+
+    def __getattr__(self, name):
+        attr = getattr(self._manager, name)
+        if name in self.SYNC_METHODS or isinstance(attr, type) or not callable(attr):
+            return attr
+        if name in self.ITER_METHODS:
+            def iterate(*args, **kwargs):
+                return AsyncIterator(partial(attr, *args, **kwargs), self._executor)
+
+            iterate.__name__ = name
+            return iterate
+
+        async def wrapped(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(attr, *args, **kwargs))
+
+        wrapped.__name__ = name
+        return wrapped
+
+
+class AsyncHarvesterAPI:
+    ''' asyncio twin of `HarvesterAPI`
+
+    Managers are resolved by the wrapped `HarvesterAPI` (so `BaseManager.for_version` applies),
+    and their methods become coroutines, e.g. `await api.vms.start("vm-name")`.
+    '''
+    @classmethod
+    async def login(cls, endpoint, user, passwd, session=None, ssl_verify=True,
+                    max_workers=DEFAULT_MAX_WORKERS):
+        api = cls(endpoint, session=session, max_workers=max_workers)
+        api.session.verify = ssl_verify
+        await api.authenticate(user, passwd)
+        api.load_managers(await api.run(lambda: api.api.cluster_version))
+        return api
+
+    def __init__(self, endpoint, token=None, session=None, *, max_workers=DEFAULT_MAX_WORKERS,
+                 api=None):
+        self.api = api or HarvesterAPI(endpoint, token, session, pool_maxsize=max_workers)
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="harvester-api")
+        self._managers = dict()
+
+    def __repr__(self):
+        return f"Async{self.api!r}"
+
+    def __getattr__(self, name):
+        attr = getattr(self.api, name)
+        if isinstance(attr, BaseManager):
+            mgr = self._managers.get(name)
+            if mgr is None or mgr._manager is not attr:
+                mgr = self._managers[name] = AsyncManager(attr, self._executor)
+            return mgr
+        return attr
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+    @property
+    def session(self):
+        return self.api.session
+
+    @property
+    def endpoint(self):
+        return self.api.endpoint
+
+    async def run(self, func, *args, **kwargs):
+        ''' Run blocking `func` in the executor of the client '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def cluster_version(self):
+        return await self.run(lambda: self.api.cluster_version)
+
+    def load_managers(self, version="0.0.0"):
+        self.api.load_managers(version)
+        self._managers.clear()
+
+    async def authenticate(self, user, passwd, **kwargs):
+        return await self.run(self.api.authenticate, user, passwd, **kwargs)
+
+    async def get(self, path, **kwargs):
+        return await self.run(self.api._get, path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.run(self.api._post, path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.run(self.api._put, path, **kwargs)
+
+    async def patch(self, path, **kwargs):
+        return await self.run(self.api._patch, path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.run(self.api._delete, path, **kwargs)
+
+    async def gather(self, *aws, return_exceptions=False):
+        ''' handy wrapper of `asyncio.gather` for fan-out calls '''
+        return await asyncio.gather(*aws, return_exceptions=return_exceptions)
+
+    async def bulk(self, operations, **kwargs):
+        ''' `HarvesterAPI.bulk` without blocking the event loop '''
+        return await self.run(self.api.bulk, operations, **kwargs)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
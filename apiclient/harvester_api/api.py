@@ -2,11 +2,15 @@ from urllib.parse import urljoin
 
 import re
 import requests
-from pkg_resources import parse_version
-from requests.packages.urllib3.util.retry import Retry
 
 from . import managers as mgrs
-from .managers.base import DEFAULT_NAMESPACE
+from .adapters import POOL_MAXSIZE, KEEPALIVE_IDLE, PooledHTTPAdapter
+from .bulk import MAX_WORKERS, Bulk
+from .codecs import json_kwargs
+from .metrics import RequestMetrics, send
+from .retries import RETRY_STATUSES, RetryStats, SafeRetry
+from .versions import InvalidVersion, parse_version
+from .managers.base import DEFAULT_NAMESPACE, BaseManager
 
 
 def _normalize_version(version):
@@ -20,6 +24,24 @@ def _normalize_version(version):
     return ver
 
 
+class _Manager:
+    ''' Manager of the API, created for the version of `load_managers` on first access '''
+    def __init__(self, manager_cls):
+        self.manager_cls = manager_cls
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, api, owner=None):
+        if api is None:
+            return self
+        version = api._managers_version
+        manager = self.manager_cls.for_version(version)(api, version)
+        # cached as the instance attribute, which shadows the (non-data) descriptor
+        api.__dict__[self.name] = manager
+        return manager
+
+
 class HarvesterAPI:
     API_VERSION = "harvesterhci.io/v1beta1"
 
@@ -30,17 +52,34 @@ class HarvesterAPI:
     user = "v1/harvesterhci.io.users"
 
     @classmethod
-    def login(cls, endpoint, user, passwd, session=None, ssl_verify=True):
-        api = cls(endpoint, session=session)
+    def login(cls, endpoint, user, passwd, session=None, ssl_verify=True, **pool_options):
+        api = cls(endpoint, session=session, **pool_options)
         api.session.verify = ssl_verify
         api.authenticate(user, passwd)
         api.load_managers(api.cluster_version)
         return api
 
-    def __init__(self, endpoint, token=None, session=None):
+    def __init__(self, endpoint, token=None, session=None, *, pool_maxsize=POOL_MAXSIZE,
+                 pool_block=False, keepalive=KEEPALIVE_IDLE, limiter=None, transport=None):
+        '''
+        :param int pool_maxsize: max connections to keep per host
+        :param bool pool_block: block when all connections of the pool are in use
+        :param int keepalive: idle seconds before TCP keep-alive probes, None to disable
+        :param RateLimiter limiter: limiter shared by APIs of the endpoint,
+                                    e.g. `limiters.limiter_for(endpoint)`
+        :param Cassette transport: wraps the adapter of the session to record or replay requests,
+                                   e.g. `cassettes.Cassette(path, "replay")`
+        '''
         self.session = session or requests.Session()
         self.session.headers.update(Authorization=token or "")
-        if session is None:
+        self.pool_options = dict(pool_maxsize=pool_maxsize, pool_block=pool_block,
+                                 keepalive=keepalive, limiter=limiter)
+        self._retry_stats = RetryStats()
+        #: callables to be called with `metrics.RequestRecord` of each request
+        self.metrics = RequestMetrics()
+        self.hooks = [self.metrics]
+        self.transport = transport
+        if session is None or transport is not None:
             self.set_retries()
 
         self._version = None
@@ -53,17 +92,17 @@ class HarvesterAPI:
         if not self._version:
             resp = self._get("apis/{API_VERSION}/settings/server-version")
             ver = resp.json()['value']
+            normalized = _normalize_version(ver)
             try:
-                version = parse_version(_normalize_version(ver))
-                assert version.major
-                self._version = version
-            except AttributeError:
+                self._version = parse_version(normalized)
+            except InvalidVersion:
                 # Use KubeVirt version as the customized version
                 # Set the invalid version for local version
                 # Final format: <KubeVirt_Ver>+<normalized_Ver>
                 data = self._get('apis/kubevirt.io/v1/kubevirts').json()
                 kube_ver = data['items'][0]['status'].get('operatorVersion')
-                self._version = parse_version(f"{kube_ver}+{version}")
+                local = re.sub(r"[^a-zA-Z0-9]+", ".", normalized).strip(".")
+                self._version = parse_version(f"{kube_ver}+{local}")
 
             # store the raw version returns from `server-version` for reference
             self.raw_version = ver
@@ -72,54 +111,63 @@ class HarvesterAPI:
     def __repr__(self):
         return f"HarvesterAPI({self.endpoint!r}, {self.session.headers['Authorization']!r})"
 
+    hosts = _Manager(mgrs.HostManager)
+    keypairs = _Manager(mgrs.KeypairManager)
+    images = _Manager(mgrs.ImageManager)
+    networks = _Manager(mgrs.NetworkManager)
+    ippools = _Manager(mgrs.IPPoolManager)
+    loadbalancers = _Manager(mgrs.LoadBalancerManager)
+    volumes = _Manager(mgrs.VolumeManager)
+    vol_snapshots = _Manager(mgrs.VolumeSnapshotManager)
+    templates = _Manager(mgrs.TemplateManager)
+    namespaces = _Manager(mgrs.NamespaceManager)
+    supportbundle = _Manager(mgrs.SupportBundleManager)
+    settings = _Manager(mgrs.SettingManager)
+    clusternetworks = _Manager(mgrs.ClusterNetworkManager)
+    vms = _Manager(mgrs.VirtualMachineManager)
+    backups = _Manager(mgrs.BackupManager)
+    vm_snapshots = _Manager(mgrs.VirtualMachineSnapshotManager)
+    scs = _Manager(mgrs.StorageClassManager)
+    addons = _Manager(mgrs.AddonManager)
+    # not available in dashboard
+    versions = _Manager(mgrs.VersionManager)
+    upgrades = _Manager(mgrs.UpgradeManager)
+    lhreplicas = _Manager(mgrs.LonghornReplicaManager)
+    lhvolumes = _Manager(mgrs.LonghornVolumeManager)
+    lhbackupvolumes = _Manager(mgrs.LonghornBackupVolumeManager)
+    secrets = _Manager(mgrs.SecretManager)
+
     def load_managers(self, version="0.0.0"):
-        self.hosts = mgrs.HostManager.for_version(version)(self, version)
-        self.keypairs = mgrs.KeypairManager.for_version(version)(self, version)
-        self.images = mgrs.ImageManager.for_version(version)(self, version)
-        self.networks = mgrs.NetworkManager.for_version(version)(self, version)
-        self.ippools = mgrs.IPPoolManager.for_version(version)(self, version)
-        self.loadbalancers = mgrs.LoadBalancerManager.for_version(version)(self, version)
-        self.volumes = mgrs.VolumeManager.for_version(version)(self, version)
-        self.vol_snapshots = mgrs.VolumeSnapshotManager.for_version(version)(self, version)
-        self.templates = mgrs.TemplateManager.for_version(version)(self, version)
-        self.namespaces = mgrs.NamespaceManager.for_version(version)(self, version)
-        self.supportbundle = mgrs.SupportBundleManager.for_version(version)(self, version)
-        self.settings = mgrs.SettingManager.for_version(version)(self, version)
-        self.clusternetworks = mgrs.ClusterNetworkManager.for_version(version)(self, version)
-        self.vms = mgrs.VirtualMachineManager.for_version(version)(self, version)
-        self.backups = mgrs.BackupManager.for_version(version)(self, version)
-        self.vm_snapshots = mgrs.VirtualMachineSnapshotManager.for_version(version)(self, version)
-        self.scs = mgrs.StorageClassManager.for_version(version)(self, version)
-        self.addons = mgrs.AddonManager.for_version(version)(self, version)
-        # not available in dashboard
-        self.versions = mgrs.VersionManager.for_version(version)(self, version)
-        self.upgrades = mgrs.UpgradeManager.for_version(version)(self, version)
-        self.lhreplicas = mgrs.LonghornReplicaManager.for_version(version)(self, version)
-        self.lhvolumes = mgrs.LonghornVolumeManager.for_version(version)(self, version)
-        self.lhbackupvolumes = mgrs.LonghornBackupVolumeManager.for_version(version)(self, version)
-        self.secrets = mgrs.SecretManager.for_version(version)(self, version)
+        ''' Set the version of managers, they are created on first access '''
+        self._managers_version = version
+        for name, attr in list(self.__dict__.items()):
+            if isinstance(attr, BaseManager):
+                # dropped managers are unreachable, their informers would run forever
+                attr.stop_informer()
+                del self.__dict__[name]
 
     def _get(self, path, **kwargs):
         url = self.get_url(path)
-        return self.session.get(url, **kwargs)
+        return send(self.hooks, self.session.get, "GET", url, **kwargs)
 
     def _post(self, path, **kwargs):
         url = self.get_url(path)
-        return self.session.post(url, **kwargs)
+        return send(self.hooks, self.session.post, "POST", url, **json_kwargs(kwargs))
 
     def _put(self, path, **kwargs):
         url = self.get_url(path)
-        return self.session.put(url, **kwargs)
+        return send(self.hooks, self.session.put, "PUT", url, **json_kwargs(kwargs))
 
     def _delete(self, path, **kwargs):
         url = self.get_url(path)
-        return self.session.delete(url, **kwargs)
+        return send(self.hooks, self.session.delete, "DELETE", url, **kwargs)
 
     def _patch(self, path, **kwargs):
         url = self.get_url(path)
         headers = {"Content-type": "application/merge-patch+json"}
         headers.update(kwargs.pop('headers', {}))
-        return self.session.patch(url, headers=headers, **kwargs)
+        kwargs = json_kwargs(dict(kwargs, headers=headers))
+        return send(self.hooks, self.session.patch, "PATCH", url, **kwargs)
 
     def get_url(self, path):
         return urljoin(self.endpoint, path).format(API_VERSION=self.API_VERSION)
@@ -137,16 +185,53 @@ class HarvesterAPI:
             self._version = None
         return r.json()
 
-    def set_retries(self, times=5, status_forcelist=(500, 502, 504), **kwargs):
-        kwargs.update(backoff_factor=kwargs.get('backoff_factor', 10.0),
+    def set_retries(self, times=5, status_forcelist=RETRY_STATUSES, **kwargs):
+        '''
+        :param int times: max retries of a request
+        :param Iterable[int] status_forcelist: statuses to be retried, non-idempotent methods
+                                               are only retried on 429 and 503
+        :param kwargs: other arguments of `Retry`, e.g. `backoff_factor` and `backoff_max`
+        '''
+        kwargs.update(backoff_factor=kwargs.get('backoff_factor', 0.5),
+                      backoff_max=kwargs.get('backoff_max', 10.0),
                       total=kwargs.get('total', times),
                       status_forcelist=status_forcelist,
-                      raise_on_status=False)
-        retry_strategy = Retry(**kwargs)
-        adapter = requests.adapters.HTTPAdapter(max_retries=retry_strategy)
+                      raise_on_status=False,
+                      stats=self._retry_stats)
+        retry_strategy = SafeRetry(**kwargs)
+        adapter = PooledHTTPAdapter(max_retries=retry_strategy, **self.pool_options)
+        if self.transport is not None:
+            adapter = self.transport.wrap(adapter)
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
 
+    @property
+    def pool_stats(self):
+        ''' Counters of connections created and reused, None for non-pooled session '''
+        adapter = self.session.get_adapter(self.endpoint)
+        return adapter.stats.as_dict() if isinstance(adapter, PooledHTTPAdapter) else None
+
+    @property
+    def limiter_stats(self):
+        ''' Current rate and concurrency of the limiter, None if not limited '''
+        limiter = self.pool_options['limiter']
+        return limiter.as_dict() if limiter is not None else None
+
+    @property
+    def retry_stats(self):
+        ''' Counters of retries by `"METHOD cause"` and seconds spent on backoff '''
+        return self._retry_stats.as_dict()
+
+    def bulk(self, operations, *, max_workers=MAX_WORKERS, **kwargs):
+        ''' Run operations of managers concurrently, see `Bulk.run` for keyword arguments
+
+        :param Iterable[tuple] operations: `(manager, operation, args[, kwargs])`, e.g.
+                                           `(self.vms, "stop", (name,))`
+        :param int max_workers: max concurrent operations
+        :return list[BulkResult]: results in the order of operations
+        '''
+        return Bulk(self, max_workers).run(operations, **kwargs)
+
     def generate_kubeconfig(self):
         path = "v1/management.cattle.io.clusters/local?action=generateKubeconfig"
         r = self._post(path)
@@ -1,10 +1,14 @@
-from typing import Type, TypeVar, TypeAlias, Optional, NoReturn, Iterable, ClassVar, Tuple
+from typing import Any, Callable, Type, TypeVar, TypeAlias, Optional, NoReturn, Iterable, ClassVar, Tuple
 
 from packaging import version
 from requests import Session
 
 from . import managers
 from .managers.base import DEFAULT_NAMESPACE
+from .bulk import BulkResult
+from .cassettes import Cassette
+from .limiters import RateLimiter
+from .metrics import RequestMetrics, RequestRecord
 
 
 API_T = TypeVar('API_T', bound='HarvesterAPI')
@@ -19,6 +23,9 @@ class HarvesterAPI:
 
     session: Session
     endpoint: Url
+    metrics: RequestMetrics
+    hooks: list[Callable[[RequestRecord], Any]]
+    transport: Optional[Cassette]
     hosts: managers.HostManager
     keypairs: managers.KeypairManager
     images: managers.ImageManager
@@ -46,7 +53,8 @@ class HarvesterAPI:
         user: str,
         passwd: str,
         session: Optional[Session] = ...,
-        ssl_verify: bool = ...
+        ssl_verify: bool = ...,
+        **pool_options
     ) -> API_T:
         """
         """
@@ -54,7 +62,13 @@ class HarvesterAPI:
         self,
         endpoint: Url,
         token: Optional[str] = ...,
-        session: Optional[Session] = ...
+        session: Optional[Session] = ...,
+        *,
+        pool_maxsize: int = ...,
+        pool_block: bool = ...,
+        keepalive: Optional[int] = ...,
+        limiter: Optional[RateLimiter] = ...,
+        transport: Optional[Cassette] = ...
     ) -> NoReturn:
         """
         """
@@ -80,6 +94,29 @@ class HarvesterAPI:
     ) -> NoReturn:
         """
         """
+    @property
+    def pool_stats(self) -> Optional[dict[str, int]]:
+        """
+        """
+    @property
+    def limiter_stats(self) -> Optional[dict[str, Any]]:
+        """
+        """
+    @property
+    def retry_stats(self) -> dict[str, Any]:
+        """
+        """
+    def bulk(
+        self,
+        operations: Iterable[tuple],
+        *,
+        max_workers: int = ...,
+        until: Optional[Callable[[Optional[dict]], bool]] = None,
+        timeout: float = ...,
+        snooze: float = ...
+    ) -> list[BulkResult]:
+        """
+        """
     def generate_kubeconfig(self) -> str:
         """
         """
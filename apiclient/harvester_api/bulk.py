@@ -0,0 +1,191 @@
+''' Apply operations of managers to many resources concurrently, e.g.
+
+    results = api.bulk([(api.vms, "stop", (name,)) for name in names],
+                       until=lambda vm: vm and "Stopped" == vm['status'].get('printableStatus'))
+    failed = [r for r in results if not r.ok]
+'''
+import inspect
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+
+from .informers import Informer
+
+#: Max concurrent operations by default
+MAX_WORKERS = 16
+#: Seconds to wait for the target state by default
+TIMEOUT = 300
+
+
+def absent(obj):
+    ''' Target state of deletes, to be passed as `until` '''
+    return obj is None
+
+
+class BulkResult:
+    ''' Result of an operation
+
+    :ivar BaseManager manager: manager of the resource
+    :ivar str operation: name of the method of the manager
+    :ivar str name: name of the resource, None if the method has no `name` argument
+    :ivar str namespace: namespace of the resource, "" for cluster scoped ones
+    :ivar int code: status code returned by the operation, None on errors
+    :ivar data: data returned by the operation
+    :ivar Exception error: exception raised by the operation
+    :ivar bool reached: the target state is reached, None if not waited
+    :ivar float elapsed: seconds of the operation (and the wait)
+    '''
+    __slots__ = ("manager", "operation", "name", "namespace", "code", "data", "error",
+                 "reached", "elapsed")
+
+    def __init__(self, manager, operation, name, namespace):
+        self.manager = manager
+        self.operation = operation
+        self.name = name
+        self.namespace = namespace
+        self.code = self.data = self.error = self.reached = None
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        state = f"error={self.error!r}" if self.error is not None else f"code={self.code}"
+        return (f"<{self.__class__.__name__} {self.operation} {self.namespace}/{self.name}"
+                f" {state} reached={self.reached}>")
+
+    @property
+    def ok(self):
+        ''' The operation succeeded, and reached the target state if it was waited '''
+        return (self.error is None and self.code is not None and self.code < 400
+                and self.reached is not False)
+
+
+def _target(method, args, kwargs):
+    ''' Name and namespace of the resource by the arguments of the method '''
+    try:
+        bound = inspect.signature(method).bind(*args, **kwargs)
+    except TypeError:
+        return None, ""
+    bound.apply_defaults()
+    arguments = bound.arguments
+    return arguments.get('name'), arguments.get('namespace') or ""
+
+
+class Bulk:
+    ''' Run operations on a bounded thread pool, and wait for the target state of all
+    resources by a single informer (list + watch) per manager instead of polling each one.
+    '''
+    def __init__(self, api, max_workers=MAX_WORKERS):
+        '''
+        :param HarvesterAPI api: the API, managers could be given by attribute names of it
+        :param int max_workers: max concurrent operations
+        '''
+        self.api = api
+        self.max_workers = max_workers
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} of {self.api!r}, {self.max_workers} workers>"
+
+    def run(self, operations, *, until=None, timeout=TIMEOUT, snooze=3):
+        ''' Run operations concurrently, exceptions are collected into results
+
+        :param Iterable[tuple] operations: `(manager, operation, args)` or
+                                           `(manager, operation, args, kwargs)`, manager is
+                                           a manager or its attribute name, e.g. "vms"
+        :param Callable[[Optional[dict]], bool] until: target state of each resource, called
+                                                       with the object or None if absent
+        :param float timeout: seconds to wait for the target state
+        :param float snooze: seconds between polling, for managers unable to watch
+        :return list[BulkResult]: results in the order of operations
+        '''
+        calls = []
+        for manager, operation, args, *kwargs in operations:
+            if isinstance(manager, str):
+                manager = getattr(self.api, manager)
+            method = getattr(manager, operation)
+            kwargs = dict(kwargs[0]) if kwargs else dict()
+            name, namespace = _target(method, args, kwargs)
+            calls.append((BulkResult(manager, operation, name, namespace), method, args, kwargs))
+        if not calls:
+            return []
+
+        started = monotonic()
+        with ThreadPoolExecutor(min(self.max_workers, len(calls)),
+                                thread_name_prefix="harvester-bulk") as executor:
+            for _ in executor.map(lambda c: self._call(*c), calls):
+                pass
+        results = [c[0] for c in calls]
+
+        if until is not None:
+            self.wait(results, until, timeout - (monotonic() - started), snooze)
+        return results
+
+    def _call(self, result, method, args, kwargs):
+        started = monotonic()
+        try:
+            rval = method(*args, **kwargs)
+            if isinstance(rval, tuple) and 2 == len(rval):
+                result.code, result.data = rval
+            else:
+                result.code, result.data = getattr(rval, 'status_code', 200), rval
+        except Exception as e:
+            result.error = e
+        result.elapsed = monotonic() - started
+
+    def wait(self, results, until, timeout=TIMEOUT, snooze=3):
+        ''' Wait for succeeded results to reach the target state, `reached` of results is set
+
+        :return bool: all succeeded results reached the target state
+        '''
+        by_manager = defaultdict(list)
+        for r in results:
+            if r.error is not None or r.code is None or r.code >= 400:
+                r.reached = False
+            elif r.name:
+                by_manager[r.manager].append(r)
+            else:
+                r.reached = True  # nothing to wait
+
+        started = monotonic()
+        endtime = started + timeout
+        for manager, pending in by_manager.items():
+            remaining = max(endtime - monotonic(), 0)
+            if manager.WATCH_fmt is None:
+                self._poll(manager, pending, until, remaining, snooze)
+            else:
+                self._watch(manager, pending, until, remaining)
+            waited = monotonic() - started
+            for r in pending:
+                r.reached = bool(r.reached)
+                r.elapsed += waited
+        return all(r.reached for rs in by_manager.values() for r in rs)
+
+    def _watch(self, manager, pending, until, timeout):
+        namespaces = {r.namespace for r in pending}
+        namespace = namespaces.pop() if 1 == len(namespaces) else ""
+        informer = Informer(manager, namespace)
+
+        def check():
+            for r in pending:
+                if not r.reached and until(informer.get(r.name, r.namespace)):
+                    r.reached = True
+            return all(r.reached for r in pending)
+
+        endtime = monotonic() + timeout
+        try:
+            informer.start(wait=True, timeout=timeout)
+            informer.wait_for(check, max(endtime - monotonic(), 0))
+        except TimeoutError:
+            pass
+        finally:
+            informer.stop()
+
+    def _poll(self, manager, pending, until, timeout, snooze):
+        endtime = monotonic() + timeout
+        while True:
+            for r in pending:
+                if not r.reached:
+                    args = (r.name, r.namespace) if r.namespace else (r.name,)
+                    code, data = manager.get(*args)
+                    r.reached = bool(until(data if 200 == code else None))
+            if all(r.reached for r in pending) or monotonic() + snooze > endtime:
+                return
+            sleep(snooze)
@@ -0,0 +1,217 @@
+import base64
+import gzip
+import hashlib
+import json
+from collections import defaultdict, deque
+from io import BytesIO
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+#: Headers of responses which are not kept, as bodies are stored decoded or they are secrets
+DROPPED_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding",
+                             "connection", "keep-alive", "date", "set-cookie", "authorization"})
+#: Paths of authentication, bodies of their requests (credentials) are not matched and
+#: `SECRET_FIELDS` of their responses are redacted
+AUTH_PATHS = ("v3-public/", "v3/tokens", "action=generateKubeconfig")
+#: Fields of responses of `AUTH_PATHS` to be redacted
+SECRET_FIELDS = frozenset({"token", "password", "config"})
+REDACTED = "REDACTED"
+#: Fields of requests to be matched on replay
+MATCH_ON = ("method", "url", "body")
+#: Query parameters which vary between runs, they are not matched
+VOLATILE_PARAMS = frozenset({"resourceVersion", "timeoutSeconds"})
+
+
+class CassetteMismatch(ConnectionError):
+    ''' No recorded interaction matches the request on replay '''
+
+
+def _is_watch(request):
+    return ("watch", "true") in parse_qsl(urlsplit(request.url).query)
+
+
+def _is_auth(request):
+    return any(p in request.url for p in AUTH_PATHS)
+
+
+def _redact(obj):
+    if isinstance(obj, dict):
+        return {k: REDACTED if k in SECRET_FIELDS and isinstance(v, str) else _redact(v)
+                for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_redact(v) for v in obj]
+    return obj
+
+
+def _request_key(request, match_on):
+    parts = urlsplit(request.url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if k not in VOLATILE_PARAMS)
+    url = parts.path + ("?" + urlencode(query) if query else "")
+    body = request.body
+    if isinstance(body, str):
+        body = body.encode()
+    # streamed bodies (e.g. file uploads) are not matched, they can't be read twice,
+    # neither are credentials, their digests could be brute-forced
+    matched = isinstance(body, bytes) and not _is_auth(request)
+    digest = hashlib.sha256(body).hexdigest()[:16] if matched else None
+    fields = dict(method=request.method, url=url, body=digest)
+    return tuple(fields[f] for f in match_on)
+
+
+def _encode(body):
+    try:
+        return dict(text=body.decode())
+    except UnicodeDecodeError:
+        return dict(base64=base64.b64encode(body).decode())
+
+
+def _decode(record):
+    if "base64" in record:
+        return base64.b64decode(record['base64'])
+    return record.get('text', "").encode()
+
+
+class Cassette(BaseAdapter):
+    ''' Transport of APIs which records interactions into a cassette file, or replays them.
+
+    The cassette is JSON lines (gzipped if the path ends with `.gz`), a line per interaction
+    with the request key, status, headers, decoded body and recorded seconds.
+    On replay, interactions of the same key (method, URL without host, digest of the body) are
+    served in the recorded order, and the last one is repeated once they are used up, so
+    polling loops still converge.
+
+    Watch requests are not recorded, they are sent to the adapter on record, and responded
+    with 501 on replay so watchers end immediately and callers fall back to polling.
+    Bodies of streamed (e.g. image downloads) and non-JSON responses are not read nor recorded,
+    they are replayed empty. Secrets of authentication (see `AUTH_PATHS`) are redacted.
+    The file is written by a single writer, which is complete once the cassette is closed.
+
+    :ivar int played: interactions served on replay
+    :ivar float recorded_seconds: wall seconds of the served interactions when they were recorded
+    '''
+    def __init__(self, path, mode="replay", *, match_on=MATCH_ON):
+        '''
+        :param str | Path path: path of the cassette file
+        :param str mode: `record` to send requests and append interactions to the file,
+                         `replay` to serve responses from the file only
+        :param tuple match_on: fields of requests to be matched, from `MATCH_ON`
+        '''
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode should be 'record' or 'replay', not {mode!r}")
+        super().__init__()
+        self.path = Path(path).expanduser()
+        self.mode = mode
+        self.match_on = tuple(match_on)
+        self.adapter = None
+        self.played = 0
+        self.recorded_seconds = 0.0
+        self._lock = Lock()
+        self._interactions = defaultdict(deque)
+        self._writer = None
+        if "replay" == mode:
+            self._load()
+        else:
+            # one writer for the cassette, as a gzip member per interaction compresses poorly
+            self._writer = self._open("w")
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.mode} {str(self.path)!r}>"
+
+    def _open(self, mode):
+        if self.path.suffix == ".gz":
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return self.path.open(mode, encoding="utf-8")
+
+    def _load(self):
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    key = tuple(record['request'][f] for f in self.match_on)
+                    self._interactions[key].append(record)
+
+    def wrap(self, adapter):
+        ''' Use the adapter to send requests on record, return the cassette to be mounted '''
+        self.adapter = adapter
+        return self
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        watch = _is_watch(request)
+        if "replay" == self.mode:
+            return self._unrecorded(request) if watch else self._replay(request)
+
+        started = monotonic()
+        resp = self.adapter.send(request, stream=stream, timeout=timeout, verify=verify,
+                                 cert=cert, proxies=proxies)
+        if watch:
+            # streamed as it is, reading it entirely would block until the watch is timed out
+            return resp
+        fields = _request_key(request, MATCH_ON)
+        record = dict(request=dict(zip(MATCH_ON, fields)), status=resp.status_code,
+                      reason=resp.reason, elapsed=round(monotonic() - started, 6),
+                      headers={k: v for k, v in resp.headers.items()
+                               if k.lower() not in DROPPED_HEADERS},
+                      body=self._record_body(request, resp, stream))
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._writer is not None:
+                self._writer.write(line)
+        return resp
+
+    def _record_body(self, request, resp, stream):
+        if stream or "json" not in resp.headers.get("Content-Type", ""):
+            # only metadata, reading the body would hold the whole stream in memory
+            return dict(skipped=True)
+        body = resp.content
+        if _is_auth(request):
+            try:
+                body = json.dumps(_redact(json.loads(body))).encode()
+            except ValueError:
+                return dict(skipped=True)
+        return _encode(body)
+
+    def _unrecorded(self, request):
+        resp = Response()
+        resp.status_code, resp.reason = 501, "Not Recorded"
+        resp.url, resp.request = request.url, request
+        resp.raw = BytesIO(b"")
+        resp._content, resp._content_consumed = b"", True
+        return resp
+
+    def _replay(self, request):
+        key = _request_key(request, self.match_on)
+        with self._lock:
+            queue = self._interactions.get(key)
+            if not queue:
+                raise CassetteMismatch(f"No interaction recorded for {key}", request=request)
+            record = queue.popleft() if len(queue) > 1 else queue[0]
+            self.played += 1
+            self.recorded_seconds += record['elapsed']
+
+        body = _decode(record['body'])
+        resp = Response()
+        resp.status_code = record['status']
+        resp.reason = record.get('reason')
+        resp.headers = CaseInsensitiveDict(record['headers'])
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.url = request.url
+        resp.request = request
+        resp.raw = BytesIO(body)
+        resp._content, resp._content_consumed = body, True
+        return resp
+
+    def close(self):
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+        if self.adapter is not None:
+            self.adapter.close()
@@ -0,0 +1,234 @@
+import json
+import re
+from collections.abc import Mapping, MutableMapping
+from threading import Lock
+
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover, optional
+    orjson = None
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover, optional
+    yaml = None
+
+#: Errors raised by `loads` of codecs, `orjson.JSONDecodeError` is derived from it
+DecodeError = json.JSONDecodeError
+
+_object = re.compile(rb"\s*\{")
+
+
+class Codec:
+    ''' Functions to decode and encode JSON
+
+    :ivar str name: name of the codec
+    :ivar Callable[[bytes | str], Any] loads: decode JSON
+    :ivar Callable[[Any], bytes] dumps: encode to compact UTF-8 JSON
+    '''
+    __slots__ = ("name", "loads", "dumps")
+
+    def __init__(self, name, loads, dumps):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.name}>"
+
+
+def _default(obj):
+    # mappings (e.g. `LazyJSON`), and dict subclasses passed through by orjson, which reads
+    # their storage directly
+    if isinstance(obj, Mapping):
+        return dict(obj.items())
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_PASSTHROUGH_SUBCLASS)
+
+
+STDLIB = Codec("json", json.loads, _json_dumps)
+ORJSON = Codec("orjson", orjson.loads, _orjson_dumps) if orjson is not None else None
+
+_codec = ORJSON or STDLIB
+
+
+def get_codec():
+    return _codec
+
+
+def set_codec(codec):
+    ''' Set the codec used by APIs and managers, return the previous one
+
+    :param Codec | str codec: the codec, or the name of a builtin one (`json` or `orjson`)
+    :return Codec: the previous codec
+    '''
+    global _codec
+    if isinstance(codec, str):
+        codecs = {c.name: c for c in (STDLIB, ORJSON) if c is not None}
+        if codec not in codecs:
+            raise ValueError(f"Codec {codec!r} is not available, choose from {list(codecs)}")
+        codec = codecs[codec]
+    previous, _codec = _codec, codec
+    return previous
+
+
+def loads(data):
+    return _codec.loads(data)
+
+
+def dumps(obj):
+    return _codec.dumps(obj)
+
+
+def json_kwargs(kwargs):
+    ''' Encode `json` of keyword arguments of requests by the codec, into `data` '''
+    if kwargs.get('json') is None:
+        return kwargs
+    kwargs = dict(kwargs)
+    headers = CaseInsensitiveDict(kwargs.pop('headers', None) or {})
+    headers.setdefault('Content-Type', "application/json")
+    kwargs.update(data=dumps(kwargs.pop('json')), headers=headers)
+    return kwargs
+
+
+class LazyJSON(MutableMapping):
+    ''' JSON object of a successful response, decoded on first access.
+
+    It is a mutable mapping of the decoded object, or `dict(error=<DecodeError>,
+    response=<Response>)` when the body is not valid JSON. It is not a `dict`, so encoders
+    must be given `codecs.dumps` (or `copy()`), and copies (`copy`, `copy.deepcopy`, pickle)
+    are plain `dict`. It is dumped as a mapping by `yaml.dump` and `yaml.safe_dump`.
+    Decoding is guarded by a lock, so it is safe to be accessed from multiple threads.
+    '''
+    __slots__ = ("_response", "_dict", "_lock")
+
+    def __init__(self, response):
+        self._response = response
+        self._dict = None
+        self._lock = Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._dict is None:
+                resp, self._response = self._response, None
+                try:
+                    self._dict = loads(resp.content)
+                except DecodeError as e:
+                    self._dict = dict(error=e, response=resp)
+        return self._dict
+
+    @property
+    def loaded(self):
+        return self._dict is not None
+
+    def _data(self):
+        data = self._dict
+        return data if data is not None else self._load()
+
+    def __repr__(self):
+        # decoded, so messages of assertions keep the body of the response
+        return repr(self._data())
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self._data()),)
+
+    def copy(self):
+        return dict(self._data())
+
+    def __len__(self):
+        return len(self._data())
+
+    def __iter__(self):
+        return iter(self._data())
+
+    def __reversed__(self):
+        return reversed(self._data())
+
+    def __contains__(self, key):
+        return key in self._data()
+
+    def __getitem__(self, key):
+        return self._data()[key]
+
+    def __setitem__(self, key, value):
+        self._data()[key] = value
+
+    def __delitem__(self, key):
+        del self._data()[key]
+
+    def __eq__(self, other):
+        if isinstance(other, LazyJSON):
+            other = other._data()
+        return self._data() == other
+
+    __hash__ = None
+
+    def __or__(self, other):
+        return self._data() | other
+
+    def __ror__(self, other):
+        return other | self._data()
+
+    def __ior__(self, other):
+        self._data().update(other)
+        return self
+
+    def get(self, key, default=None):
+        return self._data().get(key, default)
+
+    def keys(self):
+        return self._data().keys()
+
+    def values(self):
+        return self._data().values()
+
+    def items(self):
+        return self._data().items()
+
+    def pop(self, *args):
+        return self._data().pop(*args)
+
+    def popitem(self):
+        return self._data().popitem()
+
+    def setdefault(self, key, default=None):
+        return self._data().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._data().update(*args, **kwargs)
+
+    def clear(self):
+        self._data().clear()
+
+
+if yaml is not None:
+    def _represent_lazy(representer, data):
+        return representer.represent_dict(data._data())
+
+    # registered to representers, so dumpers derived from them (including C ones) inherit it
+    yaml.representer.SafeRepresenter.add_representer(LazyJSON, _represent_lazy)
+    yaml.representer.Representer.add_representer(LazyJSON, _represent_lazy)
+
+
+def decode_response(resp):
+    ''' Return `(status code, data)` of the response, JSON objects of successful responses are
+    decoded lazily (see `LazyJSON`), other JSON values and errors eagerly, and non-JSON bodies
+    are returned as text.
+    '''
+    if "json" not in resp.headers.get('Content-Type', ""):
+        return resp.status_code, resp.text
+    if 200 <= resp.status_code < 300 and _object.match(resp.content):
+        return resp.status_code, LazyJSON(resp)
+    try:
+        return resp.status_code, loads(resp.content)
+    except DecodeError as e:
+        return resp.status_code, dict(error=e, response=resp)
@@ -0,0 +1,202 @@
+from copy import deepcopy
+from threading import Condition, Event, RLock, Thread
+from time import monotonic
+
+from .codecs import loads
+from .managers.base import WATCH_WINDOW
+
+
+def _key(obj):
+    meta = obj.get('metadata', {})
+    return meta.get('namespace', ""), meta.get('name', "")
+
+
+def _parse_labels(selector):
+    ''' Parse equality-based label selector ("k=v,k2=v2" or dict) into dict '''
+    if not selector:
+        return dict()
+    if isinstance(selector, str):
+        return dict(s.split("=", 1) for s in selector.replace("==", "=").split(",") if s)
+    return dict(selector)
+
+
+class Informer:
+    ''' Local store of a resource kind which is fed by list + watch of the manager.
+
+    Objects are indexed by (namespace, name), namespace, labels and `manager.INDEXERS`.
+    Objects are stored in the Kubernetes API form, so extra fields decorated by
+    the dashboard API (e.g. `metadata.relationships`, `metadata.state`) are not available.
+    '''
+    def __init__(self, manager, namespace="", label_selector=None, resync=WATCH_WINDOW):
+        '''
+        :param BaseManager manager: the manager which `WATCH_fmt` is defined
+        :param str namespace: namespace to be cached, empty string for all namespaces
+        :param str label_selector: only cache objects matching the selector
+        :param float resync: seconds to re-list all objects
+        '''
+        self.manager = manager
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.resync = resync
+
+        self.synced = Event()
+        self.last_synced = None
+        self._stopped = Event()
+        self._lock = RLock()
+        self._changed = Condition(self._lock)
+        self._thread = self._watch = None
+        self._store = dict()
+        self._by_ns = dict()
+        self._by_label = dict()
+        self._indexers = dict(manager.INDEXERS)
+        self._by_index = {idx: dict() for idx in self._indexers}
+
+    def __repr__(self):
+        mgr, ns = self.manager.__class__.__name__, self.namespace or "*"
+        return f"<Informer of {mgr} in {ns!r}, {len(self)} objects>"
+
+    def __len__(self):
+        return len(self._store)
+
+    @property
+    def fresh(self):
+        ''' The cache is synced and its watch is streaming, it turns false while the watch is
+        re-connecting, until the re-list or anything is received from the new stream.
+        '''
+        watch = self._watch
+        return self.synced.is_set() and bool(self._thread and self._thread.is_alive()) \
+            and not (watch is not None and watch.dropped)
+
+    def covers(self, namespace):
+        return not self.namespace or self.namespace == namespace
+
+    def start(self, wait=True, timeout=30):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = Thread(target=self._run, daemon=True,
+                                  name=f"informer-{self.manager.__class__.__name__}")
+            self._thread.start()
+        if wait and not self.synced.wait(timeout):
+            raise TimeoutError(f"{self!r} not synced in {timeout}s")
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._stopped.set()
+            self.synced.clear()
+        watch = self._watch
+        if watch is not None:
+            watch.close()
+
+    def get(self, name, namespace=""):
+        with self._lock:
+            obj = self._store.get((namespace or "", name))
+            return deepcopy(obj) if obj is not None else None
+
+    def wait_for(self, predicate, timeout=None):
+        ''' Block until `predicate()` is true, it is re-checked whenever the cache changes
+
+        :param Callable[[], Any] predicate: called with the lock of the cache held
+        :param float timeout: max seconds to wait, None to wait forever
+        :return: the last result of `predicate`
+        '''
+        endtime = None if timeout is None else monotonic() + timeout
+        with self._changed:
+            while True:
+                rv = predicate()
+                remaining = None if endtime is None else endtime - monotonic()
+                if rv or (remaining is not None and remaining <= 0):
+                    return rv
+                self._changed.wait(remaining)
+
+    def list(self, namespace=None, label_selector=None, **indexed):
+        ''' List cached objects
+
+        :param str namespace: namespace of objects, None for all namespaces
+        :param label_selector: equality-based label selector, e.g. "k=v,k2=v2" or dict(k=v)
+        :param indexed: values of `manager.INDEXERS` to match, e.g. type="backup"
+        :return list[dict]: the matched objects
+        '''
+        with self._lock:
+            keys = set(self._store) if namespace is None else set(self._by_ns.get(namespace, ()))
+            for label in _parse_labels(label_selector).items():
+                keys &= self._by_label.get(label, set())
+            for idx, value in indexed.items():
+                keys &= self._by_index[idx].get(value, set())
+            return [deepcopy(self._store[k]) for k in sorted(keys)]
+
+    def _put(self, obj):
+        key = _key(obj)
+        self._remove(key)
+        self._store[key] = obj
+        self._by_ns.setdefault(key[0], set()).add(key)
+        for label in obj.get('metadata', {}).get('labels', {}).items():
+            self._by_label.setdefault(label, set()).add(key)
+        for idx, func in self._indexers.items():
+            self._by_index[idx].setdefault(func(obj), set()).add(key)
+
+    def _remove(self, key):
+        obj = self._store.pop(key, None)
+        if obj is None:
+            return
+        self._by_ns.get(key[0], set()).discard(key)
+        for label in obj.get('metadata', {}).get('labels', {}).items():
+            self._by_label.get(label, set()).discard(key)
+        for idx, func in self._indexers.items():
+            self._by_index[idx].get(func(obj), set()).discard(key)
+
+    def _list(self):
+        params = dict(labelSelector=self.label_selector) if self.label_selector else dict()
+        resp = self.manager._get(self.manager._watch_path(self.namespace), raw=True,
+                                 params=params)
+        resp.raise_for_status()
+        data = loads(resp.content)
+        with self._lock:
+            self._store.clear(), self._by_ns.clear(), self._by_label.clear()
+            for index in self._by_index.values():
+                index.clear()
+            for obj in data.get('items', []):
+                self._put(obj)
+            self._changed.notify_all()
+            # `stop` might be called while listing, don't mark the stopped one as synced
+            if self._stopped.is_set():
+                return None
+            self.last_synced = monotonic()
+            self.synced.set()
+        return data.get('metadata', {}).get('resourceVersion')
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                rv = self._list()
+            except Exception:
+                self.synced.clear()
+                self._stopped.wait(1)
+                continue
+
+            self._watch = self.manager._watch(
+                self.manager._watch_path(self.namespace), label_selector=self.label_selector,
+                resource_version=rv, timeout=self.resync
+            )
+            etype = None
+            for etype, obj in self._watch:
+                if self._stopped.is_set():
+                    break
+                if "ERROR" == etype:
+                    # re-list to catch up what has been missed
+                    self.synced.clear()
+                    break
+                with self._lock:
+                    if "DELETED" == etype:
+                        self._remove(_key(obj))
+                    else:
+                        self._put(obj)
+                    self._changed.notify_all()
+
+            # events would be missed until the re-list
+            self.synced.clear()
+            if self._watch.endtime > monotonic() and "ERROR" != etype:
+                # watch is unavailable, snooze before re-list
+                self._stopped.wait(1)
+            self._watch.close()
+            self._watch = None
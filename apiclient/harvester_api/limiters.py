@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from tempfile import gettempdir
+from threading import Condition, Lock
+from time import monotonic, sleep, time
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover, not available on Windows
+    fcntl = None
+
+#: Requests per second allowed by default
+RATE = 20.0
+#: Max concurrent requests by default
+MAX_CONCURRENCY = 16
+#: Statuses which the server is throttling
+THROTTLED_STATUSES = frozenset({429, 503})
+#: Latency (EWMA) over the ratio of the lowest one is treated as congestion
+LATENCY_RATIO = 3.0
+#: Latency under the seconds is never treated as congestion
+LATENCY_FLOOR = 0.5
+#: Seconds to recover the rate from the minimum to the configured one
+RECOVERY_PERIOD = 30.0
+
+_limiters = dict()
+_registry_lock = Lock()
+
+
+class RateLimiter:
+    ''' Token bucket of requests with an AIMD (additive increase, multiplicative decrease)
+    limit of concurrent requests.
+
+    On throttled statuses (429/503), timeouts or rising latency, both the rate and the
+    concurrency are halved; then the concurrency increases by one per window of successful
+    requests, and the rate recovers linearly in `RECOVERY_PERIOD`.
+
+    With `lock_path`, the bucket (and the rate) is kept in the file and shared by processes
+    (e.g. pytest-xdist workers) via `fcntl.flock`, the concurrency is limited per process.
+    '''
+    def __init__(self, rate=RATE, burst=None, max_concurrency=MAX_CONCURRENCY,
+                 min_concurrency=1, min_rate=1.0, lock_path=None):
+        '''
+        :param float rate: requests per second
+        :param int burst: max requests at once when the bucket is full, `rate` by default
+        :param int max_concurrency: max concurrent requests
+        :param int min_concurrency: concurrency never be decreased under it
+        :param float min_rate: rate never be decreased under it
+        :param str | Path lock_path: file to share the bucket between processes
+        '''
+        if lock_path is not None and fcntl is None:
+            raise NotImplementedError("Sharing between processes requires `fcntl`")
+        self.max_rate = float(rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.burst = burst or max(1.0, self.max_rate)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.lock_path = Path(lock_path) if lock_path is not None else None
+
+        self.limit = float(max_concurrency)
+        self.inflight = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self._cond = Condition()
+        self._lock = Lock()
+        self._state = self._initial()
+        self._ewma = self._lowest = None
+        self._decreased = 0.0
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__} rate={self.rate:.1f}/{self.max_rate:.1f}"
+                f" concurrency={self.inflight}/{int(self.limit)} throttled={self.throttled}>")
+
+    def _initial(self):
+        return dict(tokens=self.burst, stamp=time(), rate=self.max_rate)
+
+    @contextmanager
+    def _bucket(self):
+        if self.lock_path is None:
+            with self._lock:
+                yield self._state
+            return
+
+        with self._lock, open(self.lock_path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read())
+                except ValueError:
+                    state = self._initial()
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @property
+    def rate(self):
+        with self._bucket() as state:
+            return state['rate']
+
+    def _take(self):
+        ''' Reserve a token, return seconds to wait for it '''
+        with self._bucket() as state:
+            now = time()
+            elapsed = max(0.0, now - state['stamp'])
+            recovery = (self.max_rate - self.min_rate) / RECOVERY_PERIOD
+            state['rate'] = min(self.max_rate, state['rate'] + elapsed * recovery)
+            state['tokens'] = min(self.burst, state['tokens'] + elapsed * state['rate']) - 1
+            state['stamp'] = now
+            return max(0.0, -state['tokens'] / state['rate'])
+
+    @contextmanager
+    def acquire(self):
+        ''' Wait for a slot of concurrency and a token of the bucket '''
+        started = monotonic()
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+        try:
+            wait = self._take()
+            if wait:
+                sleep(wait)
+            with self._cond:
+                self.waited += monotonic() - started
+            yield self
+        finally:
+            with self._cond:
+                self.inflight -= 1
+                self._cond.notify()
+
+    def feedback(self, status, latency=None):
+        ''' Adjust limits by the status and seconds to the response of a request '''
+        if status in THROTTLED_STATUSES or self._congested(latency):
+            self.backoff()
+            return
+        with self._cond:
+            increase = 1 / self.limit
+            self.limit = min(self.max_concurrency, self.limit + increase)
+            self._cond.notify()
+
+    def _congested(self, latency):
+        if latency is None:
+            return False
+        with self._cond:
+            self._ewma = latency if self._ewma is None else 0.8 * self._ewma + 0.2 * latency
+            self._lowest = min(self._lowest or self._ewma, self._ewma)
+            return self._ewma > max(LATENCY_FLOOR, LATENCY_RATIO * self._lowest)
+
+    def backoff(self):
+        ''' Halve the rate and the concurrency, at most once per second '''
+        with self._cond:
+            self.throttled += 1
+            now = monotonic()
+            if now - self._decreased < 1.0:
+                return
+            self._decreased = now
+            self.limit = max(self.min_concurrency, self.limit / 2)
+        with self._bucket() as state:
+            state['rate'] = max(self.min_rate, state['rate'] / 2)
+
+    def as_dict(self):
+        return dict(rate=round(self.rate, 2), concurrency=int(self.limit),
+                    throttled=self.throttled, waited=round(self.waited, 3))
+
+
+def shared_lock_path(endpoint):
+    ''' Path of the file to share the limiter of the endpoint between processes '''
+    digest = hashlib.sha1(urlsplit(endpoint).netloc.encode()).hexdigest()[:12]
+    return Path(gettempdir()) / f"harvester-api-{digest}-{os.getuid()}.limiter"
+
+
+def limiter_for(endpoint, *, shared=False, **options):
+    ''' The limiter of the endpoint, created on first call and reused by later calls
+    (the `options` are ignored then), so all API instances of the endpoint are limited together.
+
+    :param str endpoint: URL of the endpoint, only the host and port are used
+    :param bool shared: share the bucket between processes via a file lock
+    :param options: arguments of `RateLimiter`
+    :return RateLimiter: the limiter
+    '''
+    key = urlsplit(endpoint).netloc
+    with _registry_lock:
+        if key not in _limiters:
+            if shared:
+                options.setdefault('lock_path', shared_lock_path(endpoint))
+            _limiters[key] = RateLimiter(**options)
+        return _limiters[key]
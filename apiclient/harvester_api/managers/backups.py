@@ -1,30 +1,78 @@
 from harvester_api.models.backups import RestoreSpec, SnapshotRestoreSpec
 from .base import DEFAULT_NAMESPACE, BaseManager
+from ..views import BackupView
 
 
 class BackupManager(BaseManager):
     BACKUP_fmt = "v1/harvester/harvesterhci.io.virtualmachinebackups/{ns}{uid}"
     RESTORE_fmt = "v1/harvester/harvesterhci.io.virtualmachinerestores/{ns}"
+    WATCH_fmt = "apis/{{API_VERSION}}/{ns}virtualmachinebackups"
+    LIST_fmt = "v1/harvester/harvesterhci.io.virtualmachinebackups/{ns}"
+    LIST_KEY = "data"
+    VIEW = BackupView
+    INDEXERS = dict(
+        type=lambda o: o.get('spec', {}).get('type'),
+        source=lambda o: o.get('spec', {}).get('source', {}).get('name')
+    )
+    # value of `spec.type` to distinguish backups from snapshots
+    SPEC_TYPE = "backup"
 
     RestoreSpec = RestoreSpec
 
-    def get(self, name="", namespace=DEFAULT_NAMESPACE, *, raw=False, **kwargs):
-        path = self.BACKUP_fmt.format(uid=f"/{name}", ns=namespace)
-        resp = self._get(path, raw=raw, **kwargs)
+    def get(self, name="", namespace=DEFAULT_NAMESPACE, *, raw=False, vm_name=None,
+            label_selector=None, **kwargs):
+        ''' Get the backup, or list backups which are filtered on server side
+
+        :param str vm_name: only list backups of the VM
+        :param str label_selector: Kubernetes label selector of backups
+        '''
+        cached = not (raw or kwargs or label_selector) and self._cached(
+            name, namespace, **self._indexed(vm_name))
+        if cached:
+            code, data = cached
+        else:
+            path = self.BACKUP_fmt.format(uid=f"/{name}", ns=namespace)
+            if not name:
+                params = self._list_params(label_selector, filters=self._filters(vm_name))
+                kwargs['params'] = dict(params, **kwargs.get('params', {}))
+            resp = self._get(path, raw=raw, **kwargs)
+            if raw:
+                return resp
+            code, data = resp
+
         try:
-            code, data = resp[0], resp[1]
-            if name and "backup" != data['spec']['type']:
-                return 404, dict(type='error', status=404, message=f'Backup {name!r} not found')
+            if name and self.SPEC_TYPE != data['spec']['type']:
+                return 404, dict(type='error', status=404,
+                                 message=f'{self.SPEC_TYPE.capitalize()} {name!r} not found')
 
-            data['data'] = [d for d in data['data'] if "backup" == d.get('spec', {}).get('type')]
+            # filters might be ignored by dashboard API of older versions
+            data['data'] = [d for d in data['data'] if self._match(d, vm_name)]
             return code, data
-        except TypeError:
-            # raw=True
-            return resp
         except KeyError:
             # !data.spec || !data.data
             return code, data
 
+    def iter_list(self, namespace=DEFAULT_NAMESPACE, *, vm_name=None, **kwargs):
+        objs = super().iter_list(namespace, filters=self._filters(vm_name), **kwargs)
+        return (o for o in objs if self._match(o, vm_name))
+
+    def _filters(self, vm_name=None):
+        filters = {"spec.type": self.SPEC_TYPE}
+        if vm_name:
+            filters["spec.source.name"] = vm_name
+        return filters
+
+    def _indexed(self, vm_name=None):
+        indexed = dict(type=self.SPEC_TYPE)
+        if vm_name:
+            indexed['source'] = vm_name
+        return indexed
+
+    def _match(self, obj, vm_name=None):
+        spec = obj.get('spec', {})
+        return self.SPEC_TYPE == spec.get('type') and (
+            not vm_name or vm_name == spec.get('source', {}).get('name'))
+
     def create(self, *args, **kwargs):
         # Delegate to vm.backups
         return self.api.vms.backup(*args, **kwargs)
@@ -52,6 +100,7 @@ class BackupManager(BaseManager):
 
 
 class VirtualMachineSnapshotManager(BackupManager):
+    SPEC_TYPE = "snapshot"
     RestoreSpec = SnapshotRestoreSpec
 
     def create_data(self, vm_uid, vm_name, snapshot_name, namespace):
@@ -77,21 +126,6 @@ class VirtualMachineSnapshotManager(BackupManager):
             }
         }
 
-    def get(self, name="", namespace=DEFAULT_NAMESPACE, *, raw=False, **kwargs):
-        resp = super().get(name, namespace, raw=True, **kwargs)
-        if raw:
-            return resp
-        code, data = resp.status_code, resp.json()
-        try:
-            if name and "snapshot" != data['spec']['type']:
-                return 404, dict(type='error', status=404, message=f'Snapshot {name!r} not found')
-
-            data['data'] = [d for d in data['data'] if "snapshot" == d.get('spec', {}).get('type')]
-            return code, data
-        except KeyError:
-            # !data.spec || !data.data
-            return code, data
-
     def create(self, vm_name, snapshot_name, namespace=DEFAULT_NAMESPACE, *, raw=False, **kwargs):
         _, data = self.api.vms.get(vm_name, namespace)
         vm_uid = data.get('metadata', {}).get('uid', '')
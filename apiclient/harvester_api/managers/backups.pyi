@@ -1,4 +1,4 @@
-from typing import ClassVar, Optional, Type
+from typing import ClassVar, Iterator, Optional, Type
 from typing_extensions import override
 
 from requests.models import Response
@@ -10,6 +10,7 @@ from .base import BaseManager
 class BackupManager(BaseManager):
     BACKUP_fmt: ClassVar[str]
     RESTORE_fmt: ClassVar[str]
+    SPEC_TYPE: ClassVar[str]
     RestoreSpec: ClassVar[Type[RSpec]]
 
     def get(
@@ -18,10 +19,21 @@ class BackupManager(BaseManager):
         namespace: str = ...,
         *,
         raw: Optional[bool] = ...,
+        vm_name: Optional[str] = ...,
+        label_selector: Optional[str] = ...,
         **kwargs
     ) -> dict | Response:
         """
         """
+    def iter_list(
+        self,
+        namespace: str = ...,
+        *,
+        vm_name: Optional[str] = ...,
+        **kwargs
+    ) -> Iterator[dict]:
+        """
+        """
     def create(
         self,
         *args,
@@ -76,16 +88,6 @@ class VirtualMachineSnapshotManager(BackupManager):
     ) -> dict:
         """
         """
-    def get(
-        self,
-        name: str = ...,
-        namespace: str = ...,
-        *,
-        raw: Optional[bool] = ...,
-        **kwargs
-    ) -> dict | Response:
-        """
-        """
 
     @override
     def create(
@@ -1,9 +1,64 @@
-import json
+from contextlib import closing
+from copy import deepcopy
+from urllib.parse import urlparse, parse_qsl
+from time import monotonic, sleep
 from weakref import ref
 
-from pkg_resources import parse_version
+from requests.exceptions import RequestException
+
+from ..codecs import decode_response, loads
+from ..metrics import attributed
+from ..versions import parse_version
 
 DEFAULT_NAMESPACE = "default"
+#: Max seconds of a single watch request, the stream will be re-opened after that.
+WATCH_WINDOW = 300
+#: Max objects of a single page when listing resources
+PAGE_SIZE = 100
+#: Times to retry the patch on conflicts (409)
+CONFLICT_RETRIES = 5
+#: Top level fields set by the server or dashboard API, which are never patched
+SERVER_FIELDS = frozenset({"id", "type", "links", "actions", "relationships", "status"})
+#: Fields of metadata set by the server or dashboard API, which are never patched
+SERVER_METADATA = frozenset({"resourceVersion", "uid", "generation", "creationTimestamp",
+                             "managedFields", "selfLink", "fields", "state", "relationships"})
+
+
+def substitute(data, placeholder, value):
+    ''' Return a copy of JSON-like data with the placeholder in strings (and keys) replaced '''
+    if isinstance(data, str):
+        return data.replace(placeholder, value) if placeholder in data else data
+    if isinstance(data, dict):
+        return {substitute(k, placeholder, value): substitute(v, placeholder, value)
+                for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [substitute(v, placeholder, value) for v in data]
+    return data
+
+
+def merge_patch(src, dest):
+    ''' Return the JSON merge patch (RFC 7386) which turns `src` into `dest`,
+    fields removed are `None` and lists are replaced entirely.
+    '''
+    patch = {k: None for k in src if k not in dest}
+    for k, v in dest.items():
+        if k not in src:
+            patch[k] = v
+        elif isinstance(v, dict) and isinstance(src[k], dict):
+            sub = merge_patch(src[k], v)
+            if sub:
+                patch[k] = sub
+        elif v != src[k]:
+            patch[k] = v
+    return patch
+
+
+def _patchable(obj):
+    ''' Shallow copy of the object without fields set by the server '''
+    obj = {k: v for k, v in obj.items() if k not in SERVER_FIELDS}
+    if isinstance(obj.get('metadata'), dict):
+        obj['metadata'] = {k: v for k, v in obj['metadata'].items() if k not in SERVER_METADATA}
+    return obj
 
 
 def merge_dict(src, dest):
@@ -15,43 +70,170 @@ def merge_dict(src, dest):
     return dest
 
 
+class Watch:
+    ''' Iterator of (event type, object) from Kubernetes watch API.
+
+    The stream will be re-opened from the latest resourceVersion until `timeout`s,
+    BOOKMARK events are consumed internally, `close` is safe to be called from other threads.
+    `dropped` is true from a stream is dropped until anything is received from the next one.
+    '''
+    def __init__(self, manager, path, params, resource_version=None, timeout=None, **kwargs):
+        self.manager = manager
+        self.path = path
+        self.params = params
+        self.resource_version = resource_version
+        self.endtime = None if timeout is None else monotonic() + timeout
+        self.kwargs = kwargs
+        self.closed = False
+        self.dropped = False
+        self._resp = None
+        self._events = self._stream()
+
+    def __repr__(self):
+        return f"<Watch {self.path!r} from {self.resource_version!r}>"
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._events)
+
+    def close(self):
+        self.closed = True
+        if self._resp is not None:
+            self._resp.close()
+
+    def _alive(self):
+        return not self.closed and (self.endtime is None or self.endtime > monotonic())
+
+    def _stream(self):
+        while self._alive():
+            window = WATCH_WINDOW if self.endtime is None \
+                else min(self.endtime - monotonic(), WATCH_WINDOW)
+            self.params.update(timeoutSeconds=max(int(window), 1))
+            if self.resource_version:
+                self.params['resourceVersion'] = self.resource_version
+            else:
+                self.params.pop('resourceVersion', None)
+
+            try:
+                self._resp = resp = self.manager._get(
+                    self.path, raw=True, params=self.params, stream=True,
+                    timeout=(10, window + 10), **self.kwargs
+                )
+            except RequestException:
+                self.dropped = True
+                sleep(1)
+                continue
+
+            with closing(resp):
+                if 200 != resp.status_code or self.closed:
+                    # closed while the stream was being opened
+                    return
+                try:
+                    yield from self._events_of(resp)
+                except Exception:
+                    # stream broken or closed by `close`
+                    pass
+                finally:
+                    self.dropped = True
+
+    def _events_of(self, resp):
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            self.dropped = False
+            event = loads(line)
+            etype, obj = event.get('type'), event.get('object', {})
+            if "ERROR" == etype:
+                # 410 Gone: the resourceVersion is too old, restart from now
+                if 410 == obj.get('code'):
+                    self.resource_version = None
+                yield etype, obj
+                return
+            rv = obj.get('metadata', {}).get('resourceVersion')
+            self.resource_version = rv or self.resource_version
+            if "BOOKMARK" != etype:
+                yield etype, obj
+
+
 class BaseManager:
     #: Be used to store sub classes of BaseManager,
     #: the attribute will be automatically updated by `__init_subclass__`
     #: Type: Dict[Type[BaseManager], List[Type[BaseManager]]]
     _sub_classes = dict()
+    #: Memoized results of `for_version`
+    #: Type: Dict[Tuple[Type[BaseManager], Version], Type[BaseManager]]
+    _resolved = dict()
 
     #: Be used to adjust whether the class is support to specific version,
     #: the value should be semantic version and re-defined in derived class
     #: Type: str
     support_to = "0.0.0"
 
+    #: Kubernetes API path to list/watch the resource, should be re-defined in derived class.
+    #: `{ns}` will be formatted as `namespaces/<namespace>/` or empty string for all namespaces
+    #: Type: Optional[str]
+    WATCH_fmt = None
+
+    #: Path to list the resource page by page, `WATCH_fmt` will be used when it is None.
+    #: `{ns}` will be formatted as the namespace or empty string for all namespaces
+    #: Type: Optional[str]
+    LIST_fmt = None
+
+    #: Namespace to watch when it is not specified
+    #: Type: str
+    default_namespace = DEFAULT_NAMESPACE
+
+    #: Key of objects in the list response, `data` for dashboard API, `items` for Kubernetes API
+    #: Type: str
+    LIST_KEY = "items"
+
+    #: Extra indexes of the informer, `{index name: func(obj) -> hashable value}`
+    #: Type: dict[str, Callable[[dict], Hashable]]
+    INDEXERS = dict()
+
+    #: Read-only view of objects of the resource, used by `iter_views`
+    #: Type: Optional[Type[ResourceView]]
+    VIEW = None
+
+    #: Local cache of the resource, be set by `start_informer`
+    #: Type: Optional[Informer]
+    informer = None
+
     @classmethod
     def is_support(cls, target_version):
-        cur_version = parse_version(cls.support_to)
-        try:
-            return parse_version(target_version) >= cur_version
-        except TypeError:
-            return target_version >= cur_version
+        return parse_version(target_version) >= parse_version(cls.support_to)
 
     @classmethod
     def for_version(cls, version):
         ''' Return a (most suitable) derived class `cls` which `cls.is_support` is True
         Otherwise, return the class itself.
 
+        Resolutions are memoized per (class, version), and dropped when a class is derived.
+
         :param str version: the version string going to seek
         :return Type[cls]: the most suitable class for version
         '''
+        key = (cls, parse_version(version))
+        try:
+            return cls._resolved[key]
+        except KeyError:
+            pass
+
         for c in sorted(cls._sub_classes.get(cls, []),
                         reverse=True, key=lambda x: parse_version(x.support_to).release):
-            if c.is_support(version):
-                return c
-        return cls
+            if c.is_support(key[1]):
+                break
+        else:
+            c = cls
+        return cls._resolved.setdefault(key, c)
 
     def __init_subclass__(cls):
         for parent in cls.__mro__:
             if issubclass(parent, BaseManager):
                 cls._sub_classes.setdefault(parent, []).append(cls)
+        cls._resolved.clear()
 
     def __init__(self, api, target_version=""):
         self._api = ref(api)
@@ -68,18 +250,15 @@ class BaseManager:
 
     def _delegate(self, meth, path, *, raw=False, **kwargs):
         func = getattr(self.api, meth)
-        resp = func(path, **kwargs)
+        with attributed(self):
+            resp = func(path, **kwargs)
 
         if raw:
             return resp
-        try:
-            if "json" in resp.headers.get('Content-Type', ""):
-                rval = resp.json()
-            else:
-                rval = resp.text
-            return resp.status_code, rval
-        except json.decoder.JSONDecodeError as e:
-            return resp.status_code, dict(error=e, response=resp)
+        return self._decode(resp)
+
+    def _decode(self, resp):
+        return decode_response(resp)
 
     def _get(self, path, *, raw=False, **kwargs):
         return self._delegate("_get", path, raw=raw, **kwargs)
@@ -101,6 +280,198 @@ class BaseManager:
     def _patch(self, path, *, raw=False, **kwargs):
         return self._delegate("_patch", path, raw=raw, **kwargs)
 
+    def _apply_patch(self, path, new, *, old=None, retries=CONFLICT_RETRIES, raw=False,
+                     **kwargs):
+        ''' Update the object by the minimal JSON merge patch, with `resourceVersion` as the
+        precondition, and retry on conflicts with the latest object.
+
+        :param str path: path to get and patch the object
+        :param dict | Callable[[dict], dict] new: the object updated, or a function which
+                                                  updates a copy of the current object
+        :param dict old: the object which `new` was updated from, the difference of them is
+                         patched, and re-applied to the latest object on conflicts.
+                         The current object is got if it is None.
+        :param int retries: max times to retry on conflicts
+        :return: the response of the patch, or of the get if it failed
+        '''
+        current = old
+        for _ in range(retries + 1):
+            if current is None:
+                resp = self._get(path, raw=True)
+                if not resp.ok:
+                    return resp if raw else self._decode(resp)
+                _, current = self._decode(resp)
+
+            if callable(new):
+                patch = merge_patch(_patchable(current), _patchable(new(deepcopy(current))))
+            else:
+                patch = merge_patch(_patchable(old or current), _patchable(new))
+            rv = current.get('metadata', {}).get('resourceVersion')
+            if rv:
+                patch.setdefault('metadata', {})['resourceVersion'] = rv
+
+            resp = self._patch(path, raw=True, json=patch, **kwargs)
+            if 409 != resp.status_code:
+                break
+            current = None
+        return resp if raw else self._decode(resp)
+
+    def _watch(self, path, *, label_selector=None, field_selector=None, resource_version=None,
+               timeout=None, **kwargs):
+        params = dict(watch="true", allowWatchBookmarks="true")
+        params.update(self._list_params(label_selector, field_selector))
+        return Watch(self, path, params, resource_version, timeout, **kwargs)
+
+    def watch(self, name="", namespace=None, *, label_selector=None, field_selector=None,
+              resource_version=None, timeout=None, **kwargs):
+        ''' Watch changes of the resource via Kubernetes API
+
+        :param str name: the resource name to watch, empty string for all resources
+        :param str namespace: the namespace to watch, empty string for all namespaces,
+                              `default_namespace` will be used when it is None
+        :param str label_selector: Kubernetes label selector, e.g. "app=web,tier!=db"
+        :param str field_selector: Kubernetes field selector, e.g. "status.phase=Running"
+        :param str resource_version: watch changes after the version, current objects
+                                     will be yield as ADDED events when it is None
+        :param float timeout: seconds to watch, watch forever when it is None
+        :return Watch: iterator of (event type, object)
+        '''
+        if self.WATCH_fmt is None:
+            raise NotImplementedError(f"Watch is not supported by {self.__class__.__name__}")
+
+        return self._watch_by(self.WATCH_fmt, name, namespace, label_selector=label_selector,
+                              field_selector=field_selector, resource_version=resource_version,
+                              timeout=timeout, **kwargs)
+
+    def _watch_path(self, namespace=None, path_fmt=None):
+        namespace = self.default_namespace if namespace is None else namespace
+        path_fmt = path_fmt or self.WATCH_fmt
+        return path_fmt.format(ns=f"namespaces/{namespace}/" if namespace else "")
+
+    def _watch_by(self, path_fmt, name, namespace, *, field_selector=None, **kwargs):
+        path = self._watch_path(namespace, path_fmt)
+        if name:
+            field_selector = ",".join(filter(None, [f"metadata.name={name}", field_selector]))
+        return self._watch(path, field_selector=field_selector, **kwargs)
+
+    def _list_params(self, label_selector=None, field_selector=None, filters=None):
+        ''' Build query parameters to filter objects on server side
+
+        :param str label_selector: Kubernetes label selector, e.g. "app=web,tier!=db"
+        :param str field_selector: Kubernetes field selector, e.g. "metadata.name=vm"
+        :param dict filters: `{field path: value}` to be matched by dashboard API,
+                             e.g. `{"spec.type": "backup"}`, ignored by Kubernetes API
+        :return dict: the query parameters
+        '''
+        params = dict()
+        if label_selector:
+            params['labelSelector'] = label_selector
+        if field_selector:
+            params['fieldSelector'] = field_selector
+        if filters:
+            params['filter'] = [f"{k}={v}" for k, v in filters.items()]
+        return params
+
+    def _list_path(self, namespace=None):
+        if self.LIST_fmt is None:
+            return self._watch_path(namespace)
+        namespace = self.default_namespace if namespace is None else namespace
+        return self.LIST_fmt.format(ns=namespace).rstrip("/")
+
+    def _iter_pages(self, path, params):
+        ''' Yield pages of the list response, follows `continue` token of Kubernetes API
+        and `continue`/`pagination.next` of dashboard API.
+
+        :raises requests.HTTPError: if any page is responded with error status
+        '''
+        params = dict(params)
+        while True:
+            resp = self._get(path, raw=True, params=params)
+            resp.raise_for_status()
+            page = loads(resp.content)
+            yield page
+
+            token = page.get('continue') or page.get('metadata', {}).get('continue')
+            if token:
+                params['continue'] = token
+                continue
+            next_url = page.get('pagination', {}).get('next')
+            if not next_url:
+                return
+            next_params = dict(parse_qsl(urlparse(next_url).query))
+            if next_params.items() <= params.items():
+                # no progress, avoid looping forever
+                return
+            params.update(next_params)
+
+    def iter_list(self, namespace=None, *, limit=PAGE_SIZE, label_selector=None,
+                  field_selector=None, filters=None):
+        ''' Iterate objects of the resource page by page, only one page is held at a time.
+
+        :param str namespace: the namespace to list, empty string for all namespaces,
+                              `default_namespace` will be used when it is None
+        :param int limit: max objects of a single page
+        :param str label_selector: Kubernetes label selector, e.g. "app=web,tier!=db"
+        :param str field_selector: Kubernetes field selector, e.g. "status.phase=Running"
+        :param dict filters: `{field path: value}` to be matched by dashboard API
+        :return Iterator[dict]: objects of the resource
+        :raises requests.HTTPError: while iterating, if any page is responded with error status,
+                                    as the iterator has no `(code, data)` to be returned
+        '''
+        if self.LIST_fmt is None and self.WATCH_fmt is None:
+            raise NotImplementedError(f"List is not supported by {self.__class__.__name__}")
+
+        params = dict(limit=limit, **self._list_params(label_selector, field_selector, filters))
+        pages = self._iter_pages(self._list_path(namespace), params)
+        return (obj for page in pages for obj in page.get('items', page.get('data', [])))
+
+    def iter_views(self, *args, **kwargs):
+        ''' Iterate read-only views of objects, arguments are the same as `iter_list`
+
+        :return Iterator[ResourceView]: views of objects of the resource
+        :raises requests.HTTPError: while iterating, same as `iter_list`
+        '''
+        if self.VIEW is None:
+            raise NotImplementedError(f"View is not supported by {self.__class__.__name__}")
+        return (self.VIEW(obj) for obj in self.iter_list(*args, **kwargs))
+
+    def start_informer(self, namespace="", label_selector=None, *, wait=True, **kwargs):
+        ''' Opt-in to serve `get` from the local cache which is fed by list + watch
+
+        :param str namespace: namespace to be cached, empty string for all namespaces
+        :param str label_selector: only cache objects matching the selector
+        :param bool wait: block until the cache is synced
+        :return Informer: the started informer
+        '''
+        from ..informers import Informer
+
+        if self.WATCH_fmt is None:
+            raise NotImplementedError(f"Informer is not supported by {self.__class__.__name__}")
+
+        self.stop_informer()
+        self.informer = Informer(self, namespace, label_selector, **kwargs).start(wait)
+        return self.informer
+
+    def stop_informer(self):
+        if self.informer is not None:
+            self.informer.stop()
+            self.informer = None
+
+    def _cached(self, name="", namespace="", **indexed):
+        ''' Returns (code, data) from the informer, or None if it is unavailable '''
+        informer = self.informer
+        if informer is None or not informer.fresh or not informer.covers(namespace):
+            return None
+
+        if not name:
+            return 200, {self.LIST_KEY: informer.list(namespace or None, **indexed)}
+
+        obj = informer.get(name, namespace)
+        if obj is not None:
+            return 200, obj
+        if not informer.label_selector:
+            return 404, dict(type="error", status=404, code="NotFound",
+                             message=f"{name!r} not found")
+
     def _inject_data(self, data):
-        s = json.dumps(data).replace("{API_VERSION}", self.api.API_VERSION)
-        return json.loads(s)
+        return substitute(data, "{API_VERSION}", self.api.API_VERSION)
@@ -1,13 +1,23 @@
 from __future__ import annotations
-from typing import Final, NoReturn, ClassVar, Type, TypeAlias
+from typing import Final, NoReturn, ClassVar, Type, TypeAlias, Iterator, Optional, Tuple
 
 from packaging import version
 
 from .api import HarvesterAPI
+from ..informers import Informer
+from ..views import ResourceView
 
 Version: TypeAlias = version._BaseVersion
 
 DEFAULT_NAMESPACE: Final[str]
+WATCH_WINDOW: Final[int]
+PAGE_SIZE: Final[int]
+CONFLICT_RETRIES: Final[int]
+
+
+def merge_patch(src: dict, dest: dict) -> dict:
+    """
+    """
 
 
 def merge_dict(src: dict, dest: dict) -> dict:
@@ -15,9 +25,27 @@ def merge_dict(src: dict, dest: dict) -> dict:
     """
 
 
+class Watch(Iterator[Tuple[str, dict]]):
+    manager: BaseManager
+    path: str
+    resource_version: Optional[str]
+    closed: bool
+    dropped: bool
+
+    def close(self) -> NoReturn:
+        """
+        """
+
+
 class BaseManager:
     _sub_classes: ClassVar[dict[Type[BaseManager], list[Type[BaseManager]]]]
     support_to: ClassVar[str]
+    WATCH_fmt: ClassVar[Optional[str]]
+    LIST_fmt: ClassVar[Optional[str]]
+    default_namespace: ClassVar[str]
+    LIST_KEY: ClassVar[str]
+    VIEW: ClassVar[Optional[Type[ResourceView]]]
+    informer: Optional[Informer]
 
     @classmethod
     def is_support(cls, target_version: Version | str) -> bool:
@@ -34,3 +62,45 @@ class BaseManager:
     def api(self) -> HarvesterAPI:
         """
         """
+    def watch(
+        self,
+        name: str = ...,
+        namespace: Optional[str] = ...,
+        *,
+        label_selector: Optional[str] = ...,
+        field_selector: Optional[str] = ...,
+        resource_version: Optional[str] = ...,
+        timeout: Optional[float] = ...,
+        **kwargs
+    ) -> Watch:
+        """
+        """
+    def iter_list(
+        self,
+        namespace: Optional[str] = ...,
+        *,
+        limit: int = ...,
+        label_selector: Optional[str] = ...,
+        field_selector: Optional[str] = ...,
+        filters: Optional[dict] = ...
+    ) -> Iterator[dict]:
+        """
+        Raises `requests.HTTPError` while iterating, if any page is responded with error status.
+        """
+    def iter_views(self, *args, **kwargs) -> Iterator[ResourceView]:
+        """
+        Raises `requests.HTTPError` while iterating, same as `iter_list`.
+        """
+    def start_informer(
+        self,
+        namespace: str = ...,
+        label_selector: Optional[str] = ...,
+        *,
+        wait: bool = ...,
+        **kwargs
+    ) -> Informer:
+        """
+        """
+    def stop_informer(self) -> NoReturn:
+        """
+        """
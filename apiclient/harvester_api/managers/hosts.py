@@ -1,23 +1,34 @@
 from collections.abc import Mapping
+from functools import partial
 
 from .base import BaseManager, merge_dict
+from ..views import HostView
 
 
 class HostManager(BaseManager):
     PATH_fmt = "v1/harvester/nodes/{uid}"
     METRIC_fmt = "v1/metrics.k8s.io.nodes/{uid}"
+    WATCH_fmt = "api/v1/nodes"
+    LIST_fmt = "v1/harvester/nodes"
+    LIST_KEY = "data"
+    VIEW = HostView
 
     def get(self, name="", *, raw=False):
+        cached = not raw and self._cached(name)
+        if cached:
+            return cached
         return self._get(self.PATH_fmt.format(uid=name), raw=raw)
 
     def create(self, *args, **kwargs):
         raise NotImplementedError("Create new host is not allowed.")
 
     def update(self, name, data, *, raw=False, as_json=True, **kwargs):
+        ''' Update the node, fields of `data` are merged into the current node and sent as
+        a merge patch (retried on conflicts), or `data` is put as is when `as_json` is False.
+        '''
         path = self.PATH_fmt.format(uid=name)
         if isinstance(data, Mapping) and as_json:
-            _, node = self.get(name)
-            data = merge_dict(data, node)
+            return self._apply_patch(path, partial(merge_dict, data), raw=raw, **kwargs)
         return self._update(path, data, raw=raw, as_json=as_json, **kwargs)
 
     def delete(self, name, *, raw=False):
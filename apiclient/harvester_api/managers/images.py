@@ -1,7 +1,14 @@
-from pathlib import Path
 from collections.abc import Mapping
+from functools import partial
+from time import monotonic, sleep
 
+from requests.exceptions import RequestException
+
+from ..streams import (
+    CHUNK_SIZE, RANGE_PARTS, MultipartFileStream, UploadState, save_response, save_ranges
+)
 from .base import DEFAULT_NAMESPACE, BaseManager, merge_dict
+from ..views import ImageView
 
 
 class ImageManager(BaseManager):
@@ -9,6 +16,8 @@ class ImageManager(BaseManager):
     PATH_fmt = "apis/{{API_VERSION}}/namespaces/{ns}/virtualmachineimages/{uid}"
     UPLOAD_fmt = "v1/harvester/harvesterhci.io.virtualmachineimages/{ns}/{uid}"
     DOWNLOAD_fmt = "v1/harvester/harvesterhci.io.virtualmachineimages/{ns}/{uid}/download"
+    WATCH_fmt = "apis/{{API_VERSION}}/{ns}virtualmachineimages"
+    VIEW = ImageView
     _KIND = "VirtualMachineImage"
 
     def create_data(self, name, url, desc, stype, namespace, image_checksum=None,
@@ -34,6 +43,9 @@ class ImageManager(BaseManager):
         return self._inject_data(data)
 
     def get(self, name="", namespace=DEFAULT_NAMESPACE, *, raw=False):
+        cached = not raw and self._cached(name, namespace)
+        if cached:
+            return cached
         return self._get(self.PATH_fmt.format(uid=name, ns=namespace), raw=raw)
 
     def create(self, name, namespace=DEFAULT_NAMESPACE, **kwargs):
@@ -49,27 +61,96 @@ class ImageManager(BaseManager):
 
     def create_by_file(
         self, name, filepath, namespace=DEFAULT_NAMESPACE,
-        description="", display_name=None, storageclass=None
+        description="", display_name=None, storageclass=None,
+        *, chunk_size=CHUNK_SIZE, progress=None
     ):
-        file = Path(filepath).expanduser()
+        ''' Create the image then upload the file with streaming body.
+
+        Checksum (sha512) of the uploaded content is available by
+        `resp.request.body.hexdigest()` of the returned response.
+
+        :param int chunk_size: bytes to read from the file per chunk
+        :param Callable[[int, int], None] progress: be called as `progress(sent, total)`
+        :return Response: response of the upload request
+        '''
+        body = MultipartFileStream(filepath, "chunk", chunk_size=chunk_size, progress=progress)
 
         data = self.create_data(name, "", description, "upload", namespace,
-                                display_name, storageclass)
+                                display_name=display_name, storageclass=storageclass)
         self.create("", namespace, json=data)
 
         kwargs = {
-            "params": dict(action="upload", size=file.stat().st_size),
-            "files": dict(chunk=file.open('rb')),
+            "params": dict(action="upload", size=body.size),
+            "data": body,
+            "headers": {"Content-Type": body.content_type},
         }
         return self._create(self.UPLOAD_fmt.format(uid=name, ns=namespace), raw=True, **kwargs)
 
-    def update(self, name, data, *, raw=False, as_json=True, **kwargs):
-        if isinstance(data, Mapping) and as_json:
-            _, curr = self.get(name)
-            data = merge_dict(data, curr)
+    def upload(
+        self, name, filepath, namespace=DEFAULT_NAMESPACE, *, retries=3, backoff_factor=5.0,
+        state_path=None, timeout=300, **kwargs
+    ):
+        ''' Upload the file by `create_by_file` with retries, and skip it when `state_path`
+        records the same file was uploaded and the image is still available.
+
+        The upload API accepts the file as a whole, so a failed upload will be cleaned
+        and sent again from the beginning after `backoff_factor * 2 ** attempt` seconds.
+
+        :param int retries: max times to retry after the first attempt
+        :param float backoff_factor: base seconds to sleep between attempts
+        :param str | Path state_path: JSON file to persist finished uploads
+        :param float timeout: seconds to wait for the failed image to be deleted
+        :param kwargs: other arguments of `create_by_file`
+        :return tuple[int, dict]: status code and the image, or the last error
+        '''
+        state, key = UploadState(state_path) if state_path else None, f"{namespace}/{name}"
+        record = state.get(key, filepath) if state else None
+        if record and "done" == record.get('status'):
+            code, data = self.get(name, namespace)
+            if 200 == code and 100 == data.get('status', {}).get('progress'):
+                return code, data
+        if record:
+            # the image of the interrupted upload
+            self._purge(name, namespace, timeout)
+
+        for attempt in range(retries + 1):
+            if attempt:
+                sleep(backoff_factor * 2 ** (attempt - 1))
+                self._purge(name, namespace, timeout)
+            if state:
+                state.set(key, filepath, status="uploading")
+            try:
+                resp = self.create_by_file(name, filepath, namespace, **kwargs)
+            except RequestException as e:
+                code, data = 599, dict(type="error", message=str(e))
+                continue
+            code, data = self._decode(resp)
+            if resp.ok:
+                if state:
+                    state.set(key, filepath, status="done",
+                              sha512=resp.request.body.hexdigest())
+                return self.get(name, namespace)
+            if 500 > code:
+                break
+        return code, data
+
+    def _purge(self, name, namespace, timeout):
+        self.delete(name, namespace)
+        endtime = monotonic() + timeout
+        while endtime > monotonic():
+            if 404 == self.get(name, namespace)[0]:
+                return
+            sleep(3)
 
-        ns = data.get("metadata", {}).get("namespace", DEFAULT_NAMESPACE)
+    def update(self, name, data, *, raw=False, as_json=True, **kwargs):
+        ''' Update the image, fields of `data` are merged into the current image and sent as
+        a merge patch (retried on conflicts), or `data` is put as is when `as_json` is False.
+        '''
+        ns = data.get("metadata", {}).get("namespace", DEFAULT_NAMESPACE) \
+            if isinstance(data, Mapping) else DEFAULT_NAMESPACE
         path = self.PATH_fmt.format(uid=name, ns=ns)
+        if isinstance(data, Mapping) and as_json:
+            return self._apply_patch(path, partial(merge_dict, data), raw=raw, **kwargs)
         return self._update(path, data, raw=raw, as_json=as_json, **kwargs)
 
     def delete(self, name, namespace=DEFAULT_NAMESPACE, *, raw=False):
@@ -78,6 +159,36 @@ class ImageManager(BaseManager):
     def download(self, name, namespace=DEFAULT_NAMESPACE):
         return self._get(self.DOWNLOAD_fmt.format(uid=name, ns=namespace), raw=True)
 
+    def download_to(self, name, dest, namespace=DEFAULT_NAMESPACE, **kwargs):
+        ''' Download the image into `dest` chunk by chunk, gzip file will be decompressed.
+
+        :param str | Path | IO dest: file path, directory or binary file object to write
+        :param kwargs: options of `streams.save_response`, e.g. `progress`, `checksums`
+        :return tuple[int, Download | dict]: status code and the result or error of the API
+        '''
+        path = self.DOWNLOAD_fmt.format(uid=name, ns=namespace)
+        resp = self._get(path, raw=True, stream=True)
+        if not resp.ok:
+            return self._decode(resp)
+        return resp.status_code, save_response(resp, dest, **kwargs)
+
+    def download_ranged(self, name, dest, namespace=DEFAULT_NAMESPACE, *, parts=RANGE_PARTS,
+                        **kwargs):
+        ''' Download the image with concurrent byte ranges, or a single stream if the server
+        doesn't support ranges. `throughput` of the result reports bytes per second.
+
+        :param int parts: number of ranges to download concurrently
+        :param kwargs: options of `streams.save_ranges`, e.g. `progress`, `checksums`
+        :return tuple[int, Download | dict]: status code (206 for ranges) and the result
+                                             or error of the API
+        '''
+        fetch = partial(self._get, self.DOWNLOAD_fmt.format(uid=name, ns=namespace),
+                        raw=True, stream=True)
+        resp = fetch(headers={"Range": "bytes=0-0"})
+        if not resp.ok:
+            return self._decode(resp)
+        return resp.status_code, save_ranges(resp, fetch, dest, parts=parts, **kwargs)
+
     def create_by_encrypt(
         self,
         source_image_name,
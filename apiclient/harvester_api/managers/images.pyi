@@ -1,9 +1,10 @@
-from typing import ClassVar, Optional
+from typing import BinaryIO, Callable, ClassVar, Optional, Tuple
 from pathlib import Path
 from collections.abc import Mapping
 
 from requests.models import Response
 
+from ..streams import Download
 from .base import BaseManager
 
 
@@ -57,8 +58,26 @@ class ImageManager(BaseManager):
         filepath: str | Path,
         namespace: str = ...,
         description: str = ...,
-        display_name: str = ...
-    ) -> dict | Response:
+        display_name: str = ...,
+        storageclass: str = ...,
+        *,
+        chunk_size: int = ...,
+        progress: Optional[Callable[[int, int], None]] = ...
+    ) -> Response:
+        """
+        """
+    def upload(
+        self,
+        name: str,
+        filepath: str | Path,
+        namespace: str = ...,
+        *,
+        retries: int = ...,
+        backoff_factor: float = ...,
+        state_path: Optional[str | Path] = ...,
+        timeout: float = ...,
+        **kwargs
+    ) -> Tuple[int, dict]:
         """
         """
     def update(
@@ -81,3 +100,30 @@ class ImageManager(BaseManager):
     ) -> dict | Response:
         """
         """
+    def download(
+        self,
+        name: str,
+        namespace: str = ...
+    ) -> Response:
+        """
+        """
+    def download_to(
+        self,
+        name: str,
+        dest: str | Path | BinaryIO,
+        namespace: str = ...,
+        **kwargs
+    ) -> Tuple[int, Download | dict]:
+        """
+        """
+    def download_ranged(
+        self,
+        name: str,
+        dest: str | Path | BinaryIO,
+        namespace: str = ...,
+        *,
+        parts: int = ...,
+        **kwargs
+    ) -> Tuple[int, Download | dict]:
+        """
+        """
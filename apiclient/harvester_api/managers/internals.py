@@ -5,6 +5,8 @@ DEFAULT_HARVESTER_NAMESPACE = "harvester-system"
 
 class VersionManager(BaseManager):
     PATH_fmt = "apis/harvesterhci.io/v1beta1/namespaces/{namespace}/versions/{name}"
+    WATCH_fmt = "apis/harvesterhci.io/v1beta1/{ns}versions"
+    default_namespace = DEFAULT_HARVESTER_NAMESPACE
 
     API_PATH_fmt = "v1/harvester/harvesterhci.io.versions/{namespace}{name}"
 
@@ -37,6 +39,8 @@ class VersionManager(BaseManager):
 
 class UpgradeManager(BaseManager):
     PATH_fmt = "apis/harvesterhci.io/v1beta1/namespaces/{namespace}/upgrades/{name}"
+    WATCH_fmt = "apis/harvesterhci.io/v1beta1/{ns}upgrades"
+    default_namespace = DEFAULT_HARVESTER_NAMESPACE
 
     CREATE_PATH = "v1/harvester/harvesterhci.io.upgrades"
     API_PATH_fmt = "v1/harvester/harvesterhci.io.upgrades/{namespace}{name}"
@@ -1,4 +1,5 @@
 from .base import BaseManager
+from ..views import LonghornReplicaView
 
 DEFAULT_LONGHORN_NAMESPACE = "longhorn-system"
 
@@ -6,6 +7,9 @@ DEFAULT_LONGHORN_NAMESPACE = "longhorn-system"
 class LonghornReplicaManager(BaseManager):
     API_VERSION = "longhorn.io/v1beta2"
     PATH_fmt = "apis/{API_VERSION}/namespaces/{namespace}/replicas/{name}"
+    WATCH_fmt = "apis/longhorn.io/v1beta2/{ns}replicas"
+    VIEW = LonghornReplicaView
+    default_namespace = DEFAULT_LONGHORN_NAMESPACE
 
     API_PATH_fmt = "v1/harvester/longhorn.io.replicas/{namespace}{name}"
 
@@ -21,6 +25,8 @@ class LonghornReplicaManager(BaseManager):
 class LonghornVolumeManager(BaseManager):
     API_VERSION = "longhorn.io/v1beta2"
     PATH_fmt = "apis/{API_VERSION}/namespaces/{namespace}/volumes/{name}"
+    WATCH_fmt = "apis/longhorn.io/v1beta2/{ns}volumes"
+    default_namespace = DEFAULT_LONGHORN_NAMESPACE
 
     API_PATH_fmt = "v1/harvester/longhorn.io.volumes/{namespace}{name}"
 
@@ -32,6 +38,8 @@ class LonghornVolumeManager(BaseManager):
 class LonghornBackupVolumeManager(BaseManager):
     API_VERSION = "longhorn.io/v1beta2"
     PATH_fmt = "apis/{API_VERSION}/namespaces/{namespace}/backupvolumes/{name}"
+    WATCH_fmt = "apis/longhorn.io/v1beta2/{ns}backupvolumes"
+    default_namespace = DEFAULT_LONGHORN_NAMESPACE
     API_PATH_fmt = "v1/harvester/longhorn.io.backupvolumes/{namespace}{name}"
 
     def get(self, name="", namespace=DEFAULT_LONGHORN_NAMESPACE, *, raw=False, **kwargs):
@@ -1,8 +1,7 @@
 import json
 
-from pkg_resources import parse_version
-
 from .base import DEFAULT_NAMESPACE, BaseManager
+from ..versions import parse_version
 
 
 class NetworkManager(BaseManager):
@@ -10,6 +10,7 @@ class SettingManager(BaseManager):
     vlan = "apis/network.{API_VERSION}/clusternetworks/vlan"
     # api-ui-version, backup-target, cluster-registration-url
     PATH_fmt = "apis/{{API_VERSION}}/settings/{name}"
+    WATCH_fmt = "apis/{{API_VERSION}}/settings"
     # "v1/harvesterhci.io.settings/{name}"
     Spec = BaseSettingSpec
     BackupTargetSpec = BackupTargetSpec
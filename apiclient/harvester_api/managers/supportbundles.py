@@ -1,3 +1,4 @@
+from ..streams import save_response
 from .base import BaseManager
 
 
@@ -52,6 +53,18 @@ class SupportBundleManager(BaseManager):
 
         return resp.status_code, resp.content
 
+    def download_to(self, uid, dest, **kwargs):
+        ''' Download the bundle into `dest` chunk by chunk.
+
+        :param str | Path | IO dest: file path, directory or binary file object to write
+        :param kwargs: options of `streams.save_response`, e.g. `progress`, `checksums`
+        :return tuple[int, Download | dict]: status code and the result or error of the API
+        '''
+        resp = self._get(self.DL_fmt.format(uid=uid), raw=True, stream=True)
+        if not resp.ok:
+            return self._decode(resp)
+        return resp.status_code, save_response(resp, dest, **kwargs)
+
     def update(self, *args, **kwargs):
         raise NotImplementedError("Update Support Bundle is not allowed")
 
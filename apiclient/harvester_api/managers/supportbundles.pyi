@@ -1,7 +1,9 @@
-from typing import ClassVar, Optional, NoReturn, Tuple
+from typing import BinaryIO, ClassVar, Optional, NoReturn, Tuple
+from pathlib import Path
 
 from requests.models import Response
 
+from ..streams import Download
 from .base import BaseManager
 
 
@@ -38,6 +40,14 @@ class SupportBundleManager(BaseManager):
     def download(self, uid: str) -> Tuple[int, str]:
         """
         """
+    def download_to(
+        self,
+        uid: str,
+        dest: str | Path | BinaryIO,
+        **kwargs
+    ) -> Tuple[int, Download | dict]:
+        """
+        """
     def update(self, *args, **kwargs) -> NoReturn:
         """
         """
@@ -1,5 +1,6 @@
 from harvester_api.models.virtualmachines import VMSpec, VMSpec160, VMSpec180
 from .base import DEFAULT_NAMESPACE, BaseManager
+from ..views import VirtualMachineView
 
 
 class VirtualMachineManager(BaseManager):
@@ -11,6 +12,12 @@ class VirtualMachineManager(BaseManager):
     VMI_fmt = "v1/harvester/kubevirt.io.virtualmachineinstances/{ns}/{uid}"
     # operators: guestosinfo, console(ws), vnc(ws)
     VMIOP_fmt = "apis/subresources.{VM_API}/namespaces/{ns}/virtualmachineinstances/{uid}/{op}"
+    # watch
+    WATCH_fmt = "apis/kubevirt.io/v1/{ns}virtualmachines"
+    LIST_fmt = "v1/harvester/kubevirt.io.virtualmachines/{ns}"
+    LIST_KEY = "data"
+    VMI_WATCH_fmt = "apis/kubevirt.io/v1/{ns}virtualmachineinstances"
+    VIEW = VirtualMachineView
 
     Spec = VMSpec
 
@@ -25,6 +32,9 @@ class VirtualMachineManager(BaseManager):
             return resp.status_code, resp.content
 
     def get(self, name="", namespace=DEFAULT_NAMESPACE, *, raw=False, **kwargs):
+        cached = not (raw or kwargs) and self._cached(name, namespace)
+        if cached:
+            return cached
         path = self.PATH_fmt.format(uid=f"/{name}", ns=namespace)
         return self._get(path, raw=raw, **kwargs)
 
@@ -32,6 +42,9 @@ class VirtualMachineManager(BaseManager):
         path = self.VMI_fmt.format(uid=name, ns=namespace)
         return self._get(path, raw=raw, **kwargs)
 
+    def watch_status(self, name="", namespace=DEFAULT_NAMESPACE, **kwargs):
+        return self._watch_by(self.VMI_WATCH_fmt, name, namespace, **kwargs)
+
     def create(self, name, vm_spec, namespace=DEFAULT_NAMESPACE, *, raw=False):
         if isinstance(vm_spec, self.Spec):
             vm_spec = self.Spec.to_dict(vm_spec, name, namespace)
@@ -46,6 +59,22 @@ class VirtualMachineManager(BaseManager):
         path = self.PATH_fmt.format(uid=f"/{name}", ns=namespace)
         return self._update(path, vm_spec, raw=raw, as_json=as_json, **kwargs)
 
+    def patch(self, name, vm_spec, namespace=DEFAULT_NAMESPACE, *, old=None, raw=False,
+              **kwargs):
+        ''' Update the VM by the minimal merge patch instead of putting the whole object,
+        `resourceVersion` is the precondition and conflicts are retried with the latest VM.
+
+        :param VMSpec | dict | Callable[[dict], dict] vm_spec: the VM updated, or a function
+                                                               which updates a copy of the VM
+        :param dict old: the VM which `vm_spec` is updated from, e.g. got by `get`,
+                         the current VM is got if it is None
+        :param kwargs: options of `_apply_patch`, e.g. `retries`
+        '''
+        if isinstance(vm_spec, self.Spec):
+            vm_spec = self.Spec.to_dict(vm_spec, name, namespace)
+        path = self.PATH_fmt.format(uid=f"/{name}", ns=namespace)
+        return self._apply_patch(path, vm_spec, old=old, raw=raw, **kwargs)
+
     def delete(self, name, namespace=DEFAULT_NAMESPACE, *, raw=False, **kwargs):
         path = self.PATH_fmt.format(uid=f"/{name}", ns=namespace)
         return self._delete(path, raw=raw, **kwargs)
@@ -1,4 +1,4 @@
-from typing import ClassVar, Optional, Type
+from typing import Callable, ClassVar, Optional, Type
 
 from harvester_api.models.virtualmachines import VMSpec
 from .base import BaseManager
@@ -43,6 +43,18 @@ class VirtualMachineManager(BaseManager):
     ):
         """
         """
+    def patch(
+        self,
+        name: str,
+        vm_spec: VMSpec | dict | Callable[[dict], dict],
+        namespace: str = ...,
+        *,
+        old: Optional[dict] = ...,
+        raw: Optional[bool] = ...,
+        **kwargs
+    ):
+        """
+        """
     def delete(
         self,
         name: str,
@@ -1,14 +1,22 @@
 from harvester_api.models.volumes import VolumeSpec, VolumeSpec180
 from .base import DEFAULT_NAMESPACE, BaseManager, merge_dict
+from ..views import VolumeView
 
 
 class VolumeManager(BaseManager):
     # XXX: https://github.com/harvester/harvester/issues/3250
     PATH_fmt = "v1/harvester/persistentvolumeclaims/{ns}{uid}"
+    WATCH_fmt = "api/v1/{ns}persistentvolumeclaims"
+    LIST_fmt = "v1/harvester/persistentvolumeclaims/{ns}"
+    LIST_KEY = "data"
+    VIEW = VolumeView
 
     Spec = VolumeSpec
 
     def get(self, name="", namespace=DEFAULT_NAMESPACE, *, raw=False):
+        cached = not raw and self._cached(name, namespace)
+        if cached:
+            return cached
         path = self.PATH_fmt.format(uid=f"/{name}", ns=namespace)
         return self._get(path, raw=raw)
 
@@ -0,0 +1,271 @@
+import json
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import monotonic
+from urllib.parse import urlsplit
+
+#: Quantiles to be summarized, estimated from buckets
+QUANTILES = (0.5, 0.95, 0.99)
+#: Upper bounds (seconds) of buckets of the request duration histograms, `+Inf` is implied
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_manager = ContextVar("harvester_api_manager", default=None)
+
+
+@contextmanager
+def attributed(manager):
+    ''' Attribute requests in the block to the manager (name of its class) '''
+    token = _manager.set(type(manager).__name__)
+    try:
+        yield
+    finally:
+        _manager.reset(token)
+
+
+def path_template(path):
+    ''' Replace names in the path with placeholders, so requests of a kind are aggregated.
+
+    e.g. `apis/kubevirt.io/v1/namespaces/default/virtualmachines/vm1/status` to
+    `apis/kubevirt.io/v1/namespaces/{namespace}/virtualmachines/{name}/status`
+    '''
+    parts = [p for p in urlsplit(path).path.split("/") if p]
+    prefix = []
+    if parts[:2] == ["k8s", "clusters"]:
+        # Rancher proxy to the downstream cluster
+        prefix, parts = parts[:2] + ["{cluster}"], parts[3:]
+
+    if parts[:1] in (["api"], ["apis"]):
+        # Kubernetes: api/<version>/... or apis/<group>/<version>/...
+        size = 2 if "api" == parts[0] else 3
+        head, rest = parts[:size], parts[size:]
+        if rest[:1] == ["namespaces"] and len(rest) > 1:
+            head, rest = head + ["namespaces", "{namespace}"], rest[2:]
+        # <resource>/<name>/<subresource>
+        head += rest[:1] + ["{name}"] * bool(rest[1:]) + rest[2:]
+    else:
+        # Steve and Norman: v1/[harvester/]<type>/[<namespace>/]<name>, v3/<type>/<id>
+        size = 3 if parts[:2] == ["v1", "harvester"] else 2
+        head, rest = parts[:size], parts[size:]
+        if len(rest) <= 2:
+            head += ["{namespace}", "{name}"][2 - len(rest):]
+        else:
+            head += ["{id}"] * len(rest)
+    return "/".join(prefix + head)
+
+
+class RequestRecord:
+    ''' A request sent by the API, passed to hooks of the API
+
+    :ivar str manager: class name of the manager, None if sent by the API directly
+    :ivar str method: HTTP verb
+    :ivar str path: template of the path, see `path_template`
+    :ivar int status: status code, 0 if no response (e.g. connection error)
+    :ivar int sent: bytes of the request body
+    :ivar int received: bytes of the response body, from `Content-Length` for streamed responses
+    :ivar int retries: retries done by the adapter
+    :ivar float elapsed: wall seconds of the request
+    '''
+    __slots__ = ("manager", "method", "path", "status", "sent", "received", "retries", "elapsed")
+
+    def __init__(self, manager, method, path, status, sent, received, retries, elapsed):
+        self.manager = manager
+        self.method = method
+        self.path = path
+        self.status = status
+        self.sent = sent
+        self.received = received
+        self.retries = retries
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__} {self.method} {self.path} {self.status}"
+                f" in {self.elapsed:.3f}s>")
+
+
+def _length(body):
+    if body is None:
+        return 0
+    try:
+        return len(body)
+    except TypeError:
+        # generators
+        return 0
+
+
+def send(hooks, func, method, url, **kwargs):
+    ''' Call `func(url, **kwargs)` of the session, then call hooks with the `RequestRecord` '''
+    if not hooks:
+        return func(url, **kwargs)
+
+    started, resp = monotonic(), None
+    try:
+        resp = func(url, **kwargs)
+        return resp
+    finally:
+        elapsed = monotonic() - started
+        status = sent = received = retries = 0
+        if resp is not None:
+            status = resp.status_code
+            sent = _length(getattr(resp.request, 'body', None))
+            if kwargs.get('stream'):
+                received = int(resp.headers.get('Content-Length') or 0)
+            else:
+                received = len(resp.content or b"")
+            history = getattr(getattr(resp.raw, 'retries', None), 'history', None)
+            retries = len(history) if isinstance(history, tuple) else 0
+        record = RequestRecord(_manager.get(), method.upper(), path_template(url), status,
+                               sent, received, retries, elapsed)
+        for hook in hooks:
+            hook(record)
+
+
+class Histogram:
+    ''' Counts of values by buckets (Prometheus-style `le` upper bounds), with the sum, count and
+    max of values, so memory is fixed however many values are observed.
+    '''
+    __slots__ = ("bounds", "counts", "sum", "count", "max")
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last one is `+Inf`
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def cumulative(self):
+        ''' List of `(le, cumulative count)`, `le` is `inf` for the last bucket '''
+        total, rv = 0, []
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            rv.append((bound, total))
+        return rv
+
+    def quantile(self, q):
+        ''' Estimate the quantile by linear interpolation in the bucket holding it, as
+        `histogram_quantile` of Prometheus does, but never beyond the max observed value
+        '''
+        if not self.count:
+            return 0.0
+        rank, lower, seen = q * self.count, 0.0, 0
+        for bound, count in zip(self.bounds, self.counts):
+            if count and seen + count >= rank:
+                return min(lower + (bound - lower) * (rank - seen) / count, self.max)
+            lower, seen = bound, seen + count
+        return self.max
+
+
+class RequestMetrics:
+    ''' Hook of APIs which aggregates `RequestRecord`s by manager, method and path template
+    into histograms of the duration, and exports them as JSON or Prometheus text.
+    '''
+    def __init__(self, quantiles=QUANTILES, buckets=BUCKETS):
+        self.quantiles = quantiles
+        self.buckets = tuple(buckets)
+        self._lock = Lock()
+        self._elapsed = dict()
+        self._statuses = defaultdict(Counter)
+        self._bytes = defaultdict(Counter)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {len(self._elapsed)} kinds, {self.count} requests>"
+
+    def __call__(self, record):
+        key = (record.manager or "", record.method, record.path)
+        with self._lock:
+            histogram = self._elapsed.get(key)
+            if histogram is None:
+                histogram = self._elapsed[key] = Histogram(self.buckets)
+            histogram.observe(record.elapsed)
+            self._statuses[key][record.status] += 1
+            self._bytes[key].update(sent=record.sent, received=record.received,
+                                    retries=record.retries)
+
+    @property
+    def count(self):
+        with self._lock:
+            return sum(h.count for h in self._elapsed.values())
+
+    @property
+    def elapsed(self):
+        ''' Total wall seconds of requests, concurrent requests are counted separately '''
+        with self._lock:
+            return sum(h.sum for h in self._elapsed.values())
+
+    def reset(self):
+        with self._lock:
+            self._elapsed.clear()
+            self._statuses.clear()
+            self._bytes.clear()
+
+    def summary(self):
+        ''' List of aggregations, sorted by total seconds descending. `buckets` are cumulative
+        counts by upper bounds, quantiles (e.g. `p95`) are estimated from them.
+        '''
+        with self._lock:
+            items = [(k, h, h.cumulative(), dict(self._statuses[k]), dict(self._bytes[k]))
+                     for k, h in self._elapsed.items()]
+
+        rows = []
+        for (manager, method, path), histogram, buckets, statuses, counts in items:
+            row = dict(manager=manager, method=method, path=path, count=histogram.count,
+                       total=round(histogram.sum, 6), max=round(histogram.max, 6),
+                       statuses={str(k): v for k, v in sorted(statuses.items())},
+                       sent=counts.get('sent', 0), received=counts.get('received', 0),
+                       retries=counts.get('retries', 0),
+                       buckets={_le(b): c for b, c in buckets})
+            for q in self.quantiles:
+                row[f"p{q * 100:g}"] = round(histogram.quantile(q), 6)
+            rows.append(row)
+        return sorted(rows, key=lambda r: r['total'], reverse=True)
+
+    def to_json(self, **kwargs):
+        return json.dumps(dict(count=self.count, elapsed=round(self.elapsed, 6),
+                               requests=self.summary()), **kwargs)
+
+    def to_prometheus(self, prefix="harvester_api"):
+        ''' Prometheus text exposition format '''
+        def labels(row, **extra):
+            pairs = dict(manager=row['manager'], method=row['method'], path=row['path'], **extra)
+            return ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs.items())
+
+        rows = self.summary()
+        name = f"{prefix}_request_duration_seconds"
+        lines = [f"# HELP {name} Wall time of requests",
+                 f"# TYPE {name} histogram"]
+        for row in rows:
+            for le, count in row['buckets'].items():
+                lines.append(f"{name}_bucket{{{labels(row, le=le)}}} {count}")
+            lines.append(f"{name}_sum{{{labels(row)}}} {row['total']}")
+            lines.append(f"{name}_count{{{labels(row)}}} {row['count']}")
+
+        lines += [f"# HELP {prefix}_requests_total Requests by status, 0 for no response",
+                  f"# TYPE {prefix}_requests_total counter"]
+        for row in rows:
+            for status, count in row['statuses'].items():
+                lines.append(f"{prefix}_requests_total{{{labels(row, status=status)}}} {count}")
+
+        for name, key, desc in (("request_bytes", "sent", "Bytes of request bodies"),
+                                ("response_bytes", "received", "Bytes of response bodies"),
+                                ("request_retries", "retries", "Retries done by the adapter")):
+            lines += [f"# HELP {prefix}_{name}_total {desc}",
+                      f"# TYPE {prefix}_{name}_total counter"]
+            lines += [f"{prefix}_{name}_total{{{labels(row)}}} {row[key]}" for row in rows]
+        return "\n".join(lines) + "\n"
+
+
+def _le(bound):
+    return "+Inf" if bound == float("inf") else f"{bound:g}"
+
+
+def _escape(value):
+    return re.sub(r'(["\\])', r"\\\1", value).replace("\n", r"\n")
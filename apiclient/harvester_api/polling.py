@@ -0,0 +1,112 @@
+''' Poll many testees concurrently until each one is qualified, e.g.
+
+    results = poll_all(names, api_client.vms.get_status,
+                       lambda out: 200 == out[0] and "Running" == out[1]['status']['phase'],
+                       timeout=300, interval=3)
+    pending = [r.testee for r in results if not r.qualified]
+'''
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from heapq import heappop, heappush
+from time import monotonic, sleep
+
+#: Max concurrent polls by default
+MAX_WORKERS = 16
+#: Growth of the interval of a testee while its output is unchanged
+BACKOFF_FACTOR = 1.5
+
+
+class PollResult:
+    ''' Result of polling a testee
+
+    :ivar testee: the testee
+    :ivar bool qualified: the output of the testee is qualified by the checker
+    :ivar output: the last output of the poller
+    :ivar int polls: times the testee has been polled
+    :ivar float elapsed: seconds from the start to the last poll
+    '''
+    __slots__ = ("testee", "qualified", "output", "polls", "elapsed")
+
+    def __init__(self, testee):
+        self.testee = testee
+        self.qualified = False
+        self.output = None
+        self.polls = 0
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__} {self.testee!r} qualified={self.qualified}"
+                f" polls={self.polls} elapsed={self.elapsed:.1f}s>")
+
+
+def _poll(poller, checker, result, started):
+    ''' Poll the testee, return whether the output is changed since the last poll '''
+    output = poller(result.testee)
+    qualified = checker(output)
+    changed = 0 == result.polls or output != result.output
+    result.output, result.qualified = output, bool(qualified)
+    result.polls += 1
+    result.elapsed = monotonic() - started
+    return changed
+
+
+def poll_all(testees, poller, checker, timeout, interval=1, *, max_interval=None,
+             factor=BACKOFF_FACTOR, max_workers=MAX_WORKERS):
+    ''' Poll all testees on a bounded thread pool until each one is qualified or timed out.
+
+    Each testee is polled on its own schedule: the interval grows by `factor` (up to
+    `max_interval`) while its output is unchanged, and drops back to `interval` once the
+    output changes, so the interval is fixed unless `max_interval` is given. A testee is
+    always polled once more at the deadline before giving up.
+    Exceptions of `poller` and `checker` are propagated.
+
+    :param Iterable testees: testees to be polled
+    :param Callable poller: `poller(testee)` returns the output of the testee
+    :param Callable[[Any], bool] checker: `checker(output)` returns True if qualified
+    :param float timeout: seconds to poll
+    :param float interval: the initial (and minimal) seconds between polls of a testee
+    :param float max_interval: max seconds between polls of a testee, `interval` if None
+    :param float factor: growth of the interval while the output of a testee is unchanged
+    :param int max_workers: max concurrent polls
+    :return list[PollResult]: results in the order of testees
+    '''
+    results = [PollResult(t) for t in testees]
+    if not results:
+        return results
+    max_interval = interval if max_interval is None else max(max_interval, interval)
+    started = monotonic()
+    endtime = started + timeout
+    intervals = [interval] * len(results)
+    due = [(started, i) for i in range(len(results))]
+
+    with ThreadPoolExecutor(min(max_workers, len(results)),
+                            thread_name_prefix="harvester-poll") as executor:
+        running = dict()
+        try:
+            while due or running:
+                now = monotonic()
+                while due and due[0][0] <= now and len(running) < max_workers:
+                    _, i = heappop(due)
+                    running[executor.submit(_poll, poller, checker, results[i], started)] = i
+
+                snooze = None if not due or len(running) >= max_workers \
+                    else max(due[0][0] - now, 0)
+                if not running:
+                    sleep(snooze)
+                    continue
+                finished, _ = wait(running, snooze, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    i = running.pop(future)
+                    changed = future.result()
+                    now = monotonic()
+                    if results[i].qualified or now >= endtime:
+                        continue
+                    if changed:
+                        intervals[i] = interval
+                    else:
+                        intervals[i] = min(intervals[i] * factor, max_interval)
+                    heappush(due, (min(now + intervals[i], endtime), i))
+        finally:
+            for future in running:
+                future.cancel()
+    return results
@@ -0,0 +1,126 @@
+import random
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import monotonic
+
+from requests.packages.urllib3.exceptions import MaxRetryError, ResponseError
+from requests.packages.urllib3.util.retry import Retry
+
+#: Statuses to be retried by default
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+#: Statuses which the request is rejected before being processed,
+#: so they are safe to be retried for non-idempotent methods (e.g. POST actions)
+REJECTED_STATUSES = frozenset({429, 503})
+
+#: Monotonic endtime of the current deadline, None if there is no deadline
+_deadline = ContextVar("harvester_api_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    ''' Bound requests (including retries and their backoff) in the block to `seconds`.
+    Nested deadlines can only be shorter than the outer one.
+
+    :return float: the monotonic endtime, which might be earlier by an outer deadline
+    '''
+    outer = _deadline.get()
+    endtime = monotonic() + seconds
+    endtime = endtime if outer is None else min(outer, endtime)
+    token = _deadline.set(endtime)
+    try:
+        yield endtime
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    ''' Seconds left of the current deadline, None if there is no deadline '''
+    endtime = _deadline.get()
+    return None if endtime is None else endtime - monotonic()
+
+
+class RetryStats:
+    ''' Counters of retries, keyed by `(method, cause)` '''
+    def __init__(self):
+        self._lock = Lock()
+        self.retries = Counter()
+        self.exhausted = Counter()
+        self.backoff = 0.0
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__} retries={sum(self.retries.values())}"
+                f" exhausted={sum(self.exhausted.values())} backoff={self.backoff:.1f}s>")
+
+    def record(self, method, cause, backoff=0.0, exhausted=False):
+        with self._lock:
+            (self.exhausted if exhausted else self.retries)[(method, cause)] += 1
+            self.backoff += backoff
+
+    def as_dict(self):
+        with self._lock:
+            return dict(
+                retries={f"{m} {c}": n for (m, c), n in self.retries.items()},
+                exhausted={f"{m} {c}": n for (m, c), n in self.exhausted.items()},
+                backoff=round(self.backoff, 3)
+            )
+
+
+class SafeRetry(Retry):
+    ''' `Retry` which is aware of idempotency, jitters the capped backoff and
+    respects the `deadline` of the caller.
+
+    - Idempotent methods are retried on read errors and `status_forcelist`.
+    - Other methods (e.g. POST actions) are only retried on connection errors and
+      `REJECTED_STATUSES`, which the server hasn't processed the request.
+    - `Retry-After` is honoured, the retry gives up if it would overrun the deadline.
+
+    :ivar RetryStats stats: shared counters of the adapter
+    '''
+    def __init__(self, *args, stats=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+        self._backoff = None
+
+    def new(self, **kwargs):
+        kwargs.setdefault('stats', self.stats)
+        return super().new(**kwargs)
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if super().is_retry(method, status_code, has_retry_after):
+            return True
+        return bool(self.total) and status_code in REJECTED_STATUSES and (
+            has_retry_after or status_code in (self.status_forcelist or ())
+        )
+
+    def get_backoff_time(self):
+        # equal jitter: half fixed and half random, to spread retries of parallel callers
+        if self._backoff is None:
+            backoff = super().get_backoff_time()
+            self._backoff = backoff / 2 + random.uniform(0, backoff / 2)
+        return self._backoff
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None,
+                  _stacktrace=None):
+        cause = type(error).__name__ if error else getattr(response, 'status', None)
+        try:
+            new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        except MaxRetryError:
+            if self.stats is not None:
+                self.stats.record(method, cause, exhausted=True)
+            raise
+
+        wait = new_retry.get_backoff_time()
+        if response is not None and self.respect_retry_after_header:
+            wait = max(wait, new_retry.get_retry_after(response) or 0)
+        left = remaining()
+        if left is not None and wait >= left:
+            if self.stats is not None:
+                self.stats.record(method, cause, exhausted=True)
+            reason = error or ResponseError(f"deadline exceeded after {cause}")
+            raise MaxRetryError(_pool, url, reason) from reason
+
+        if self.stats is not None:
+            self.stats.record(method, cause, wait)
+        return new_retry
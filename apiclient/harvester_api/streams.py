@@ -0,0 +1,336 @@
+import hashlib
+import json
+import os
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+from uuid import uuid4
+
+#: Bytes to read from the file per chunk
+CHUNK_SIZE = 1 << 20
+#: Hash algorithms to compute while downloading
+CHECKSUMS = ("sha256", "sha512")
+#: Number of concurrent ranges to download
+RANGE_PARTS = 4
+
+
+class MultipartFileStream:
+    ''' `multipart/form-data` body of a single file which is read chunk by chunk.
+
+    The body is passed as `data` to requests, so it is sent as the file is read
+    with constant memory, and `Content-Length` is known in advance via `len()`.
+    Iterating again (e.g. on retries) re-reads the file from the beginning.
+    '''
+    def __init__(self, filepath, field="chunk", *, filename=None, chunk_size=CHUNK_SIZE,
+                 progress=None, checksum="sha512"):
+        '''
+        :param str | Path filepath: path of the file to be sent
+        :param str field: name of the form field
+        :param str filename: filename of the form field, base name of `filepath` by default
+        :param int chunk_size: bytes to read from the file per chunk
+        :param Callable[[int, int], None] progress: be called as `progress(sent, total)`
+                                                    after each chunk of the file is sent
+        :param str checksum: name of hash algorithm to compute while sending, None to disable
+        '''
+        self.path = Path(filepath).expanduser()
+        self.size = self.path.stat().st_size
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.checksum = checksum
+        self.hash = None
+
+        self.boundary = uuid4().hex
+        filename = (filename or self.path.name).replace('"', '%22')
+        self._head = (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode()
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} of {str(self.path)!r}, {len(self)} bytes>"
+
+    def __len__(self):
+        return len(self._head) + self.size + len(self._tail)
+
+    def __iter__(self):
+        self.hash = hashlib.new(self.checksum) if self.checksum else None
+        sent = 0
+        yield self._head
+        with self.path.open('rb') as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                if self.hash is not None:
+                    self.hash.update(chunk)
+                yield chunk
+                sent += len(chunk)
+                if self.progress is not None:
+                    self.progress(sent, self.size)
+        yield self._tail
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def hexdigest(self):
+        ''' Checksum of the file content which has been sent '''
+        return self.hash.hexdigest() if self.hash is not None else None
+
+
+def filename_of(resp):
+    ''' Filename from `Content-Disposition` header of the response, or empty string '''
+    matched = re.search(r'filename="?([^";]+)"?', resp.headers.get("Content-Disposition", ""))
+    return matched.group(1).strip() if matched else ""
+
+
+class Download:
+    ''' Result of `save_response`
+
+    :ivar str filename: filename from the response, without `.gz` when decompressed
+    :ivar Path path: written file, None when written to a file object
+    :ivar int size: bytes written
+    :ivar int received: bytes received from the network
+    :ivar dict digests: `{algorithm: hexdigest}` of the written content
+    :ivar float elapsed: seconds spent on the download
+    :ivar int parts: number of ranges downloaded concurrently, 1 for single stream
+    '''
+    def __init__(self, filename, path, size, received, digests, elapsed=None, parts=1):
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.received = received
+        self.digests = digests
+        self.elapsed = elapsed
+        self.parts = parts
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__} {self.filename!r}, {self.size} bytes"
+                f" in {self.parts} part(s), {self.throughput or 0:.0f} B/s>")
+
+    @property
+    def throughput(self):
+        ''' Bytes per second received from the network '''
+        if self.elapsed:
+            return self.received / self.elapsed
+
+    @property
+    def sha256(self):
+        return self.digests.get("sha256")
+
+    @property
+    def sha512(self):
+        return self.digests.get("sha512")
+
+
+class _GzipDecoder:
+    ''' Incremental gzip decoder which supports concatenated members '''
+    def __init__(self):
+        self._d = zlib.decompressobj(32 + zlib.MAX_WBITS)
+
+    def decompress(self, data):
+        out = []
+        while data:
+            out.append(self._d.decompress(data))
+            data = self._d.unused_data
+            if data:
+                self._d = zlib.decompressobj(32 + zlib.MAX_WBITS)
+        return b"".join(out)
+
+    def flush(self):
+        return self._d.flush()
+
+
+def save_response(resp, dest, *, chunk_size=CHUNK_SIZE, decompress=None, checksums=CHECKSUMS,
+                  progress=None):
+    ''' Write body of the streamed response (`stream=True`) to `dest` chunk by chunk.
+
+    :param Response resp: the response to be consumed
+    :param str | Path | IO dest: file path, directory (filename of the response will be used)
+                                 or binary file object to write
+    :param int chunk_size: bytes to read from the network per chunk
+    :param bool decompress: decompress gzip content, None to decompress `.gz` files only
+    :param tuple checksums: hash algorithms to compute on the written content
+    :param Callable[[int, int], None] progress: be called as `progress(received, total)`,
+                                                total is 0 when it is unknown
+    :return Download: the result
+    '''
+    started = monotonic()
+    filename, decompress = _target_name(resp, decompress)
+    decoder = _GzipDecoder() if decompress else None
+    hashes = [hashlib.new(algo) for algo in checksums]
+    total = int(resp.headers.get("Content-Length", 0))
+    size = received = 0
+
+    with ExitStack() as stack:
+        stack.callback(resp.close)
+        path = None
+        if hasattr(dest, "write"):
+            fp = dest
+        else:
+            path = Path(dest).expanduser()
+            if path.is_dir():
+                path = path / (filename or "download")
+            fp = stack.enter_context(path.open("wb"))
+
+        def write(data):
+            for h in hashes:
+                h.update(data)
+            fp.write(data)
+            return len(data)
+
+        for chunk in resp.iter_content(chunk_size):
+            received += len(chunk)
+            size += write(decoder.decompress(chunk) if decoder else chunk)
+            if progress is not None:
+                progress(received, total)
+        if decoder:
+            size += write(decoder.flush())
+        fp.flush()
+
+    return Download(filename, path, size, received, {h.name: h.hexdigest() for h in hashes},
+                    monotonic() - started)
+
+
+def _target_name(resp, decompress):
+    filename = filename_of(resp)
+    if decompress is None:
+        decompress = filename.endswith(".gz")
+    if decompress and filename.endswith(".gz"):
+        filename = filename[:-len(".gz")]
+    return filename, decompress
+
+
+def range_total(resp):
+    ''' Total size from `Content-Range` of the partial response, None if ranges unsupported '''
+    matched = re.match(r"bytes\s+[\d*-]+/(\d+)", resp.headers.get("Content-Range", ""))
+    if 206 == resp.status_code and matched:
+        return int(matched.group(1))
+
+
+def save_ranges(probe, fetch, dest, *, parts=RANGE_PARTS, chunk_size=CHUNK_SIZE,
+                decompress=None, checksums=CHECKSUMS, progress=None):
+    ''' Download byte ranges concurrently into a preallocated (sparse) file.
+
+    Falls back to `save_response` with a single stream when the server doesn't support ranges
+    or `dest` is a file object. As ranges arrive out of order, checksums (and decompression)
+    are done by reading the file sequentially after all ranges are written.
+
+    :param Response probe: response of the request with header `Range: bytes=0-0`
+    :param Callable fetch: `fetch(headers=...)` to request the same URL with `stream=True`
+    :param str | Path | IO dest: file path, directory or binary file object to write
+    :param int parts: number of ranges to download concurrently
+    :return Download: the result, `parts` is 1 when it fell back to a single stream
+    '''
+    started = monotonic()
+    total = range_total(probe)
+    opts = dict(chunk_size=chunk_size, decompress=decompress, checksums=checksums,
+                progress=progress)
+    if total is None:
+        # the whole content is in the probe
+        return save_response(probe, dest, **opts)
+    if hasattr(dest, "write"):
+        probe.close()
+        return save_response(fetch(), dest, **opts)
+
+    filename, decompress = _target_name(probe, decompress)
+    probe.close()
+    path = Path(dest).expanduser()
+    if path.is_dir():
+        path = path / (filename or "download")
+    raw_path = path.with_name(path.name + ".part") if decompress else path
+
+    with raw_path.open("wb") as f:
+        f.truncate(total)
+
+    lock, received = Lock(), [0]
+
+    def fetch_range(start, end):
+        resp = fetch(headers={"Range": f"bytes={start}-{end}"})
+        with resp, raw_path.open("r+b") as f:
+            if 206 != resp.status_code:
+                raise OSError(f"Range {start}-{end} failed with {resp.status_code}")
+            f.seek(start)
+            for chunk in resp.iter_content(chunk_size):
+                f.write(chunk)
+                with lock:
+                    received[0] += len(chunk)
+                    if progress is not None:
+                        progress(received[0], total)
+            if f.tell() != end + 1:
+                raise OSError(f"Range {start}-{end} is incomplete, got {f.tell() - start} bytes")
+
+    parts = max(1, min(parts, total))
+    step = max(1, -(-total // parts))
+    ranges = [(s, min(s + step, total) - 1) for s in range(0, total, step)]
+    with ThreadPoolExecutor(len(ranges) or 1) as executor:
+        for future in [executor.submit(fetch_range, *r) for r in ranges]:
+            future.result()
+    elapsed = monotonic() - started
+
+    decoder = _GzipDecoder() if decompress else None
+    hashes = [hashlib.new(algo) for algo in checksums]
+    size = 0
+    with ExitStack() as stack:
+        src = stack.enter_context(raw_path.open("rb"))
+        dst = stack.enter_context(path.open("wb")) if decoder else None
+
+        def write(data):
+            for h in hashes:
+                h.update(data)
+            if dst is not None:
+                dst.write(data)
+            return len(data)
+
+        for chunk in iter(lambda: src.read(chunk_size), b""):
+            size += write(decoder.decompress(chunk) if decoder else chunk)
+        if decoder:
+            size += write(decoder.flush())
+    if decoder:
+        raw_path.unlink()
+
+    return Download(filename, path, size, received[0], {h.name: h.hexdigest() for h in hashes},
+                    elapsed, len(ranges))
+
+
+class UploadState:
+    ''' JSON file to persist finished uploads, keyed by `namespace/name`.
+
+    A record is only valid for the same file (size and mtime), so a changed file
+    will be uploaded again.
+    '''
+    def __init__(self, path):
+        self.path = Path(path).expanduser()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({str(self.path)!r})"
+
+    def _load(self):
+        try:
+            return json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            return dict()
+
+    @staticmethod
+    def fingerprint(filepath):
+        stat = Path(filepath).expanduser().stat()
+        return dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    def get(self, key, filepath):
+        ''' Record of the key if it was uploaded from the same file, otherwise None '''
+        record = self._load().get(key)
+        if record and record.get('file') == self.fingerprint(filepath):
+            return record
+
+    def set(self, key, filepath, **record):
+        states = self._load()
+        states[key] = dict(record, file=self.fingerprint(filepath))
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}")
+        tmp.write_text(json.dumps(states, indent=2))
+        os.replace(tmp, self.path)
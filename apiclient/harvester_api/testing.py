@@ -0,0 +1,411 @@
+''' In-process stand-in of the Harvester API for tests and benchmarks of the client.
+
+`FakeHarvester` serves Steve (`v1/harvester/...`) and Kubernetes (`api/...`, `apis/...`) paths
+from in-memory objects, and a ticker advances their states as the cluster would:
+
+- images of `download` source rise `status.progress` to 100 in `image_seconds`
+- VMs to run go Starting to Running in `vm_seconds`, with the VMI of the VM
+- volumes go Pending to Bound in `volume_seconds`
+'''
+import json
+from collections import deque
+from copy import deepcopy
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from threading import Condition, Event, Thread
+from time import monotonic
+from urllib.parse import urlsplit, parse_qsl
+from uuid import uuid4
+
+
+#: Kinds which are not namespaced, named as Steve types
+CLUSTER_KINDS = frozenset({
+    "nodes", "namespaces", "persistentvolumes", "harvesterhci.io.settings",
+    "storage.k8s.io.storageclasses", "network.harvesterhci.io.clusternetworks",
+    "harvesterhci.io.addons", "kubevirt.io.kubevirts"
+})
+#: Statuses of VMs which are running
+RUN_STRATEGIES = frozenset({"Always", "RerunOnFailure"})
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _merge_patched(obj, patch):
+    ''' Apply the JSON merge patch (RFC 7386) to the object '''
+    if not isinstance(patch, dict):
+        return patch
+    obj = dict(obj) if isinstance(obj, dict) else dict()
+    for k, v in patch.items():
+        if v is None:
+            obj.pop(k, None)
+        else:
+            obj[k] = _merge_patched(obj.get(k), v)
+    return obj
+
+
+def route(path):
+    ''' Parse the path into `(style, kind, namespace, name, subresource)`, style is
+    `steve` or `k8s`, kind is named as Steve types (e.g. `kubevirt.io.virtualmachines`).
+    '''
+    parts = [p for p in urlsplit(path).path.split("/") if p]
+    if parts[:1] in (["api"], ["apis"]):
+        size = 2 if "api" == parts[0] else 3
+        group, rest = ("" if "api" == parts[0] else parts[1]), parts[size:]
+        namespace = None
+        if rest[:1] == ["namespaces"] and len(rest) > 2:
+            namespace, rest = rest[1], rest[2:]
+        if not rest:
+            return None
+        kind = f"{group}.{rest[0]}" if group else rest[0]
+        if "namespaces" == kind and len(rest) > 1:
+            # the namespace itself, e.g. api/v1/namespaces/default
+            return "k8s", kind, None, rest[1], None
+        return "k8s", kind, namespace, (rest[1:2] or [None])[0], (rest[2:3] or [None])[0]
+
+    if parts[:1] == ["v1"]:
+        rest = parts[2:] if parts[1:2] == ["harvester"] else parts[1:]
+        if not rest:
+            return None
+        kind, rest = rest[0], rest[1:]
+        if kind in CLUSTER_KINDS:
+            return "steve", kind, None, (rest[:1] or [None])[0], (rest[1:2] or [None])[0]
+        return ("steve", kind, (rest[:1] or [None])[0], (rest[1:2] or [None])[0],
+                (rest[2:3] or [None])[0])
+
+
+class FakeHarvester:
+    ''' In-memory Harvester API served on localhost, use as a context manager or
+    `start()`/`stop()`; `endpoint` is the URL to be passed to `HarvesterAPI`.
+
+    :ivar dict objects: `{(kind, namespace, name): object}` of the cluster
+    :ivar list requests: `(method, path)` of received requests
+    '''
+    def __init__(self, *, version="v1.4.0", image_seconds=1.0, vm_seconds=1.0,
+                 volume_seconds=0.5, tick=0.05):
+        '''
+        :param str version: value of setting `server-version`
+        :param float image_seconds: seconds for downloading images to 100%
+        :param float vm_seconds: seconds for VMs from Starting to Running
+        :param float volume_seconds: seconds for volumes from Pending to Bound
+        :param float tick: seconds between state updates
+        '''
+        self.image_seconds = image_seconds
+        self.vm_seconds = vm_seconds
+        self.volume_seconds = volume_seconds
+        self.tick = tick
+        self.objects = dict()
+        self.requests = []
+        self._since = dict()
+        self._events = deque(maxlen=10000)
+        self._revision = count(1)
+        self._cond = Condition()
+        self._stopped = Event()
+        self._server = self._threads = None
+
+        self.put("harvesterhci.io.settings", None, dict(metadata=dict(name="server-version"),
+                                                        value=version))
+        self.put("nodes", None, dict(
+            metadata=dict(name="fake-node", labels={"kubernetes.io/hostname": "fake-node"}),
+            status=dict(conditions=[dict(type="Ready", status="True")])
+        ))
+        for ns in ("default", "harvester-system"):
+            self.put("namespaces", None, dict(metadata=dict(name=ns)))
+        self.put("storage.k8s.io.storageclasses", None, dict(
+            metadata=dict(name="harvester-longhorn", annotations={
+                "storageclass.kubernetes.io/is-default-class": "true"}),
+            provisioner="driver.longhorn.io"
+        ))
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.endpoint} {len(self.objects)} objects>"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def endpoint(self):
+        if self._server is None:
+            return None
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._stopped.clear()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._threads = [Thread(target=self._server.serve_forever, daemon=True),
+                         Thread(target=self._ticker, daemon=True)]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        for t in self._threads:
+            t.join()
+
+    # objects
+    def put(self, kind, namespace, obj, event="ADDED"):
+        ''' Store the object with a new `resourceVersion`, and notify watchers '''
+        meta = obj.setdefault('metadata', dict())
+        if namespace is not None:
+            meta['namespace'] = namespace
+        key = (kind, meta.get('namespace'), meta['name'])
+        with self._cond:
+            rev = next(self._revision)
+            meta['resourceVersion'] = str(rev)
+            meta.setdefault('uid', str(uuid4()))
+            meta.setdefault('creationTimestamp', _now())
+            obj['id'] = "/".join(filter(None, key[1:]))
+            self.objects[key] = obj
+            self._since.setdefault(key, monotonic())
+            self._events.append((rev, kind, event, deepcopy(obj)))
+            self._cond.notify_all()
+        return obj
+
+    def pop(self, kind, namespace, name):
+        key = (kind, namespace, name)
+        with self._cond:
+            obj = self.objects.pop(key, None)
+            self._since.pop(key, None)
+            if obj is not None:
+                self._events.append((next(self._revision), kind, "DELETED", deepcopy(obj)))
+                self._cond.notify_all()
+        return obj
+
+    def get(self, kind, namespace, name):
+        with self._cond:
+            obj = self.objects.get((kind, namespace, name))
+            return deepcopy(obj) if obj is not None else None
+
+    def list(self, kind, namespace=None):
+        with self._cond:
+            items = sorted(self.objects.items(), key=lambda kv: tuple(map(str, kv[0])))
+            return [deepcopy(o) for (k, ns, _), o in items
+                    if k == kind and (namespace is None or ns == namespace)]
+
+    # simulation
+    def _ticker(self):
+        while not self._stopped.wait(self.tick):
+            with self._cond:
+                items = list(self.objects.items())
+            for key, obj in items:
+                obj = deepcopy(obj)
+                if self._advance(key, obj, monotonic() - self._since.get(key, monotonic())):
+                    self.put(key[0], key[1], obj, "MODIFIED")
+
+    def _advance(self, key, obj, age):
+        advance = getattr(self, f"_advance_{key[0].rsplit('.', 1)[-1]}", None)
+        return advance is not None and advance(key, obj, age)
+
+    def _advance_virtualmachineimages(self, key, obj, age):
+        status = obj.setdefault('status', dict())
+        if "upload" == obj.get('spec', {}).get('sourceType') and not status.get('uploaded'):
+            return False
+        progress = min(100, int(100 * age / self.image_seconds)) if self.image_seconds else 100
+        if progress == status.get('progress'):
+            return False
+        status['progress'] = progress
+        if 100 == progress:
+            status.update(size=10 << 20, storageClassName=f"longhorn-{key[2]}", conditions=[
+                dict(type="Imported", status="True"), dict(type="Initialized", status="True")
+            ])
+        return True
+
+    def _advance_virtualmachines(self, key, obj, age):
+        spec, status = obj.setdefault('spec', dict()), obj.setdefault('status', dict())
+        running = spec.get('running') or spec.get('runStrategy') in RUN_STRATEGIES
+        vmi_key = ("kubevirt.io.virtualmachineinstances", key[1], key[2])
+        if not running:
+            if vmi_key in self.objects:
+                self.pop(*vmi_key)
+            changed = "Stopped" != status.get('printableStatus')
+            status.update(printableStatus="Stopped", ready=False, created=False)
+            if changed:
+                self._since[key] = monotonic()
+            return changed
+
+        started = status.get('printableStatus') in ("Starting", "Running")
+        if not started:
+            self._since[key], age = monotonic(), 0
+        phase = "Running" if age >= self.vm_seconds else "Starting"
+        if started and phase == status['printableStatus']:
+            return False
+        status.update(printableStatus=phase, created=True, ready="Running" == phase)
+        self.put(*vmi_key[:2], dict(
+            metadata=dict(name=key[2], labels={"kubevirt.io/nodeName": "fake-node"}),
+            status=dict(phase="Running" if "Running" == phase else "Scheduling",
+                        nodeName="fake-node",
+                        interfaces=[dict(name="default", ipAddress="10.52.0.100")])
+        ), "MODIFIED" if vmi_key in self.objects else "ADDED")
+        return True
+
+    def _advance_persistentvolumeclaims(self, key, obj, age):
+        status = obj.setdefault('status', dict())
+        phase = "Bound" if age >= self.volume_seconds else "Pending"
+        if phase == status.get('phase'):
+            return False
+        status['phase'] = phase
+        return True
+
+    # requests
+    def handle(self, method, path, query, body):
+        ''' Return `(status, payload)` of the request, payload is an iterator of watch events
+        for watch requests.
+        '''
+        self.requests.append((method, path))
+        if "POST" == method and "login" == query.get('action') and path.startswith("/v3-public"):
+            return 201, dict(token="fake-token")
+        routed = route(path)
+        if routed is None:
+            return 404, dict(code="NotFound", message=f"{path} not found")
+        style, kind, namespace, name, sub = routed
+
+        if "GET" == method and name is None:
+            if query.get('watch') in ("true", "1"):
+                return 200, self._watch(kind, namespace, query)
+            items = self.list(kind, namespace)
+            for k, v in (q.split("=", 1) for q in query.get('labelSelector', "").split(",")
+                         if "=" in q):
+                items = [o for o in items if o['metadata'].get('labels', {}).get(k) == v]
+            if "steve" == style:
+                return 200, dict(type="collection", resourceType=kind, data=items)
+            return 200, dict(kind="List", items=items,
+                             metadata=dict(resourceVersion=str(next(self._revision))))
+
+        if "POST" == method and query.get('action'):
+            return self._action(kind, namespace, name, query['action'], body)
+        if "POST" == method:
+            return self._create(kind, namespace, body)
+
+        obj = self.get(kind, namespace, name)
+        if obj is None:
+            return 404, dict(code="NotFound", message=f"{kind} {namespace}/{name} not found")
+        if "GET" == method:
+            return 200, obj
+        if "DELETE" == method:
+            if "kubevirt.io.virtualmachines" == kind:
+                self.pop("kubevirt.io.virtualmachineinstances", namespace, name)
+            return 200, self.pop(kind, namespace, name)
+
+        data = json.loads(body or b"{}")
+        if "PATCH" == method:
+            data = _merge_patched(obj, data)
+        rv = data.get('metadata', {}).get('resourceVersion')
+        if rv and rv != obj['metadata']['resourceVersion']:
+            return 409, dict(code="Conflict", reason="Conflict",
+                             message=f"the object has been modified: {namespace}/{name}")
+        data.setdefault('metadata', dict()).update(name=name, uid=obj['metadata']['uid'])
+        return 200, self.put(kind, namespace, data, "MODIFIED")
+
+    def _create(self, kind, namespace, body):
+        data = json.loads(body or b"{}")
+        meta = data.setdefault('metadata', dict())
+        if kind in CLUSTER_KINDS:
+            meta.pop('namespace', None)
+        else:
+            meta.setdefault('namespace', namespace or "default")
+        if not meta.get('name') and meta.get('generateName'):
+            meta['name'] = meta['generateName'] + uuid4().hex[:5]
+        if not meta.get('name'):
+            return 422, dict(code="Invalid", message="metadata.name is required")
+        if self.get(kind, meta.get('namespace'), meta['name']) is not None:
+            return 409, dict(code="AlreadyExists", reason="AlreadyExists",
+                             message=f"{kind} {meta['name']} already exists")
+        meta.pop('resourceVersion', None)
+        # initial status, e.g. Pending of volumes
+        self._advance((kind, meta.get('namespace'), meta['name']), data, 0)
+        return 201, self.put(kind, meta.get('namespace'), data)
+
+    def _action(self, kind, namespace, name, action, body):
+        obj = self.get(kind, namespace, name)
+        if obj is None:
+            return 404, dict(code="NotFound", message=f"{kind} {namespace}/{name} not found")
+        if "virtualmachineimages" in kind and "upload" == action:
+            obj.setdefault('status', dict())['uploaded'] = True
+        elif "virtualmachines" in kind and action in ("start", "stop", "restart"):
+            spec = obj.setdefault('spec', dict())
+            spec.pop('running', None)
+            spec['runStrategy'] = "Halted" if "stop" == action else "RerunOnFailure"
+            if "restart" == action:
+                obj.setdefault('status', dict())['printableStatus'] = "Stopped"
+        else:
+            return 400, dict(code="InvalidAction", message=f"action {action} not supported")
+        self.put(kind, namespace, obj, "MODIFIED")
+        return 204, None
+
+    def _watch(self, kind, namespace, query):
+        endtime = monotonic() + float(query.get('timeoutSeconds') or 5)
+        bookmarks = "true" == query.get('allowWatchBookmarks')
+        since = int(query.get('resourceVersion') or 0)
+        if not since:
+            with self._cond:
+                since = self._events[-1][0] if self._events else 0
+                current = self.list(kind, namespace)
+            for obj in current:
+                yield dict(type="ADDED", object=obj)
+
+        idle = monotonic()
+        while not self._stopped.is_set() and endtime > monotonic():
+            with self._cond:
+                events = [e for e in self._events if e[0] > since and e[1] == kind
+                          and namespace in (None, e[3]['metadata'].get('namespace'))]
+                if not events:
+                    self._cond.wait(min(self.tick, max(0, endtime - monotonic())))
+            if not events and bookmarks and monotonic() - idle > 10 * self.tick:
+                # keep the stream active, so the client is able to close it in time
+                idle = monotonic()
+                yield dict(type="BOOKMARK",
+                           object=dict(metadata=dict(resourceVersion=str(since))))
+            for rev, _, event, obj in events:
+                idle, since = monotonic(), rev
+                yield dict(type=event, object=obj)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _dispatch(self):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        code, payload = self.server.fake.handle(self.command, parts.path,
+                                                dict(parse_qsl(parts.query)), body)
+        if payload is not None and not isinstance(payload, (dict, list)):
+            # watch events, in chunked encoding as the API server
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for event in payload:
+                    line = json.dumps(event).encode() + b"\n"
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+            return
+
+        data = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
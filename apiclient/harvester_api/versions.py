@@ -0,0 +1,25 @@
+from functools import lru_cache
+
+from packaging.version import InvalidVersion, Version
+
+__all__ = ["InvalidVersion", "Version", "parse_version"]
+
+
+@lru_cache(maxsize=256)
+def _parse(version):
+    return Version(version)
+
+
+def parse_version(version):
+    ''' Parse the version by `packaging`, results are cached as versions are parsed repeatedly
+    when resolving managers.
+
+    Unlike `pkg_resources.parse_version`, invalid versions raise `InvalidVersion` instead of
+    falling back to legacy versions; version objects of other libraries are parsed from `str`.
+
+    :param str | Version version: the version
+    :return Version: the parsed version
+    '''
+    if isinstance(version, Version):
+        return version
+    return _parse(str(version))
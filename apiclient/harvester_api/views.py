@@ -0,0 +1,212 @@
+from collections.abc import Mapping
+
+from .codecs import DecodeError, loads
+
+
+class Condition:
+    ''' Condition of a resource, from `status.conditions` '''
+    __slots__ = ("type", "status", "reason", "message")
+
+    def __init__(self, type, status, reason="", message=""):
+        self.type = type
+        self.status = status
+        self.reason = reason
+        self.message = message
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.type}={self.status}>"
+
+    def __bool__(self):
+        return "True" == str(self.status)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('type'), data.get('status'),
+                   data.get('reason') or "", data.get('message') or "")
+
+
+def _path(data, *keys, default=None):
+    for key in keys:
+        if not isinstance(data, Mapping):
+            return default
+        data = data.get(key)
+    return default if data is None else data
+
+
+class ResourceView:
+    ''' Read-only view of an object, only fields commonly used are extracted and kept, use
+    `get` of the manager for the whole object.
+
+    Views of all kinds have `name`, `namespace`, `uid`, `resource_version`, `phase`, `node`,
+    `ips` and `conditions` (empty or None when unavailable to the kind).
+    '''
+    __slots__ = ("name", "namespace", "uid", "resource_version", "phase", "node", "ips",
+                 "conditions")
+
+    def __init__(self, data):
+        ''' :param dict data: object of Kubernetes API or dashboard API (Steve) '''
+        metadata = data.get('metadata', {})
+        fields = dict(name=metadata.get('name'), namespace=metadata.get('namespace'),
+                      uid=metadata.get('uid'), resource_version=metadata.get('resourceVersion'),
+                      phase=None, node=None, ips=(),
+                      conditions=tuple(Condition.from_dict(c)
+                                       for c in _path(data, 'status', 'conditions', default=())
+                                       if isinstance(c, dict)))
+        fields.update(self._extract(data))
+        for key, value in fields.items():
+            object.__setattr__(self, key, value)
+
+    def _extract(self, data):
+        ''' Return `{field: value}` of the kind, to be re-defined in derived class '''
+        return dict()
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{self.__class__.__name__} is read-only")
+
+    __delattr__ = __setattr__
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.namespace}/{self.name} {self.phase}>"
+
+    def __eq__(self, other):
+        if not isinstance(other, ResourceView):
+            return NotImplemented
+        return (type(self), self.uid, self.resource_version) == \
+            (type(other), other.uid, other.resource_version)
+
+    def __hash__(self):
+        return hash((type(self), self.uid, self.resource_version))
+
+    def __reduce__(self):
+        fields = {k: getattr(self, k) for c in type(self).__mro__
+                  for k in getattr(c, '__slots__', ())}
+        return _rebuild, (type(self), fields)
+
+    def condition(self, type):
+        ''' Return the condition of the type, None if it is absent
+
+        :param str type: type of the condition, e.g. `Ready`
+        :return Optional[Condition]: the condition
+        '''
+        for c in self.conditions:
+            if type == c.type:
+                return c
+        return None
+
+
+def _rebuild(cls, fields):
+    view = object.__new__(cls)
+    for key, value in fields.items():
+        object.__setattr__(view, key, value)
+    return view
+
+
+class VirtualMachineView(ResourceView):
+    ''' View of `kubevirt.io/v1` VirtualMachine, `phase` is its printable status '''
+    __slots__ = ("ready", "run_strategy")
+
+    def _extract(self, data):
+        spec, status = data.get('spec', {}), data.get('status', {})
+        strategy = spec.get('runStrategy')
+        if strategy is None and 'running' in spec:
+            strategy = "Always" if spec['running'] else "Halted"
+        return dict(phase=status.get('printableStatus'), ready=bool(status.get('ready')),
+                    run_strategy=strategy)
+
+
+class VirtualMachineInstanceView(ResourceView):
+    ''' View of `kubevirt.io/v1` VirtualMachineInstance, `ips` are of its interfaces '''
+    __slots__ = ("interfaces",)
+
+    def _extract(self, data):
+        status = data.get('status', {})
+        interfaces = tuple((i.get('name'), i.get('ipAddress'))
+                           for i in status.get('interfaces', []))
+        return dict(phase=status.get('phase'), node=status.get('nodeName'),
+                    ips=tuple(ip for _, ip in interfaces if ip), interfaces=interfaces)
+
+
+class ImageView(ResourceView):
+    ''' View of VirtualMachineImage, `phase` is `Imported`, `Failed` or `Importing` '''
+    __slots__ = ("display_name", "progress", "size", "storage_class")
+
+    def _extract(self, data):
+        spec, status = data.get('spec', {}), data.get('status', {})
+        imported = next((c for c in status.get('conditions', [])
+                         if "Imported" == c.get('type')), {})
+        if "True" == imported.get('status'):
+            phase = "Imported"
+        elif "False" == imported.get('status') and imported.get('reason'):
+            phase = "Failed"
+        else:
+            phase = "Importing"
+        return dict(phase=phase, display_name=spec.get('displayName'),
+                    progress=status.get('progress', 0), size=status.get('size'),
+                    storage_class=status.get('storageClassName'))
+
+
+class VolumeView(ResourceView):
+    ''' View of PersistentVolumeClaim, `phase` is `Pending`, `Bound` or `Lost` '''
+    __slots__ = ("size", "storage_class", "volume_name")
+
+    def _extract(self, data):
+        spec, status = data.get('spec', {}), data.get('status', {})
+        return dict(phase=status.get('phase'),
+                    size=_path(spec, 'resources', 'requests', 'storage'),
+                    storage_class=spec.get('storageClassName'),
+                    volume_name=spec.get('volumeName'))
+
+
+class HostView(ResourceView):
+    ''' View of Node, `phase` is `Ready` or `NotReady`, `ips` are its internal IPs,
+    `node_args` are arguments of RKE2 on it
+    '''
+    __slots__ = ("roles", "unschedulable", "maintenance", "node_args")
+
+    def _extract(self, data):
+        metadata, status = data.get('metadata', {}), data.get('status', {})
+        ready = next((c for c in status.get('conditions', []) if "Ready" == c.get('type')), {})
+        prefix = "node-role.kubernetes.io/"
+        return dict(phase="Ready" if "True" == ready.get('status') else "NotReady",
+                    node=metadata.get('name'),
+                    ips=tuple(a['address'] for a in status.get('addresses', [])
+                              if "InternalIP" == a.get('type')),
+                    roles=tuple(sorted(k[len(prefix):] for k in metadata.get('labels', {})
+                                       if k.startswith(prefix))),
+                    unschedulable=bool(_path(data, 'spec', 'unschedulable')),
+                    maintenance=_path(metadata, 'annotations',
+                                      'harvesterhci.io/maintain-status'),
+                    node_args=_node_args(_path(metadata, 'annotations', 'rke2.io/node-args')))
+
+
+def _node_args(value):
+    ''' Arguments from the JSON list of `rke2.io/node-args` annotation '''
+    try:
+        args = loads(value) if value else ()
+    except DecodeError:
+        return ()
+    return tuple(str(a) for a in args) if isinstance(args, list) else ()
+
+
+class BackupView(ResourceView):
+    ''' View of VirtualMachineBackup, `phase` is `Ready`, `Error` or `InProgress` '''
+    __slots__ = ("type", "source", "ready")
+
+    def _extract(self, data):
+        spec, status = data.get('spec', {}), data.get('status', {})
+        ready = bool(status.get('readyToUse'))
+        phase = "Ready" if ready else ("Error" if status.get('error') else "InProgress")
+        return dict(phase=phase, ready=ready, type=spec.get('type'),
+                    source=_path(spec, 'source', 'name'))
+
+
+class LonghornReplicaView(ResourceView):
+    ''' View of `longhorn.io/v1beta2` Replica, `phase` is its current state '''
+    __slots__ = ("volume", "disk", "failed_at")
+
+    def _extract(self, data):
+        spec, status = data.get('spec', {}), data.get('status', {})
+        return dict(phase=status.get('currentState'), node=spec.get('nodeID'),
+                    ips=(status['ip'],) if status.get('ip') else (),
+                    volume=spec.get('volumeName'), disk=spec.get('diskID'),
+                    failed_at=spec.get('failedAt') or None)
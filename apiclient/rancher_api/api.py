@@ -1,8 +1,12 @@
 from urllib.parse import urljoin
 
 import requests
-from pkg_resources import parse_version
-from requests.packages.urllib3.util.retry import Retry
+
+from harvester_api.adapters import POOL_MAXSIZE, KEEPALIVE_IDLE, PooledHTTPAdapter
+from harvester_api.codecs import json_kwargs
+from harvester_api.metrics import RequestMetrics, send
+from harvester_api.retries import RETRY_STATUSES, RetryStats, SafeRetry
+from harvester_api.versions import parse_version
 
 from .managers import (
     CloudCredentialManager, ClusterRegistrationTokenManager, HarvesterConfigManager,
@@ -18,18 +22,35 @@ class RancherAPI:
     reset_password = "v3/users"
 
     @classmethod
-    def login(cls, endpoint, user, passwd, session=None, ssl_verify=True):
-        api = cls(endpoint, session=session)
+    def login(cls, endpoint, user, passwd, session=None, ssl_verify=True, **pool_options):
+        api = cls(endpoint, session=session, **pool_options)
         api.session.verify = ssl_verify
         api.authenticate(user, passwd)
 
         return api
 
-    def __init__(self, endpoint, token=None, session=None):
+    def __init__(self, endpoint, token=None, session=None, *, pool_maxsize=POOL_MAXSIZE,
+                 pool_block=False, keepalive=KEEPALIVE_IDLE, limiter=None, transport=None):
+        '''
+        :param int pool_maxsize: max connections to keep per host
+        :param bool pool_block: block when all connections of the pool are in use
+        :param int keepalive: idle seconds before TCP keep-alive probes, None to disable
+        :param RateLimiter limiter: limiter shared by APIs of the endpoint,
+                                    e.g. `limiters.limiter_for(endpoint)`
+        :param Cassette transport: wraps the adapter of the session to record or replay requests,
+                                   e.g. `cassettes.Cassette(path, "replay")`
+        '''
         self.session = session or requests.Session()
         self.session.headers.update(Authorization=token or "")
-
-        if session is None:
+        self.pool_options = dict(pool_maxsize=pool_maxsize, pool_block=pool_block,
+                                 keepalive=keepalive, limiter=limiter)
+        self._retry_stats = RetryStats()
+        #: callables to be called with `metrics.RequestRecord` of each request
+        self.metrics = RequestMetrics()
+        self.hooks = [self.metrics]
+        self.transport = transport
+
+        if session is None or transport is not None:
             self.set_retries()
 
         self._version = None
@@ -68,23 +89,19 @@ class RancherAPI:
 
     def _get(self, path, **kwargs):
         url = urljoin(self.endpoint, path)
-        resp = self.session.get(url, **kwargs)
-        return resp
+        return send(self.hooks, self.session.get, "GET", url, **kwargs)
 
     def _post(self, path, **kwargs):
         url = urljoin(self.endpoint, path)
-        resp = self.session.post(url, **kwargs)
-        return resp
+        return send(self.hooks, self.session.post, "POST", url, **json_kwargs(kwargs))
 
     def _put(self, path, **kwargs):
         url = urljoin(self.endpoint, path)
-        resp = self.session.put(url, **kwargs)
-        return resp
+        return send(self.hooks, self.session.put, "PUT", url, **json_kwargs(kwargs))
 
     def _delete(self, path, **kwargs):
         url = urljoin(self.endpoint, path)
-        resp = self.session.delete(url, **kwargs)
-        return resp
+        return send(self.hooks, self.session.delete, "DELETE", url, **kwargs)
 
     def authenticate(self, user, passwd, **kwargs):
         path = "v3-public/localProviders/local?action=login"
@@ -99,15 +116,42 @@ class RancherAPI:
             self._version = None
         return r.json()
 
-    def set_retries(self, times=5, status_forcelist=(500, 502, 504), **kwargs):
-        kwargs.update(backoff_factor=kwargs.get('backoff_factor', 10.0),
+    def set_retries(self, times=5, status_forcelist=RETRY_STATUSES, **kwargs):
+        '''
+        :param int times: max retries of a request
+        :param Iterable[int] status_forcelist: statuses to be retried, non-idempotent methods
+                                               are only retried on 429 and 503
+        :param kwargs: other arguments of `Retry`, e.g. `backoff_factor` and `backoff_max`
+        '''
+        kwargs.update(backoff_factor=kwargs.get('backoff_factor', 0.5),
+                      backoff_max=kwargs.get('backoff_max', 10.0),
                       total=kwargs.get('total', times),
-                      status_forcelist=status_forcelist)
-        retry_strategy = Retry(**kwargs)
-        adapter = requests.adapters.HTTPAdapter(max_retries=retry_strategy)
+                      status_forcelist=status_forcelist,
+                      stats=self._retry_stats)
+        retry_strategy = SafeRetry(**kwargs)
+        adapter = PooledHTTPAdapter(max_retries=retry_strategy, **self.pool_options)
+        if self.transport is not None:
+            adapter = self.transport.wrap(adapter)
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
 
+    @property
+    def pool_stats(self):
+        ''' Counters of connections created and reused, None for non-pooled session '''
+        adapter = self.session.get_adapter(self.endpoint)
+        return adapter.stats.as_dict() if isinstance(adapter, PooledHTTPAdapter) else None
+
+    @property
+    def limiter_stats(self):
+        ''' Current rate and concurrency of the limiter, None if not limited '''
+        limiter = self.pool_options['limiter']
+        return limiter.as_dict() if limiter is not None else None
+
+    @property
+    def retry_stats(self):
+        ''' Counters of retries by `"METHOD cause"` and seconds spent on backoff '''
+        return self._retry_stats.as_dict()
+
     def generate_kubeconfig(self, harvester_id, harvester_name):
         # kubeconfig for provider
         # https://registry.terraform.io/providers/rancher/rancher2/3.1.1/docs/resources/cluster_v2
@@ -1,10 +1,12 @@
 import base64
-import json
 import yaml
 from weakref import ref
 from collections.abc import Mapping
 from urllib.parse import urlencode
 
+from harvester_api.codecs import decode_response
+from harvester_api.metrics import attributed
+
 from .models import UserSpec, ChartSpec, LBServiceSpec
 
 
@@ -33,18 +35,12 @@ class BaseManager:
 
     def _delegate(self, meth, path, *, raw=False, **kwargs):
         func = getattr(self.api, meth)
-        resp = func(path, **kwargs)
+        with attributed(self):
+            resp = func(path, **kwargs)
 
         if raw:
             return resp
-        try:
-            if "json" in resp.headers.get('Content-Type', ""):
-                rval = resp.json()
-            else:
-                rval = resp.text
-            return resp.status_code, rval
-        except json.decoder.JSONDecodeError as e:
-            return resp.status_code, dict(error=e, response=resp)
+        return decode_response(resp)
 
     def _get(self, path, *, raw=False, **kwargs):
         return self._delegate("_get", path, raw=raw, **kwargs)
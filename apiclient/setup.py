@@ -11,7 +11,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/harvester/tests",
     packages=find_packages(),
-    install_requires=["requests"],
+    install_requires=["requests", "packaging"],
     classifiers=[
         "Development Status :: 1 - Planning",
         "Operating System :: OS Independent",
@@ -1,10 +1,14 @@
-from unittest import TestCase, mock
+import socket
+from unittest import TestCase, IsolatedAsyncioTestCase, mock
 from unittest.mock import PropertyMock
 
 import requests
 from pkg_resources import parse_version
 
+from harvester_api.adapters import PooledHTTPAdapter
 from harvester_api.api import HarvesterAPI, _normalize_version
+from harvester_api.limiters import RateLimiter
+from harvester_api.aio import AsyncHarvesterAPI, AsyncManager
 
 
 class TestNomalizeVersion(TestCase):
@@ -92,8 +96,9 @@ class TestHarvesterAPI(TestCase):
 
     def test_set_retries_default(self):
         defaults = dict(total=5,
-                        status_forcelist=(500, 502, 504),
-                        backoff_factor=10.0)
+                        status_forcelist=(429, 500, 502, 503, 504),
+                        backoff_factor=0.5,
+                        backoff_max=10.0)
 
         api = HarvesterAPI("https://endpoint/")
         session = api.session
@@ -125,6 +130,36 @@ class TestHarvesterAPI(TestCase):
                 with self.subTest(attr=attr, val=val):
                     self.assertEqual(getattr(retries, attr), val)
 
+    def test_pool_options(self):
+        api = HarvesterAPI("https://endpoint/", pool_maxsize=50, pool_block=True, keepalive=None)
+
+        for prefix in ("http://", "https://"):
+            with self.subTest(prefix=prefix):
+                adapter = api.session.get_adapter(prefix)
+                self.assertIsInstance(adapter, PooledHTTPAdapter)
+                self.assertEqual(50, adapter.poolmanager.connection_pool_kw['maxsize'])
+                self.assertTrue(adapter.poolmanager.connection_pool_kw['block'])
+                self.assertNotIn('socket_options', adapter.poolmanager.connection_pool_kw)
+        self.assertEqual(dict(created=0, reused=0, requests=0), api.pool_stats)
+
+        # keep-alive is enabled by default, and options are kept by set_retries
+        api = HarvesterAPI("https://endpoint/", pool_maxsize=50)
+        api.set_retries(1)
+        kws = api.session.get_adapter("https://").poolmanager.connection_pool_kw
+        self.assertEqual(50, kws['maxsize'])
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1), kws['socket_options'])
+
+        # limiter is applied to the pool
+        limiter = RateLimiter()
+        api = HarvesterAPI("https://endpoint/", limiter=limiter)
+        self.assertIs(limiter, api.session.get_adapter("https://").limiter)
+        self.assertEqual(dict(rate=20.0, concurrency=16, throttled=0, waited=0),
+                         api.limiter_stats)
+        self.assertIsNone(HarvesterAPI("https://endpoint/").limiter_stats)
+
+        # customized session is not pooled by the API
+        self.assertIsNone(HarvesterAPI("https://endpoint/", session=requests.Session()).pool_stats)
+
     def test_load_managers(self):
         base_ver, new_ver = "0.0.0", "v1.1.0"
         api = HarvesterAPI("https://endpoint")
@@ -136,6 +171,50 @@ class TestHarvesterAPI(TestCase):
         self.assertTrue(api.hosts.is_support(new_ver))
         self.assertEqual(api.hosts._ver, new_ver)
 
+    def test_managers_lazy(self):
+        api = HarvesterAPI("https://endpoint")
+        self.assertNotIn('vms', vars(api))
+
+        vms = api.vms
+        self.assertIs(vms, api.vms)
+        self.assertIs(api, vms.api)
+
+        api.load_managers("v1.1.0")
+        self.assertNotIn('vms', vars(api))
+        self.assertIsNot(vms, api.vms)
+
+    def test_load_managers_stops_informers(self):
+        api = HarvesterAPI("https://endpoint")
+        informer = mock.MagicMock()
+        api.vms.informer = informer
+
+        api.load_managers("v1.1.0")
+        informer.stop.assert_called_once_with()
+        self.assertIsNone(api.vms.informer)
+
+    def test_manager_for_version_memoized(self):
+        from harvester_api.managers import NetworkManager
+        from harvester_api.managers.base import BaseManager
+        from harvester_api.versions import parse_version
+
+        resolved = NetworkManager.for_version("v1.1.0")
+        self.assertIs(resolved, BaseManager._resolved[(NetworkManager, parse_version("v1.1.0"))])
+        with mock.patch.object(NetworkManager, 'is_support') as m_support:
+            self.assertIs(resolved, NetworkManager.for_version(parse_version("v1.1.0")))
+            m_support.assert_not_called()
+
+        class Derived(NetworkManager):
+            support_to = "v9.9.9"
+
+        try:
+            self.assertEqual({}, BaseManager._resolved)
+            self.assertIs(Derived, NetworkManager.for_version("v9.9.9"))
+        finally:
+            for classes in BaseManager._sub_classes.values():
+                if Derived in classes:
+                    classes.remove(Derived)
+            BaseManager._resolved.clear()
+
     def test_authenticate(self):
         user, pwd, token = "testuser", "testpasswd", "fake:token"
         post_json = dict(username=user, password=pwd)
@@ -189,3 +268,59 @@ class TestHarvesterAPI(TestCase):
             self.assertEqual(api.session, m_session)
             m_auth.assert_called_once_with(user, pwd)
             self.assertEqual(m_session.verify, ssl_verify)
+
+
+class TestAsyncHarvesterAPI(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.api = AsyncHarvesterAPI("https://endpoint/", max_workers=4)
+
+    def tearDown(self):
+        self.api.close()
+
+    def test_managers_for_version(self):
+        new_ver = "v1.8.0"
+        self.api.load_managers(new_ver)
+
+        self.assertIsInstance(self.api.vms, AsyncManager)
+        self.assertEqual(self.api.vms._manager, self.api.api.vms)
+        self.assertEqual(self.api.vms._ver, new_ver)
+        # payload builders are kept synchronous
+        self.assertIs(self.api.vms.Spec, self.api.api.vms.Spec)
+        self.assertIsInstance(self.api.images.create_data("n", "u", "d", "t", "ns"), dict)
+
+    async def test_awaitable_calls(self):
+        with mock.patch.object(self.api.api.vms, 'start', return_value=(204, "")) as m_start:
+            code, data = await self.api.vms.start("vm-name", namespace="ns")
+
+            m_start.assert_called_once_with("vm-name", namespace="ns")
+            self.assertEqual((204, ""), (code, data))
+
+        with mock.patch.object(self.api.api, '_get') as m_get:
+            resp = await self.api.get("some/path", params=dict(a=1))
+
+            m_get.assert_called_once_with("some/path", params=dict(a=1))
+            self.assertEqual(resp, m_get.return_value)
+
+    async def test_gather(self):
+        names = [f"vm-{i}" for i in range(8)]
+        with mock.patch.object(self.api.api.vms, 'get', side_effect=lambda n: (200, n)):
+            rv = await self.api.gather(*(self.api.vms.get(n) for n in names))
+
+        self.assertEqual([(200, n) for n in names], rv)
+
+    async def test_async_iterators(self):
+        items = [dict(metadata=dict(name=f"vm-{i}")) for i in range(3)]
+        with mock.patch.object(self.api.api.vms, 'iter_list', return_value=iter(items)) as m_iter:
+            it = self.api.vms.iter_list("ns", limit=2)
+            m_iter.assert_not_called()
+            self.assertEqual(items, [obj async for obj in it])
+            m_iter.assert_called_once_with("ns", limit=2)
+
+        watch = mock.MagicMock()
+        watch.__iter__.return_value = iter([("ADDED", items[0]), ("DELETED", items[0])])
+        with mock.patch.object(self.api.api.vms, 'watch', return_value=watch):
+            it = self.api.vms.watch("vm-0")
+            self.assertEqual(("ADDED", items[0]), await it.__anext__())
+            await it.aclose()
+            watch.close.assert_called_once_with()
@@ -0,0 +1,60 @@
+from unittest import TestCase, mock
+
+from harvester_api.api import HarvesterAPI
+from harvester_api.bulk import Bulk, absent
+from harvester_api.managers import VolumeManager
+from harvester_api.testing import FakeHarvester
+
+
+def _status(printable):
+    return lambda vm: vm is not None and printable == vm['status'].get('printableStatus')
+
+
+class TestBulk(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeHarvester(image_seconds=0.2, vm_seconds=0.2, volume_seconds=0.2).start()
+        cls.api = HarvesterAPI.login(cls.fake.endpoint, "admin", "password")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fake.stop()
+
+    def test_vms(self):
+        names = [f"bulk-vm{i}" for i in range(4)]
+        spec = self.api.vms.Spec(1, 1)
+
+        results = self.api.bulk([("vms", "create", (n, spec)) for n in names],
+                                max_workers=2, until=_status("Running"), timeout=10)
+        self.assertEqual(names, [r.name for r in results])
+        self.assertTrue(all(r.ok and r.reached for r in results), results)
+        self.assertEqual({201}, {r.code for r in results})
+
+        results = self.api.bulk([(self.api.vms, "stop", (n,)) for n in names + ["missing"]],
+                                until=_status("Stopped"), timeout=10)
+        self.assertTrue(all(r.ok for r in results[:-1]), results)
+        missing = results[-1]
+        self.assertEqual((404, False, False), (missing.code, missing.reached, missing.ok))
+
+        results = self.api.bulk([("vms", "delete", (n,)) for n in names],
+                                until=absent, timeout=10)
+        self.assertTrue(all(r.ok for r in results), results)
+        self.assertEqual([404] * len(names), [self.api.vms.get(n)[0] for n in names])
+
+    def test_errors_and_polling(self):
+        manager = mock.create_autospec(VolumeManager, instance=True, WATCH_fmt=None)
+        manager.create.side_effect = [(201, {}), ConnectionError("reset")]
+        manager.get.side_effect = [(200, dict(status=dict(phase="Pending"))),
+                                   (200, dict(status=dict(phase="Bound")))]
+
+        results = Bulk(self.api, 1).run(
+            [(manager, "create", ("vol1", "spec")), (manager, "create", ("vol2", "spec"))],
+            until=lambda v: v and "Bound" == v['status']['phase'], timeout=5, snooze=0.01
+        )
+
+        self.assertEqual([("vol1", True), ("vol2", False)], [(r.name, r.ok) for r in results])
+        self.assertIsInstance(results[1].error, ConnectionError)
+        manager.get.assert_called_with("vol1", "default")
+        self.assertEqual(2, manager.get.call_count)
+        self.assertEqual([], self.api.bulk([]))
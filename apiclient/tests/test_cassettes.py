@@ -0,0 +1,170 @@
+import gzip
+from tempfile import TemporaryDirectory
+from time import monotonic, sleep
+from unittest import TestCase
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from harvester_api.api import HarvesterAPI
+from harvester_api.cassettes import Cassette, CassetteMismatch
+from harvester_api.managers import ImageManager
+from harvester_api.testing import FakeHarvester
+
+
+class FakeAdapter(BaseAdapter):
+    ''' Responds the progress of the image, increased on each request '''
+    def __init__(self):
+        super().__init__()
+        self.progress = 0
+
+    def send(self, request, **kwargs):
+        self.progress += 50
+        resp = Response()
+        resp.status_code, resp.reason = 200, "OK"
+        resp.headers.update({"Content-Type": "application/json", "Content-Length": "1"})
+        resp._content = f'{{"status": {{"progress": {self.progress}}}}}'.encode()
+        resp.request, resp.url = request, request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+def wait_downloaded(images, name, timeout=10):
+    ''' Checker which re-checks the image on watch events, or polls when watch is ended '''
+    watch = images.watch(name, timeout=timeout)
+    try:
+        code, data = images.get(name)
+        while 100 != data.get('status', {}).get('progress'):
+            if next(watch, None) is None:
+                sleep(0.05)
+            code, data = images.get(name)
+    finally:
+        watch.close()
+    return data
+
+
+class TestCassette(TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def record(self, path):
+        fake = FakeAdapter()
+        api = HarvesterAPI("https://10.0.0.1/", transport=Cassette(path, "record"))
+        api.transport.wrap(fake)
+        images = ImageManager(api)
+        progress = [images.get("img")[1]['status']['progress'] for _ in range(2)]
+        api.transport.close()
+        return progress
+
+    def test_record_and_replay(self):
+        for name in ("images.jsonl", "images.jsonl.gz"):
+            with self.subTest(name=name):
+                path = f"{self.tmpdir.name}/{name}"
+                self.assertEqual([50, 100], self.record(path))
+
+                # replay against another endpoint, in the recorded order
+                cassette = Cassette(path)
+                api = HarvesterAPI("https://another/", transport=cassette)
+                images = ImageManager(api)
+                progress = [images.get("img")[1]['status']['progress'] for _ in range(3)]
+
+                # the last one is repeated
+                self.assertEqual([50, 100, 100], progress)
+                self.assertEqual(3, cassette.played)
+                resp = images.get("img", raw=True)
+                self.assertNotIn("Content-Length", resp.headers)
+                self.assertEqual(b'{"status": {"progress": 100}}', resp.content)
+
+                with self.assertRaises(CassetteMismatch):
+                    images.get("not-recorded")
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            Cassette(f"{self.tmpdir.name}/c.jsonl", "live")
+
+    def test_checker_wait(self):
+        path = f"{self.tmpdir.name}/wait.jsonl"
+        fake = FakeHarvester(image_seconds=0.5).start()
+        self.addCleanup(fake.stop)
+        api = HarvesterAPI(fake.endpoint, transport=Cassette(path, "record"))
+        api.authenticate("admin", "password")
+        api.images.create_by_url("img", "http://images/img.qcow2")
+
+        started = monotonic()
+        self.assertEqual(100, wait_downloaded(api.images, "img")['status']['progress'])
+        # events are streamed, rather than blocked until the watch is timed out
+        self.assertLess(monotonic() - started, 5)
+        api.transport.close()
+
+        with open(path) as f:
+            self.assertNotIn("watch=true", f.read())
+
+        cassette = Cassette(path)
+        api = HarvesterAPI("https://another/", transport=cassette)
+        self.assertEqual(100, wait_downloaded(api.images, "img")['status']['progress'])
+        self.assertLess(0, cassette.played)
+
+    def test_secrets_and_streams(self):
+        path = f"{self.tmpdir.name}/auth.jsonl.gz"
+        fake = FakeHarvester().start()
+        self.addCleanup(fake.stop)
+        api = HarvesterAPI(fake.endpoint, transport=Cassette(path, "record"))
+        api.authenticate("admin", "secret-password")
+        self.assertEqual("Bearer fake-token", api.session.headers['Authorization'])
+        resp = api._get("v1/harvester/namespaces", stream=True)
+        api.transport.close()
+
+        with gzip.open(path, "rt") as f:
+            content = f.read()
+        self.assertNotIn("fake-token", content)
+        self.assertNotIn("secret-password", content)
+        # bodies of streamed responses are left to the caller
+        self.assertEqual(200, resp.status_code)
+        self.assertIn('"skipped":true', content)
+
+        # credentials are not matched on replay
+        api = HarvesterAPI("https://another/", transport=Cassette(path))
+        api.authenticate("admin", "another-password")
+        self.assertEqual("Bearer REDACTED", api.session.headers['Authorization'])
+        resp = api._get("v1/harvester/namespaces", stream=True)
+        self.assertEqual((200, b""), (resp.status_code, resp.content))
+
+    def test_session(self):
+        def session(api, name):
+            ''' Login, create an image and a VM, wait for them, then clean up '''
+            api.authenticate("admin", "password")
+            outputs = [api.images.create_by_url(name, "http://images/img.qcow2")[0]]
+            outputs.append(wait_downloaded(api.images, name)['status']['progress'])
+            spec = api.vms.Spec(1, 1)
+            spec.add_image("disk-0", f"default/{name}")
+            outputs.append(api.vms.create(name, spec)[0])
+            while True:
+                code, data = api.vms.get(name)
+                if "Running" == data['status'].get('printableStatus'):
+                    break
+                sleep(0.05)
+            outputs.append([vm['metadata']['name'] for vm in api.vms.get()[1]['data']])
+            outputs.append(api.vms.delete(name)[0])
+            while 404 != api.vms.get(name)[0]:
+                sleep(0.05)
+            outputs.append(api.images.delete(name)[0])
+            return outputs
+
+        # names are the same on record and replay, e.g. `unique_name` with a cassette
+        path, name = f"{self.tmpdir.name}/session.jsonl.gz", "session-00000"
+        fake = FakeHarvester(image_seconds=0.3, vm_seconds=0.3).start()
+        self.addCleanup(fake.stop)
+        recorder = Cassette(path, "record")
+        recorded = session(HarvesterAPI(fake.endpoint, transport=recorder), name)
+        recorder.close()
+
+        player = Cassette(path)
+        replayed = session(HarvesterAPI("https://another/", transport=player), name)
+        self.assertEqual(recorded, replayed)
+        self.assertEqual([201, 100, 201, [name]], recorded[:4])
+        self.assertLess(0, player.played)
+        self.assertGreater(player.recorded_seconds, 0)
@@ -0,0 +1,122 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from time import sleep
+from unittest import TestCase, mock
+
+import yaml
+
+from harvester_api import codecs
+from harvester_api.codecs import LazyJSON, decode_response, json_kwargs
+from harvester_api.managers.base import substitute
+
+
+def _resp(content, content_type="application/json"):
+    return mock.MagicMock(status_code=200, headers={"Content-Type": content_type},
+                          content=content, text=content.decode())
+
+
+class TestCodecs(TestCase):
+    def setUp(self):
+        self.codec = codecs.get_codec()
+
+    def tearDown(self):
+        codecs.set_codec(self.codec)
+
+    def test_set_codec(self):
+        for codec in filter(None, (codecs.STDLIB, codecs.ORJSON)):
+            with self.subTest(codec=codec):
+                codecs.set_codec(codec.name)
+                self.assertEqual(b'{"a":[1,"\xc3\xa9"]}', codecs.dumps(dict(a=[1, "é"])))
+                self.assertEqual(dict(a=[1]), codecs.loads(b'{"a": [1]}'))
+
+        with self.assertRaises(ValueError):
+            codecs.set_codec("unknown")
+
+    def test_json_kwargs(self):
+        kwargs = json_kwargs(dict(json=dict(a=1), headers={"Content-type": "text/plain"}))
+
+        self.assertNotIn('json', kwargs)
+        self.assertEqual(b'{"a":1}', kwargs['data'])
+        self.assertEqual("text/plain", kwargs['headers']['Content-Type'])
+        self.assertEqual(dict(data=b"raw"), json_kwargs(dict(data=b"raw")))
+
+    def test_decode_response(self):
+        self.assertEqual((200, [1, 2]), decode_response(_resp(b" [1, 2]")))
+        self.assertEqual((200, "plain"), decode_response(_resp(b"plain", "text/plain")))
+
+        code, data = decode_response(_resp(b'{"a": 1'))
+        self.assertIsInstance(data['error'], codecs.DecodeError)
+
+    def test_lazy(self):
+        for codec in filter(None, (codecs.STDLIB, codecs.ORJSON)):
+            with self.subTest(codec=codec):
+                codecs.set_codec(codec)
+                content = b'{"metadata": {"name": "vm1"}, "spec": {}}'
+
+                data = decode_response(_resp(content))[1]
+                self.assertIsInstance(data, LazyJSON)
+                self.assertFalse(data.loaded)
+                self.assertEqual("vm1", data['metadata']['name'])
+                self.assertTrue(data.loaded)
+
+                # encoded by the codec, also nested in payloads
+                data = decode_response(_resp(content))[1]
+                self.assertEqual(json.loads(content), json.loads(codecs.dumps(data)))
+                data = decode_response(_resp(content))[1]
+                self.assertEqual(dict(vm=json.loads(content)),
+                                 json.loads(codecs.dumps(dict(vm=data))))
+                # not a dict, so it can't be encoded as an empty object silently
+                with self.assertRaises(TypeError):
+                    json.dumps(decode_response(_resp(content))[1])
+
+                data = decode_response(_resp(content))[1]
+                copied = deepcopy(data)
+                self.assertIs(dict, type(copied))
+                self.assertEqual(json.loads(content), copied)
+                self.assertEqual(dict(json.loads(content), a=1), {**data, "a": 1})
+
+    def test_lazy_repr_and_errors(self):
+        data = decode_response(_resp(b'{"message": "denied"}'))[1]
+        self.assertEqual("(200, {'message': 'denied'})", str((200, data)))
+        self.assertTrue(data.loaded)
+
+        resp = _resp(b'{"message": "forbidden"}')
+        resp.status_code = 403
+        code, data = decode_response(resp)
+        self.assertEqual((403, dict(message="forbidden")), (code, data))
+        self.assertIs(dict, type(data))
+
+    def test_lazy_yaml(self):
+        content = b'{"metadata": {"name": "vm1", "labels": {"a": "b"}}, "spec": [1]}'
+        for dump in (yaml.safe_dump, yaml.dump):
+            with self.subTest(dump=dump.__name__):
+                data = decode_response(_resp(content))[1]
+                self.assertEqual(json.loads(content), yaml.safe_load(dump(data)))
+                self.assertEqual(dict(vms=[json.loads(content)]),
+                                 yaml.safe_load(dump(dict(vms=[data]))))
+
+    def test_lazy_threads(self):
+        content = b'{"metadata": {"name": "vm1"}}'
+        data = decode_response(_resp(content))[1]
+
+        def slow_loads(content):
+            sleep(0.05)
+            return json.loads(content)
+
+        with mock.patch.object(codecs, 'loads', side_effect=slow_loads) as m_loads:
+            with ThreadPoolExecutor(8) as executor:
+                names = list(executor.map(lambda _: data['metadata']['name'], range(8)))
+
+        self.assertEqual(["vm1"] * 8, names)
+        m_loads.assert_called_once_with(content)
+
+    def test_substitute(self):
+        data = dict(apiVersion="{API_VERSION}", spec=dict(items=[1, "x/{API_VERSION}"]),
+                    keys={"{API_VERSION}/k": None})
+
+        out = substitute(data, "{API_VERSION}", "v1")
+
+        self.assertEqual(dict(apiVersion="v1", spec=dict(items=[1, "x/v1"]),
+                              keys={"v1/k": None}), out)
+        self.assertEqual("{API_VERSION}", data['apiVersion'])
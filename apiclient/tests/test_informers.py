@@ -0,0 +1,191 @@
+import json
+from threading import Event
+from unittest import TestCase, mock
+
+from harvester_api.api import HarvesterAPI
+from harvester_api.informers import Informer
+from harvester_api.managers import BackupManager, ImageManager, HostManager
+
+
+def _obj(name, namespace="default", rv="1", **labels):
+    return dict(metadata=dict(name=name, namespace=namespace, resourceVersion=rv, labels=labels))
+
+
+class TestInformer(TestCase):
+
+    def setUp(self):
+        self.api = mock.MagicMock(spec=HarvesterAPI)
+        self.api.API_VERSION = "TEST_API_VERSION"
+        self.mgr = ImageManager(self.api)
+
+        self.items = [_obj("a", app="web"), _obj("b", app="db"), _obj("c", "other", app="web")]
+        self.events = []
+        self.closed = Event()
+
+        def fake_get(path, params=None, **kwargs):
+            resp = mock.MagicMock(status_code=200)
+            if params and params.get('watch'):
+                def iter_lines():
+                    yield from (json.dumps(e).encode() for e in self.events)
+                    self.closed.wait(5)
+                resp.iter_lines.side_effect = iter_lines
+                resp.close.side_effect = self.closed.set
+            else:
+                resp.content = json.dumps(dict(metadata=dict(resourceVersion="1"),
+                                               items=self.items)).encode()
+            return resp
+
+        self.api._get.side_effect = fake_get
+
+    def tearDown(self):
+        self.mgr.stop_informer()
+
+    def test_list_and_indexes(self):
+        informer = Informer(self.mgr).start()
+
+        self.assertTrue(informer.fresh)
+        self.assertEqual(3, len(informer))
+        self.assertEqual(self.items[0], informer.get("a", "default"))
+        self.assertIsNone(informer.get("a", "other"))
+        self.assertEqual(["a", "b"], [o['metadata']['name'] for o in informer.list("default")])
+        self.assertEqual(["a", "c"], [o['metadata']['name']
+                                      for o in informer.list(label_selector="app=web")])
+        self.assertEqual(["c"], [o['metadata']['name']
+                                 for o in informer.list("other", dict(app="web"))])
+
+        # returned objects are copies
+        informer.get("a", "default")['metadata']['name'] = "changed"
+        self.assertEqual("a", informer.get("a", "default")['metadata']['name'])
+
+        informer.stop()
+        self.assertFalse(informer.fresh)
+
+    def test_watch_events(self):
+        self.events = [
+            dict(type="ADDED", object=_obj("d", rv="2", app="web")),
+            dict(type="MODIFIED", object=_obj("a", rv="3", app="db")),
+            dict(type="DELETED", object=_obj("b", rv="4")),
+        ]
+        informer = Informer(self.mgr)
+        with mock.patch.object(informer, '_put', wraps=informer._put) as m_put:
+            informer.start()
+            # 3 objects from list, then 2 updates from watch
+            for _ in range(50):
+                if 5 == m_put.call_count and informer.get("b", "default") is None:
+                    break
+                self.closed.wait(0.1)
+
+        self.assertEqual(["a", "d"], [o['metadata']['name'] for o in informer.list("default")])
+        self.assertEqual(["a"], [o['metadata']['name']
+                                 for o in informer.list(label_selector="app=db")])
+        informer.stop()
+
+    def test_manager_served_from_cache(self):
+        self.mgr.start_informer("default")
+
+        self.api._get.reset_mock()
+        code, data = self.mgr.get("a")
+        self.assertEqual((200, self.items[0]), (code, data))
+
+        code, data = self.mgr.get()
+        self.assertEqual(200, code)
+        self.assertEqual(2, len(data[self.mgr.LIST_KEY]))
+
+        code, data = self.mgr.get("not-exist")
+        self.assertEqual(404, code)
+        self.api._get.assert_not_called()
+
+        # namespace not covered by the informer
+        self.mgr.get("c", "other")
+        self.api._get.assert_called()
+
+        # raw response always from API
+        self.api._get.reset_mock()
+        self.mgr.get("a", raw=True)
+        self.api._get.assert_called()
+
+    def test_indexers(self):
+        self.items = [
+            dict(metadata=dict(name="b1", namespace="default"),
+                 spec=dict(type="backup", source=dict(name="vm1"))),
+            dict(metadata=dict(name="s1", namespace="default"),
+                 spec=dict(type="snapshot", source=dict(name="vm1"))),
+            dict(metadata=dict(name="s2", namespace="default"),
+                 spec=dict(type="snapshot", source=dict(name="vm2"))),
+        ]
+        mgr = BackupManager(self.api)
+        informer = Informer(mgr).start()
+
+        self.assertEqual(["s1", "s2"], [o['metadata']['name']
+                                        for o in informer.list(type="snapshot")])
+        self.assertEqual(["s1"], [o['metadata']['name']
+                                  for o in informer.list(type="snapshot", source="vm1")])
+
+        # served from the cache with the index
+        mgr.informer = informer
+        self.api._get.reset_mock()
+        code, data = mgr.get(vm_name="vm1")
+        self.assertEqual(["b1"], [o['metadata']['name'] for o in data['data']])
+        self.assertEqual(404, mgr.get("s1")[0])
+        self.api._get.assert_not_called()
+        mgr.stop_informer()
+
+    def test_not_fresh_while_reconnecting(self):
+        reconnect, received, watches = Event(), Event(), []
+        fake_get = self.api._get.side_effect
+
+        def get(path, params=None, **kwargs):
+            if not (params and params.get('watch')):
+                return fake_get(path, params, **kwargs)
+            watches.append(params)
+            resp = mock.MagicMock(status_code=200)
+            if 1 == len(watches):
+                # the first stream is dropped at once
+                resp.iter_lines.return_value = iter(())
+            else:
+                def iter_lines():
+                    reconnect.wait(5)
+                    yield json.dumps(dict(type="ADDED", object=_obj("d", rv="2"))).encode()
+                    received.set()
+                    self.closed.wait(5)
+                resp.iter_lines.side_effect = iter_lines
+                resp.close.side_effect = self.closed.set
+            return resp
+
+        self.api._get.side_effect = get
+        informer = Informer(self.mgr).start()
+        for _ in range(50):
+            if 2 == len(watches):
+                break
+            self.closed.wait(0.1)
+
+        # re-connected from the resourceVersion of the list, nothing is received yet
+        self.assertEqual("1", watches[-1]['resourceVersion'])
+        self.assertTrue(informer.synced.is_set())
+        self.assertFalse(informer.fresh)
+
+        reconnect.set()
+        self.assertTrue(received.wait(5))
+        self.assertTrue(informer.fresh)
+        informer.stop()
+
+    def test_stop_while_listing(self):
+        informer = Informer(self.mgr)
+        fake_get = self.api._get.side_effect
+
+        def stop_then_get(path, params=None, **kwargs):
+            if not (params and params.get('watch')):
+                informer.stop()
+            return fake_get(path, params, **kwargs)
+
+        self.api._get.side_effect = stop_then_get
+        informer._list()
+        self.assertFalse(informer.synced.is_set())
+        self.assertFalse(informer.fresh)
+
+    def test_not_supported(self):
+        class FakeManager(HostManager):
+            WATCH_fmt = None
+
+        with self.assertRaises(NotImplementedError):
+            FakeManager(self.api).start_informer()
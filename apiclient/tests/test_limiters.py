@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from threading import Lock
+from unittest import TestCase, mock
+
+from harvester_api.limiters import RateLimiter, limiter_for
+
+
+class TestRateLimiter(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch("harvester_api.limiters.sleep")
+        self.m_sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_token_bucket(self):
+        limiter = RateLimiter(rate=10, burst=2)
+
+        for _ in range(2):
+            with limiter.acquire():
+                pass
+        self.m_sleep.assert_not_called()
+
+        # bucket is empty, wait for the next token
+        with limiter.acquire():
+            pass
+        self.assertAlmostEqual(0.1, self.m_sleep.call_args[0][0], places=2)
+
+    def test_aimd(self):
+        limiter = RateLimiter(rate=10, max_concurrency=8)
+
+        limiter.feedback(429)
+        self.assertEqual(4, int(limiter.limit))
+        self.assertEqual(5, limiter.rate)
+        # decreased at most once per second
+        limiter.feedback(503)
+        self.assertEqual(4, int(limiter.limit))
+        self.assertEqual(2, limiter.throttled)
+
+        # additive increase: one per window of successful requests
+        for _ in range(5):
+            limiter.feedback(200, 0.01)
+        self.assertEqual(5, int(limiter.limit))
+
+        # rising latency
+        limiter._decreased = 0
+        for latency in (0.2, 0.2, 5, 5, 5):
+            limiter.feedback(200, latency)
+        self.assertEqual(2, int(limiter.limit))
+        self.assertEqual(dict(rate=2.5, concurrency=2, throttled=5, waited=0),
+                         dict(limiter.as_dict(), rate=round(limiter.rate, 1)))
+
+    def test_concurrency(self):
+        limiter = RateLimiter(rate=1000, max_concurrency=3)
+        lock, peak = Lock(), [0]
+
+        def request(_):
+            with limiter.acquire():
+                with lock:
+                    peak[0] = max(peak[0], limiter.inflight)
+
+        with ThreadPoolExecutor(10) as executor:
+            list(executor.map(request, range(100)))
+
+        self.assertLessEqual(peak[0], 3)
+        self.assertEqual(0, limiter.inflight)
+
+    def test_shared_between_processes(self):
+        with TemporaryDirectory() as tmpdir:
+            path = f"{tmpdir}/bucket"
+            first = RateLimiter(rate=10, burst=1, lock_path=path)
+            second = RateLimiter(rate=10, burst=1, lock_path=path)
+
+            with first.acquire():
+                pass
+            # the token was taken by the other one
+            with second.acquire():
+                pass
+            self.m_sleep.assert_called_once()
+
+            first.backoff()
+            self.assertEqual(5, round(second.rate))
+
+    def test_limiter_for(self):
+        limiter = limiter_for("https://10.0.0.1:8443/", rate=5)
+
+        self.assertIs(limiter, limiter_for("https://10.0.0.1:8443/v1/harvester"))
+        self.assertIsNot(limiter, limiter_for("https://10.0.0.2/"))
+        self.assertEqual(5, limiter.max_rate)
@@ -1,13 +1,17 @@
+import json
+from itertools import islice
 from tempfile import NamedTemporaryFile
 from unittest import TestCase, mock
 from json.decoder import JSONDecodeError
 
+import requests
+
 from harvester_api.api import HarvesterAPI
 from harvester_api.managers import (
-    DEFAULT_NAMESPACE, HostManager, ImageManager,
-    KeypairManager, NetworkManager
+    DEFAULT_NAMESPACE, BackupManager, HostManager, ImageManager,
+    KeypairManager, NetworkManager, VirtualMachineSnapshotManager
 )
-from harvester_api.managers.base import merge_dict, BaseManager
+from harvester_api.managers.base import merge_patch, BaseManager
 
 
 class BaseTestCase(TestCase):
@@ -51,13 +55,16 @@ class TestBaseManager(BaseTestCase):
         self.assertEqual(data['api'], "unknown/%s" % self.api.API_VERSION)
 
     def test__delegate(self):
-        m_resp = mock.MagicMock(headers={"Content-Type": "json"})
+        m_resp = mock.MagicMock(status_code=200, headers={"Content-Type": "json"},
+                                content=b'{"key": [1]}')
         self.api._get.return_value = m_resp
 
-        # Case 1: general case
+        # Case 1: general case, decoded on first access
         resp = self.mgr._delegate("_get", "/test/path")
 
-        self.assertEqual(resp, (m_resp.status_code, m_resp.json.return_value))
+        self.assertFalse(resp[1].loaded)
+        self.assertEqual(resp, (m_resp.status_code, dict(key=[1])))
+        self.assertTrue(resp[1].loaded)
 
         # Case 2: raw response
         m_resp.reset_mock()
@@ -69,12 +76,12 @@ class TestBaseManager(BaseTestCase):
         # Case 3: json decode error
         m_resp.reset_mock()
 
-        exception = JSONDecodeError("test Error", doc="", pos=42)
-        m_resp.json.side_effect = exception
-        resp = self.mgr._delegate("_get", "/test/path")
+        m_resp.content = b'{"key": '
+        code, data = self.mgr._delegate("_get", "/test/path")
 
-        self.assertEqual(resp, (m_resp.status_code,
-                                dict(error=exception, response=m_resp)))
+        self.assertEqual(m_resp.status_code, code)
+        self.assertIsInstance(data['error'], JSONDecodeError)
+        self.assertIs(m_resp, data['response'])
 
     def test__update(self):
         path, data = "/test/path", dict(test="data")
@@ -95,6 +102,53 @@ class TestBaseManager(BaseTestCase):
 
         self.assertDictEqual(dict(json=data), self.api._put.call_args[1])
 
+    def test_merge_patch(self):
+        src = dict(a=1, b=dict(c=[1], d="x"), e="removed")
+        dest = dict(a=1, b=dict(c=[1, 2], d="x"), f=dict(g=None))
+
+        self.assertEqual(dict(b=dict(c=[1, 2]), e=None, f=dict(g=None)), merge_patch(src, dest))
+        self.assertEqual(dict(), merge_patch(src, src))
+
+    def test__apply_patch(self):
+        def resp(code, obj=None):
+            return mock.MagicMock(ok=code < 400, status_code=code,
+                                  headers={"Content-Type": "json"},
+                                  content=json.dumps(obj or {}).encode())
+
+        old = dict(id="ns/vm", metadata=dict(name="vm", resourceVersion="1"),
+                   spec=dict(cpu=1, memory="1Gi"), status=dict(ready=True))
+        latest = dict(old, metadata=dict(name="vm", resourceVersion="2"),
+                      spec=dict(cpu=1, memory="2Gi"))
+        new = dict(old, spec=dict(cpu=2, memory="1Gi"), status=dict())
+
+        # Case 1: difference from `old` re-applied to the latest on conflicts
+        self.api._patch.side_effect = [resp(409), resp(200, latest)]
+        self.api._get.return_value = resp(200, latest)
+        code, data = self.mgr._apply_patch("/test/path", new, old=old)
+
+        self.assertEqual(200, code)
+        patches = [c[1]['json'] for c in self.api._patch.call_args_list]
+        self.assertEqual([dict(spec=dict(cpu=2), metadata=dict(resourceVersion="1")),
+                          dict(spec=dict(cpu=2), metadata=dict(resourceVersion="2"))], patches)
+
+        # Case 2: update function applied to the current object, gave up after retries
+        self.api._patch.reset_mock()
+        self.api._patch.side_effect = None
+        self.api._patch.return_value = resp(409)
+        code, data = self.mgr._apply_patch(
+            "/test/path", lambda o: dict(o, spec=dict(o['spec'], cpu=4)), retries=2)
+
+        self.assertEqual(409, code)
+        self.assertEqual(3, self.api._patch.call_count)
+        self.assertEqual(dict(spec=dict(cpu=4), metadata=dict(resourceVersion="2")),
+                         self.api._patch.call_args[1]['json'])
+
+        # Case 3: failed to get the current object
+        self.api._patch.reset_mock()
+        self.api._get.return_value = resp(404, dict(code=404))
+        self.assertEqual((404, dict(code=404)), self.mgr._apply_patch("/test/path", new))
+        self.api._patch.assert_not_called()
+
     def test_for_version(self):
         class B0(BaseManager):
             pass
@@ -124,6 +178,96 @@ class TestBaseManager(BaseTestCase):
         self.assertEqual(B0.for_version('1.3.0'), B130)
         self.assertEqual(B0.for_version('1.1.4'), B114)
 
+    def test_watch(self):
+        # Case 1: not supported
+        with self.assertRaises(NotImplementedError):
+            self.mgr.watch()
+
+        # Case 2: events with bookmark skipped and resourceVersion tracked
+        class WatchableManager(BaseManager):
+            WATCH_fmt = "apis/test/{ns}things"
+
+        events = [
+            dict(type="ADDED", object=dict(metadata=dict(name="a", resourceVersion="1"))),
+            dict(type="BOOKMARK", object=dict(metadata=dict(resourceVersion="2"))),
+            dict(type="MODIFIED", object=dict(metadata=dict(name="a", resourceVersion="3"))),
+        ]
+        m_resp = mock.MagicMock(status_code=200)
+        m_resp.iter_lines.return_value = [json.dumps(e).encode() for e in events]
+        self.api._get.return_value = m_resp
+
+        mgr = WatchableManager(self.api)
+        out = list(islice(mgr.watch("a", "ns", label_selector="k=v", timeout=60), 3))
+
+        self.assertEqual([("ADDED", events[0]['object']), ("MODIFIED", events[2]['object']),
+                          ("ADDED", events[0]['object'])], out)
+        path, kws = self.api._get.call_args[0][0], self.api._get.call_args[1]
+        self.assertEqual("apis/test/namespaces/ns/things", path)
+        self.assertTrue(kws['stream'])
+        self.assertEqual("metadata.name=a", kws['params']['fieldSelector'])
+        self.assertEqual("k=v", kws['params']['labelSelector'])
+        # re-watch from the latest resourceVersion
+        self.assertEqual("3", kws['params']['resourceVersion'])
+
+        # Case 3: unavailable watch ends the iteration
+        m_resp.status_code = 403
+        self.assertEqual([], list(mgr.watch(namespace="", timeout=60)))
+        self.assertEqual("apis/test/things", self.api._get.call_args[0][0])
+
+    def test_iter_list(self):
+        # Case 1: not supported
+        with self.assertRaises(NotImplementedError):
+            self.mgr.iter_list()
+
+        class ListableManager(BaseManager):
+            WATCH_fmt = "apis/test/{ns}things"
+
+        def page(items, key="items", **extra):
+            m_resp = mock.MagicMock(status_code=200)
+            m_resp.content = json.dumps({key: items, **extra}).encode()
+            return m_resp
+
+        # Case 2: Kubernetes API, paging by metadata.continue and stopped early
+        self.api._get.side_effect = [
+            page([1, 2], metadata=dict(**{"continue": "tok1"})),
+            page([3, 4], metadata=dict(**{"continue": "tok2"})),
+            page([5]),
+        ]
+        mgr = ListableManager(self.api)
+        self.assertEqual([1, 2, 3], list(islice(mgr.iter_list("", limit=2), 3)))
+        self.assertEqual(2, self.api._get.call_count)
+        path, kws = self.api._get.call_args[0][0], self.api._get.call_args[1]
+        self.assertEqual("apis/test/things", path)
+        self.assertEqual(dict(limit=2, **{"continue": "tok1"}), kws['params'])
+
+        # Case 3: dashboard API, paging by continue and pagination.next
+        class DashboardManager(ListableManager):
+            LIST_fmt = "v1/harvester/things/{ns}"
+
+        self.api._get.reset_mock()
+        self.api._get.side_effect = [
+            page([1], "data", **{"continue": "tok1"}),
+            page([2], "data", pagination=dict(next="https://x/v1/things?limit=1&continue=t2")),
+            # next page is not changed, stop paging
+            page([3], "data", pagination=dict(next="https://x/v1/things?limit=1&continue=t2")),
+        ]
+        mgr = DashboardManager(self.api)
+        self.assertEqual([1, 2, 3], list(mgr.iter_list(limit=1, label_selector="k=v")))
+        self.assertEqual(3, self.api._get.call_count)
+        path, kws = self.api._get.call_args[0][0], self.api._get.call_args[1]
+        self.assertEqual(f"v1/harvester/things/{DEFAULT_NAMESPACE}", path)
+        self.assertEqual(dict(limit="1", labelSelector="k=v", **{"continue": "t2"}),
+                         kws['params'])
+
+        # Case 4: error status of a page is raised while iterating
+        denied = requests.Response()
+        denied.status_code, denied._content = 403, b'{"message": "forbidden"}'
+        self.api._get.side_effect = [page([1], "data", **{"continue": "tok1"}), denied]
+        objs = mgr.iter_list(limit=1)
+        self.assertEqual(1, next(objs))
+        with self.assertRaises(requests.HTTPError):
+            next(objs)
+
 
 class TestHostManager(BaseTestCase):
     manager_cls = HostManager
@@ -151,8 +295,10 @@ class TestHostManager(BaseTestCase):
 
     def test_update(self):
         node_name, data = "called", dict(metadata=dict(nothing=True))
-        stub = dict(metadata=dict(something=False))
-        self.api._get().json.return_value = stub
+        stub = dict(metadata=dict(something=False, resourceVersion="3"))
+        self.api._get.return_value = mock.MagicMock(
+            ok=True, status_code=200, headers={"Content-Type": "json"},
+            content=json.dumps(stub).encode())
 
         # Case 1: passing as raw data
         self.mgr.update(node_name, data, as_json=False)
@@ -160,11 +306,12 @@ class TestHostManager(BaseTestCase):
         self.assertIn(node_name, self.api._put.call_args[0][0])
         self.assertDictEqual(dict(data=data), self.api._put.call_args[1])
 
-        # Case 2: passing as JSON with data (from get) merged
+        # Case 2: passing as JSON, only the difference from the current node is patched
         self.mgr.update(node_name, data, as_json=True)
 
-        self.assertIn(node_name, self.api._put.call_args[0][0])
-        self.assertDictEqual(dict(json=merge_dict(data, stub)), self.api._put.call_args[1])
+        self.assertIn(node_name, self.api._patch.call_args[0][0])
+        self.assertDictEqual(dict(json=dict(metadata=dict(nothing=True, resourceVersion="3"))),
+                             self.api._patch.call_args[1])
 
     def test_get_metrics(self):
         # Case 1: specific node
@@ -264,19 +411,20 @@ class TestImageManager(BaseTestCase):
     def test_update(self):
         name, namespace = "TestImageName", "TestNamespace"
         data = dict(metadata=dict(namespace=namespace))
-        self.api._get().json.return_value = dict()
+        self.api._get.return_value = mock.MagicMock(
+            ok=True, status_code=200, headers={"Content-Type": "json"}, content=b"{}")
 
         # Case 1: namespace miss
         self.mgr.update(name, dict())
 
-        self.assertIn(name, self.api._put.call_args[0][0])
-        self.assertNotIn(namespace, self.api._put.call_args[0][0])
+        self.assertIn(name, self.api._patch.call_args[0][0])
+        self.assertNotIn(namespace, self.api._patch.call_args[0][0])
 
         # Case 2: specific namespace
         self.mgr.update(name, data)
 
-        self.assertIn(name, self.api._put.call_args[0][0])
-        self.assertIn(namespace, self.api._put.call_args[0][0])
+        self.assertIn(name, self.api._patch.call_args[0][0])
+        self.assertIn(namespace, self.api._patch.call_args[0][0])
 
     def test_delete(self):
         name, namespace = "TestImageName", "TestNamespace"
@@ -286,6 +434,42 @@ class TestImageManager(BaseTestCase):
         self.assertIn(name, self.api._delete.call_args[0][0])
         self.assertIn(namespace, self.api._delete.call_args[0][0])
 
+    @mock.patch("harvester_api.managers.images.sleep")
+    def test_upload(self, m_sleep):
+        name = "ImageName"
+        ok = mock.MagicMock(ok=True, status_code=200, headers={})
+        ok.request.body.hexdigest.return_value = "SHA512"
+        failed = mock.MagicMock(ok=False, status_code=502, headers={})
+        image = dict(status=dict(progress=100))
+
+        with NamedTemporaryFile() as file, NamedTemporaryFile() as state, \
+                mock.patch.object(self.mgr, "create_by_file") as m_create, \
+                mock.patch.object(self.mgr, "get") as m_get, \
+                mock.patch.object(self.mgr, "delete") as m_delete:
+            m_get.side_effect = [(404, dict()), (200, image), (200, image)]
+
+            # Case 1: retry with backoff and clean the failed image
+            m_create.side_effect = [failed, ok]
+            self.assertEqual((200, image), self.mgr.upload(name, file.name,
+                                                           state_path=state.name))
+            self.assertEqual(2, m_create.call_count)
+            m_delete.assert_called_once_with(name, DEFAULT_NAMESPACE)
+            m_sleep.assert_called_once_with(5.0)
+            record = json.loads(open(state.name).read())[f"{DEFAULT_NAMESPACE}/{name}"]
+            self.assertEqual(("done", "SHA512"), (record['status'], record['sha512']))
+
+            # Case 2: skipped as the same file was uploaded
+            m_create.reset_mock()
+            self.assertEqual((200, image), self.mgr.upload(name, file.name,
+                                                           state_path=state.name))
+            m_create.assert_not_called()
+
+            # Case 3: client errors are not retried
+            m_create.side_effect = [mock.MagicMock(ok=False, status_code=400, headers={})]
+            code, _ = self.mgr.upload(name, file.name, retries=3)
+            self.assertEqual(400, code)
+            self.assertEqual(1, m_create.call_count)
+
 
 class TestKeypairManager(BaseTestCase):
     manager_cls = KeypairManager
@@ -388,3 +572,52 @@ class TestNetworkManager(BaseTestCase):
 
         self.assertIn(name, self.api._delete.call_args[0][0])
         self.assertIn(namespace, self.api._delete.call_args[0][0])
+
+
+class TestBackupManager(BaseTestCase):
+    manager_cls = BackupManager
+
+    def setUp(self):
+        super().setUp()
+        self.objs = [
+            dict(metadata=dict(name="b1"), spec=dict(type="backup", source=dict(name="vm1"))),
+            dict(metadata=dict(name="s1"), spec=dict(type="snapshot", source=dict(name="vm1"))),
+            dict(metadata=dict(name="b2"), spec=dict(type="backup", source=dict(name="vm2"))),
+        ]
+        m_resp = mock.MagicMock(status_code=200, headers={"Content-Type": "json"})
+        m_resp.content = json.dumps(dict(data=self.objs)).encode()
+        self.api._get.return_value = m_resp
+
+    def test_get_filtered(self):
+        # Case 1: filtered on server side, and client side for older versions
+        code, data = self.mgr.get(vm_name="vm1", label_selector="k=v")
+
+        self.assertEqual(["b1"], [d['metadata']['name'] for d in data['data']])
+        params = self.api._get.call_args[1]['params']
+        self.assertEqual(["spec.type=backup", "spec.source.name=vm1"], params['filter'])
+        self.assertEqual("k=v", params['labelSelector'])
+
+        # Case 2: snapshots
+        mgr = VirtualMachineSnapshotManager(self.api)
+        self.api._get.return_value.content = json.dumps(dict(data=self.objs)).encode()
+        code, data = mgr.get()
+
+        self.assertEqual(["s1"], [d['metadata']['name'] for d in data['data']])
+        self.assertEqual(["spec.type=snapshot"], self.api._get.call_args[1]['params']['filter'])
+
+    def test_get_wrong_type(self):
+        self.api._get.return_value.content = json.dumps(self.objs[1]).encode()
+
+        code, data = self.mgr.get("s1")
+
+        self.assertEqual(404, code)
+        self.assertNotIn('params', self.api._get.call_args[1])
+
+    def test_iter_list(self):
+        self.api._get.return_value.content = json.dumps(dict(data=self.objs)).encode()
+
+        names = [o['metadata']['name'] for o in self.mgr.iter_list(vm_name="vm2")]
+
+        self.assertEqual(["b2"], names)
+        params = self.api._get.call_args[1]['params']
+        self.assertEqual(["spec.type=backup", "spec.source.name=vm2"], params['filter'])
@@ -0,0 +1,95 @@
+import json
+from unittest import TestCase, mock
+
+import requests
+
+from harvester_api.api import HarvesterAPI
+from harvester_api.managers import ImageManager
+from harvester_api.metrics import RequestMetrics, RequestRecord, path_template
+
+
+class TestPathTemplate(TestCase):
+
+    def test_templates(self):
+        paths = {
+            "apis/kubevirt.io/v1/namespaces/default/virtualmachines/vm1/status":
+                "apis/kubevirt.io/v1/namespaces/{namespace}/virtualmachines/{name}/status",
+            "apis/harvesterhci.io/v1beta1/namespaces/ns1/virtualmachineimages":
+                "apis/harvesterhci.io/v1beta1/namespaces/{namespace}/virtualmachineimages",
+            "api/v1/nodes/node1": "api/v1/nodes/{name}",
+            "https://1.2.3.4/v1/harvester/persistentvolumeclaims/default/vol1?action=export":
+                "v1/harvester/persistentvolumeclaims/{namespace}/{name}",
+            "v1/harvester/nodes": "v1/harvester/nodes",
+            "v3/users/u-abc": "v3/users/{name}",
+            "k8s/clusters/c-m-1234/v1/harvester/kubeconfig":
+                "k8s/clusters/{cluster}/v1/harvester/kubeconfig",
+        }
+        for path, expected in paths.items():
+            with self.subTest(path=path):
+                self.assertEqual(expected, path_template(path))
+
+
+class TestRequestMetrics(TestCase):
+
+    def test_summary_and_export(self):
+        metrics = RequestMetrics()
+        for i in range(1, 101):
+            metrics(RequestRecord("ImageManager", "GET", "v1/harvester/images/{name}",
+                                  200 if i % 10 else 404, 0, 100, int(i % 50 == 0), i / 100))
+        metrics(RequestRecord(None, "POST", "v3/users", 0, 20, 0, 0, 0.01))
+
+        slowest, other = metrics.summary()
+        self.assertEqual(101, metrics.count)
+        buckets = slowest.pop('buckets')
+        self.assertEqual((1, 10, 50, 100, 100),
+                         tuple(buckets[le] for le in ("0.01", "0.1", "0.5", "1", "+Inf")))
+        self.assertEqual(dict(manager="ImageManager", method="GET",
+                              path="v1/harvester/images/{name}", count=100, total=50.5, max=1.0,
+                              statuses={"200": 90, "404": 10}, sent=0, received=10000,
+                              retries=2, p50=0.5, p95=0.95, p99=0.99), slowest)
+        self.assertEqual("", other['manager'])
+
+        self.assertEqual(101, json.loads(metrics.to_json())['count'])
+        text = metrics.to_prometheus()
+        self.assertIn('harvester_api_request_duration_seconds_bucket{manager="ImageManager",'
+                      'method="GET",path="v1/harvester/images/{name}",le="0.5"} 50\n', text)
+        self.assertIn('harvester_api_request_duration_seconds_count{manager="ImageManager",'
+                      'method="GET",path="v1/harvester/images/{name}"} 100\n', text)
+        self.assertIn('harvester_api_requests_total{manager="",method="POST",'
+                      'path="v3/users",status="0"} 1\n', text)
+
+        metrics.reset()
+        self.assertEqual([], metrics.summary())
+
+    def test_histogram(self):
+        metrics = RequestMetrics(buckets=(0.1, 1))
+        for elapsed in (0.05, 0.1, 0.5, 3, 4):
+            metrics(RequestRecord(None, "GET", "v1/harvester/nodes", 200, 0, 0, 0, elapsed))
+
+        row, = metrics.summary()
+        self.assertEqual({"0.1": 2, "1": 3, "+Inf": 5}, row['buckets'])
+        self.assertEqual((7.65, 4), (row['total'], row['max']))
+        # interpolated in the bucket, the last one is capped by the max
+        self.assertEqual((0.55, 4), (row['p50'], row['p99']))
+
+    def test_hooks_of_api(self):
+        session = mock.MagicMock(requests.Session())
+        resp = session.get.return_value
+        resp.status_code, resp.content, resp.request.body = 200, b'{"items": []}', None
+        resp.headers = {"Content-Type": "application/json"}
+        resp.raw.retries.history = (None,)
+
+        api = HarvesterAPI("https://endpoint/", session=session)
+        records = []
+        api.hooks.append(records.append)
+        ImageManager(api).get("image-1")
+        api._get("v1/harvester/nodes")
+
+        by_manager, direct = records
+        self.assertEqual(("ImageManager", "GET", 200, 13, 1),
+                         (by_manager.manager, by_manager.method, by_manager.status,
+                          by_manager.received, by_manager.retries))
+        self.assertEqual("apis/harvesterhci.io/v1beta1/namespaces/{namespace}"
+                         "/virtualmachineimages/{name}", by_manager.path)
+        self.assertIsNone(direct.manager)
+        self.assertEqual(2, api.metrics.count)
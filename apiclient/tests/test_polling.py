@@ -0,0 +1,102 @@
+from threading import Barrier, Lock
+from unittest import TestCase, mock
+
+from harvester_api import polling
+from harvester_api.polling import poll_all
+
+
+class FakeClock:
+    ''' Monotonic clock which is only advanced by `sleep` '''
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestPolling(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        for name in ("monotonic", "sleep"):
+            patcher = mock.patch.object(polling, name, getattr(self.clock, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_concurrent(self):
+        # pollers can only pass the barrier when 4 of them are running at the same time
+        lock, active, peak, barrier = Lock(), [0], [0], Barrier(4, timeout=5)
+
+        def poller(testee):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            barrier.wait()
+            with lock:
+                active[0] -= 1
+            return testee
+
+        results = poll_all(range(8), poller, lambda out: True, timeout=5, max_workers=4)
+
+        self.assertEqual(4, peak[0])
+        self.assertEqual(list(range(8)), [r.output for r in results])
+        self.assertTrue(all(r.qualified and 1 == r.polls for r in results))
+        self.assertEqual([], self.clock.sleeps)
+
+    def test_backoff_and_pending(self):
+        calls = []
+
+        def poller(testee):
+            calls.append((testee, self.clock.now))
+            if "ready" == testee:
+                return "done" if self.clock.now >= 0.3 else "waiting"
+            return self.clock.now if "progress" == testee else "waiting"
+
+        results = poll_all(["ready", "stuck", "progress"], poller, lambda out: "done" == out,
+                           timeout=1, interval=0.02, max_interval=0.5)
+        ready, stuck, progress = results
+        times = {t: [at for testee, at in calls if testee == t] for t in ("ready", "stuck")}
+
+        # unchanged output backs off by the factor up to max_interval, and the last poll is
+        # at the deadline
+        expected, interval = [0.0], 0.02
+        while expected[-1] < 1:
+            expected.append(min(expected[-1] + interval, 1))
+            interval = min(interval * polling.BACKOFF_FACTOR, 0.5)
+        self.assertEqual(len(expected), len(times['stuck']))
+        for want, got in zip(expected, times['stuck']):
+            self.assertAlmostEqual(want, got)
+        self.assertEqual(("waiting", False, len(expected)),
+                         (stuck.output, stuck.qualified, stuck.polls))
+        self.assertAlmostEqual(1, stuck.elapsed)
+
+        # same schedule until qualified
+        first_done = next(at for at in expected if at >= 0.3)
+        self.assertEqual(expected.index(first_done) + 1, ready.polls)
+        self.assertTrue(ready.qualified)
+        self.assertAlmostEqual(first_done, ready.elapsed)
+        self.assertEqual(ready.polls, len(times['ready']))
+
+        # changing output keeps polling at the interval, from 0 to 1 by 0.02
+        self.assertEqual(51, progress.polls)
+        self.assertFalse(progress.qualified)
+        # all testees are polled at the start
+        self.assertEqual({"ready", "stuck", "progress"}, {t for t, _ in calls[:3]})
+        self.assertEqual({0.0}, {at for _, at in calls[:3]})
+
+    def test_fixed_interval(self):
+        # the interval is not grown without max_interval
+        results = poll_all(["stuck"], lambda t: "waiting", lambda out: False,
+                           timeout=1, interval=0.25)
+        self.assertEqual((5, 4), (results[0].polls, len(self.clock.sleeps)))
+        for want, got in zip([0.25] * 4, self.clock.sleeps):
+            self.assertAlmostEqual(want, got)
+
+    def test_errors(self):
+        with self.assertRaises(ZeroDivisionError):
+            poll_all([0, 1], lambda t: 1 / t, bool, timeout=1)
+        self.assertEqual([], poll_all([], str, bool, timeout=1))
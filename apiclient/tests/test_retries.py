@@ -0,0 +1,73 @@
+from unittest import TestCase, mock
+
+from requests.packages.urllib3.exceptions import MaxRetryError
+
+from harvester_api.retries import RetryStats, SafeRetry, deadline, remaining
+
+
+def _response(status, **headers):
+    resp = mock.MagicMock(status=status, headers=headers)
+    resp.get_redirect_location.return_value = False
+    return resp
+
+
+class TestSafeRetry(TestCase):
+
+    def setUp(self):
+        self.stats = RetryStats()
+        self.retry = SafeRetry(total=3, backoff_factor=1, backoff_max=3,
+                               status_forcelist=(429, 500, 502, 503, 504), stats=self.stats)
+
+    def test_idempotency(self):
+        for method in ("GET", "PUT", "DELETE"):
+            with self.subTest(method=method):
+                self.assertTrue(self.retry.is_retry(method, 502))
+        # non-idempotent methods are only retried when rejected before processed
+        self.assertFalse(self.retry.is_retry("POST", 502))
+        self.assertFalse(self.retry.is_retry("POST", 500))
+        self.assertTrue(self.retry.is_retry("POST", 503))
+        self.assertTrue(self.retry.is_retry("PATCH", 429))
+
+    def test_jittered_backoff(self):
+        retry = self.retry.new(total=10)
+        for _ in range(4):
+            retry = retry.increment("GET", "/v1/vms", _response(502))
+            backoff = retry.get_backoff_time()
+            self.assertLessEqual(backoff, 3)
+            # cached, so the sleep is the same as recorded
+            self.assertEqual(backoff, retry.get_backoff_time())
+        self.assertGreaterEqual(backoff, 1.5)
+        self.assertIs(self.stats, retry.stats)
+
+    def test_stats(self):
+        retry = self.retry.increment("GET", "/v1/vms", _response(502))
+        retry = retry.increment("GET", "/v1/vms", _response(502))
+        retry.increment("POST", "/v1/vms", _response(503))
+
+        stats = self.stats.as_dict()
+        self.assertEqual({"GET 502": 2, "POST 503": 1}, stats['retries'])
+        self.assertEqual({}, stats['exhausted'])
+        self.assertGreater(stats['backoff'], 0)
+
+    def test_deadline(self):
+        self.assertIsNone(remaining())
+        with deadline(60):
+            with deadline(600):
+                self.assertLessEqual(remaining(), 60)
+            # Retry-After longer than the deadline
+            with self.assertRaises(MaxRetryError):
+                self.retry.increment("GET", "/v1/vms", _response(503, **{"Retry-After": "120"}))
+            self.retry.increment("GET", "/v1/vms", _response(503, **{"Retry-After": "5"}))
+        self.assertIsNone(remaining())
+
+        self.assertEqual({"GET 503": 1}, self.stats.as_dict()['exhausted'])
+        self.assertEqual({"GET 503": 1}, self.stats.as_dict()['retries'])
+        self.assertGreaterEqual(self.stats.as_dict()['backoff'], 5)
+
+    def test_deadline_endtime(self):
+        with deadline(60) as outer:
+            with deadline(600) as endtime:
+                self.assertEqual(outer, endtime)
+            with deadline(1) as endtime:
+                self.assertLess(endtime, outer)
+                self.assertLessEqual(remaining(), 1)
@@ -0,0 +1,150 @@
+import gzip
+import hashlib
+from io import BytesIO
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from unittest import TestCase, mock
+
+from requests import Request
+
+from harvester_api.streams import MultipartFileStream, save_response, save_ranges
+
+
+class TestMultipartFileStream(TestCase):
+
+    def setUp(self):
+        self.content = bytes(range(256)) * 41
+        self.file = NamedTemporaryFile()
+        self.file.write(self.content)
+        self.file.flush()
+
+    def tearDown(self):
+        self.file.close()
+
+    def test_body(self):
+        progress = []
+        body = MultipartFileStream(self.file.name, "chunk", filename="img.qcow2",
+                                   chunk_size=4096, progress=lambda *a: progress.append(a))
+        chunks = list(body)
+
+        self.assertLessEqual(max(len(c) for c in chunks), 4096)
+        self.assertEqual(len(body), sum(len(c) for c in chunks))
+        data = b"".join(chunks)
+        self.assertTrue(data.startswith(f"--{body.boundary}\r\n".encode()))
+        self.assertIn(b'name="chunk"; filename="img.qcow2"', data)
+        self.assertIn(b"\r\n\r\n" + self.content + f"\r\n--{body.boundary}--\r\n".encode(), data)
+
+        self.assertEqual(hashlib.sha512(self.content).hexdigest(), body.hexdigest())
+        self.assertEqual(len(self.content) // 4096 + 1, len(progress))
+        self.assertEqual((len(self.content), len(self.content)), progress[-1])
+
+        # re-iterable for retries
+        self.assertEqual(data, b"".join(body))
+
+    def test_prepared_request(self):
+        body = MultipartFileStream(self.file.name, checksum=None)
+        req = Request("POST", "https://127.0.0.1/upload", data=body,
+                      headers={"Content-Type": body.content_type}).prepare()
+
+        self.assertIs(body, req.body)
+        self.assertEqual(str(len(body)), req.headers['Content-Length'])
+        self.assertNotIn('Transfer-Encoding', req.headers)
+        self.assertIn(body.boundary, req.headers['Content-Type'])
+        list(body)
+        self.assertIsNone(body.hexdigest())
+
+
+class TestSaveResponse(TestCase):
+
+    def response(self, body, filename, chunk_size=1000):
+        resp = mock.MagicMock(headers={
+            "Content-Length": str(len(body)),
+            "Content-Disposition": f"attachment; filename={filename}"
+        })
+        resp.iter_content.side_effect = lambda size: (
+            body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+        return resp
+
+    def test_gzip_to_directory(self):
+        content = bytes(range(256)) * 100
+        # concatenated gzip members
+        body = gzip.compress(content[:9999]) + gzip.compress(content[9999:])
+        resp, progress = self.response(body, "image.qcow2.gz"), []
+
+        with TemporaryDirectory() as tmpdir:
+            result = save_response(resp, tmpdir, progress=lambda *a: progress.append(a))
+
+            self.assertEqual("image.qcow2", result.filename)
+            self.assertEqual(content, result.path.read_bytes())
+
+        self.assertEqual(len(content), result.size)
+        self.assertEqual(len(body), result.received)
+        self.assertEqual(hashlib.sha256(content).hexdigest(), result.sha256)
+        self.assertEqual(hashlib.sha512(content).hexdigest(), result.sha512)
+        self.assertEqual((len(body), len(body)), progress[-1])
+        resp.close.assert_called_once()
+
+    def test_to_file_object(self):
+        body = gzip.compress(b"not decompressed")
+        fio = BytesIO()
+
+        result = save_response(self.response(body, "bundle.zip"), fio, checksums=("md5",))
+
+        self.assertIsNone(result.path)
+        self.assertEqual(body, fio.getvalue())
+        self.assertEqual(dict(md5=hashlib.md5(body).hexdigest()), result.digests)
+
+
+class TestSaveRanges(TestCase):
+
+    def setUp(self):
+        self.content = bytes(range(256)) * 100
+        self.body = gzip.compress(self.content)
+        self.ranges = []
+
+    def fetch(self, headers=None):
+        headers = headers or {}
+        resp = mock.MagicMock(headers={"Content-Disposition": "attachment; filename=img.gz"})
+        resp.__enter__.return_value = resp
+        body = self.body
+        if "Range" in headers:
+            start, end = map(int, headers['Range'].split("=")[1].split("-"))
+            self.ranges.append((start, end))
+            body = body[start:end + 1]
+            resp.status_code = 206
+            resp.headers['Content-Range'] = f"bytes {start}-{end}/{len(self.body)}"
+        else:
+            resp.status_code = 200
+        resp.headers['Content-Length'] = str(len(body))
+        resp.iter_content.side_effect = lambda size: (
+            body[i:i + size] for i in range(0, len(body), size))
+        return resp
+
+    def test_ranges(self):
+        probe = self.fetch(headers={"Range": "bytes=0-0"})
+
+        with TemporaryDirectory() as tmpdir:
+            result = save_ranges(probe, self.fetch, tmpdir, parts=3, chunk_size=100)
+
+            self.assertEqual(self.content, result.path.read_bytes())
+            self.assertEqual(["img"], [p.name for p in result.path.parent.iterdir()])
+
+        self.assertEqual(3, result.parts)
+        self.assertEqual(len(self.body), result.received)
+        self.assertEqual(len(self.content), result.size)
+        self.assertEqual(hashlib.sha512(self.content).hexdigest(), result.sha512)
+        self.assertGreater(result.throughput, 0)
+        # probe + 3 ranges which cover the whole body
+        self.assertEqual(len(self.body) - 1, max(e for s, e in self.ranges))
+        self.assertEqual(len(self.body), sum(e - s + 1 for s, e in self.ranges[1:]))
+
+    def test_fallback(self):
+        probe = self.fetch()
+
+        with TemporaryDirectory() as tmpdir:
+            result = save_ranges(probe, self.fetch, tmpdir, decompress=False)
+
+            self.assertEqual(self.body, result.path.read_bytes())
+            self.assertEqual("img.gz", result.filename)
+
+        self.assertEqual(1, result.parts)
+        self.assertEqual([], self.ranges)
@@ -0,0 +1,92 @@
+from time import monotonic, sleep
+from unittest import TestCase
+
+from harvester_api.api import HarvesterAPI
+from harvester_api.testing import FakeHarvester
+
+
+def wait_until(func, timeout=5):
+    endtime = monotonic() + timeout
+    while endtime > monotonic():
+        rv = func()
+        if rv:
+            return rv
+        sleep(0.05)
+    raise AssertionError(f"Timed out waiting for {func}")
+
+
+class TestFakeHarvester(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeHarvester(image_seconds=0.3, vm_seconds=0.3, volume_seconds=0.2).start()
+        cls.api = HarvesterAPI.login(cls.fake.endpoint, "admin", "password")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.vms.stop_informer()
+        cls.fake.stop()
+
+    def test_login(self):
+        self.assertEqual("Bearer fake-token", self.api.session.headers['Authorization'])
+        self.assertEqual((1, 4, 0), self.api.cluster_version.release)
+        code, data = self.api.hosts.get()
+        self.assertEqual((200, ["fake-node"]), (code, [n['id'] for n in data['data']]))
+
+    def test_image_progress(self):
+        code, data = self.api.images.create_by_url("img", "http://images/img.qcow2",
+                                                   storageclass="harvester-longhorn")
+        self.assertEqual(201, code, (code, data))
+        self.assertEqual(409, self.api.images.create_by_url(
+            "img", "http://images/img.qcow2", storageclass="harvester-longhorn")[0])
+
+        image = wait_until(lambda: (lambda c, d: d if 100 == d['status'].get('progress')
+                                    else None)(*self.api.images.get("img")))
+        self.assertEqual("longhorn-img", image['status']['storageClassName'])
+
+        self.assertEqual(200, self.api.images.delete("img")[0])
+        self.assertEqual(404, self.api.images.get("img")[0])
+
+    def test_vm_state_machine(self):
+        spec = self.api.vms.Spec(1, 1)
+        code, data = self.api.vms.create("vm1", spec)
+        self.assertEqual(201, code, (code, data))
+
+        wait_until(lambda: "Running" == self.api.vms.get("vm1")[1]['status'].get(
+            'printableStatus'))
+        code, vmi = self.api.vms.get_status("vm1")
+        self.assertEqual(("Running", "10.52.0.100"),
+                         (vmi['status']['phase'], vmi['status']['interfaces'][0]['ipAddress']))
+
+        self.assertEqual(204, self.api.vms.stop("vm1")[0])
+        wait_until(lambda: "Stopped" == self.api.vms.get("vm1")[1]['status']['printableStatus'])
+        self.assertEqual(404, self.api.vms.get_status("vm1")[0])
+
+        # conflict on stale resourceVersion
+        code, vm = self.api.vms.get("vm1")
+        self.api.vms.start("vm1")
+        self.assertEqual(409, self.api.vms.update("vm1", vm)[0])
+
+        # minimal patch of the stale VM, retried with the latest one on conflict
+        spec = self.api.vms.Spec.from_dict(vm)
+        spec.description = "patched"
+        code, data = self.api.vms.patch("vm1", spec, old=vm)
+        self.assertEqual(200, code, (code, data))
+        self.assertEqual("patched", self.api.vms.Spec.from_dict(data).description)
+        self.assertEqual("RerunOnFailure", data['spec']['runStrategy'])
+        self.api.vms.delete("vm1")
+
+    def test_volume_binding_and_informer(self):
+        self.api.vms.start_informer()
+        spec = self.api.volumes.Spec("10Gi")
+        code, data = self.api.volumes.create("vol1", spec)
+        self.assertEqual(201, code, (code, data))
+
+        wait_until(lambda: "Bound" == self.api.volumes.get("vol1")[1]['status'].get('phase'))
+
+        # watch events are streamed to the informer
+        self.api.vms.create("vm2", self.api.vms.Spec(1, 1))
+        wait_until(lambda: "Running" == (self.api.vms.informer.get("vm2", "default") or {}).get(
+            'status', {}).get('printableStatus'))
+        self.api.vms.delete("vm2")
+        wait_until(lambda: self.api.vms.informer.get("vm2", "default") is None)
@@ -0,0 +1,23 @@
+from unittest import TestCase
+
+from pkg_resources import parse_version as legacy_parse_version
+
+from harvester_api.versions import InvalidVersion, Version, parse_version
+
+
+class TestParseVersion(TestCase):
+    def test_parse(self):
+        ver = parse_version("v1.2.0-rc1")
+        self.assertIsInstance(ver, Version)
+        self.assertEqual((1, 2, 0), ver.release)
+        self.assertIs(ver, parse_version("v1.2.0-rc1"))
+        self.assertIs(ver, parse_version(ver))
+
+    def test_other_version(self):
+        ver = parse_version(legacy_parse_version("8.8.8"))
+        self.assertIsInstance(ver, Version)
+        self.assertEqual(parse_version("8.8.8"), ver)
+
+    def test_invalid(self):
+        with self.assertRaises(InvalidVersion):
+            parse_version("dirty")
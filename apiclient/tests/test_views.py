@@ -0,0 +1,90 @@
+import json
+import pickle
+from unittest import TestCase, mock
+
+from harvester_api.api import HarvesterAPI
+from harvester_api.managers import HostManager, NamespaceManager
+from harvester_api.views import (
+    BackupView, HostView, ImageView, LonghornReplicaView, VirtualMachineInstanceView,
+    VirtualMachineView, VolumeView
+)
+
+
+def _obj(name, spec=None, status=None, **metadata):
+    return dict(metadata=dict(name=name, namespace="default", uid=f"uid-{name}",
+                              resourceVersion="7", **metadata),
+                spec=spec or {}, status=status or {})
+
+
+class TestViews(TestCase):
+    def test_common(self):
+        data = _obj("vm1", dict(runStrategy="RerunOnFailure"),
+                    dict(printableStatus="Running", ready=True,
+                         conditions=[dict(type="Ready", status="True"),
+                                     dict(type="Paused", status="False", reason="x")]))
+        view = VirtualMachineView(data)
+
+        self.assertEqual(("vm1", "default", "uid-vm1", "7"),
+                         (view.name, view.namespace, view.uid, view.resource_version))
+        self.assertEqual(("Running", True, "RerunOnFailure"),
+                         (view.phase, view.ready, view.run_strategy))
+        self.assertTrue(view.condition("Ready"))
+        self.assertFalse(view.condition("Paused"))
+        self.assertIsNone(view.condition("Missing"))
+        self.assertFalse(hasattr(view, 'raw'))
+        self.assertFalse(hasattr(view, '__dict__'))
+        with self.assertRaises(AttributeError):
+            view.phase = "Stopped"
+        copied = pickle.loads(pickle.dumps(view))
+        self.assertEqual(view, copied)
+        self.assertEqual(("RerunOnFailure", True),
+                         (copied.run_strategy, bool(copied.condition("Ready"))))
+
+    def test_kinds(self):
+        vmi = VirtualMachineInstanceView(_obj("vm1", status=dict(
+            phase="Running", nodeName="node1",
+            interfaces=[dict(name="default", ipAddress="10.52.0.10"), dict(name="nic-1")])))
+        self.assertEqual(("Running", "node1", ("10.52.0.10",)), (vmi.phase, vmi.node, vmi.ips))
+
+        image = ImageView(_obj("img", dict(displayName="focal"), dict(
+            progress=100, conditions=[dict(type="Imported", status="True")])))
+        self.assertEqual(("Imported", "focal", 100), (image.phase, image.display_name,
+                                                      image.progress))
+
+        volume = VolumeView(_obj("pvc", dict(resources=dict(requests=dict(storage="10Gi")),
+                                             volumeName="pvc-1"), dict(phase="Bound")))
+        self.assertEqual(("Bound", "10Gi", "pvc-1"), (volume.phase, volume.size,
+                                                      volume.volume_name))
+
+        host = HostView(_obj("node1", dict(unschedulable=True), dict(
+            conditions=[dict(type="Ready", status="True")],
+            addresses=[dict(type="InternalIP", address="10.0.0.1"),
+                       dict(type="Hostname", address="node1")]),
+            labels={"node-role.kubernetes.io/control-plane": "true"},
+            annotations={"rke2.io/node-args": '["server","--cluster-cidr","10.52.0.0/16"]'}))
+        self.assertEqual(("Ready", "node1", ("10.0.0.1",), ("control-plane",), True),
+                         (host.phase, host.node, host.ips, host.roles, host.unschedulable))
+        self.assertEqual(("server", "--cluster-cidr", "10.52.0.0/16"), host.node_args)
+        self.assertEqual((), HostView(_obj("node2", annotations={"rke2.io/node-args": "["}))
+                         .node_args)
+
+        backup = BackupView(_obj("b1", dict(type="backup", source=dict(name="vm1")),
+                                 dict(readyToUse=False, error=dict(message="failed"))))
+        self.assertEqual(("Error", "vm1"), (backup.phase, backup.source))
+
+        replica = LonghornReplicaView(_obj("r1", dict(nodeID="node2", volumeName="pvc-1"),
+                                           dict(currentState="running")))
+        self.assertEqual(("running", "node2", "pvc-1"), (replica.phase, replica.node,
+                                                         replica.volume))
+
+    def test_iter_views(self):
+        api = mock.MagicMock(spec=HarvesterAPI)
+        resp = api._get.return_value
+        resp.status_code, resp.content = 200, json.dumps(dict(data=[_obj("node1")])).encode()
+
+        views = list(HostManager(api).iter_views())
+
+        self.assertEqual(["node1"], [v.name for v in views])
+        self.assertIsInstance(views[0], HostView)
+        with self.assertRaises(NotImplementedError):
+            NamespaceManager(api).iter_views()
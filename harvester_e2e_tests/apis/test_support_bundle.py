@@ -21,10 +21,10 @@ from io import BytesIO
 from time import sleep
 from zipfile import ZipFile
 from datetime import datetime, timedelta
-from pkg_resources import parse_version
 
 import yaml
 import pytest
+from harvester_api.versions import parse_version
 
 pytest_plugins = [
     "harvester_e2e_tests.fixtures.api_client"
@@ -107,18 +107,19 @@ class TestSupportBundle:
     def test_download(self, api_client, support_bundle_state, wait_timeout):
         wait_for_support_bundle_ready(api_client, support_bundle_state.uid, wait_timeout)
 
-        code, ctx = api_client.supportbundle.download(support_bundle_state.uid)
+        code, data = api_client.supportbundle.download_to(support_bundle_state.uid,
+                                                          support_bundle_state.fio)
 
-        assert 200 == code, (code, ctx)
+        assert 200 == code, (code, data)
 
-        with ZipFile(BytesIO(ctx), 'r') as zf:
+        support_bundle_state.fio.seek(0)
+        with ZipFile(support_bundle_state.fio, 'r') as zf:
             files = zf.namelist()
+        support_bundle_state.fio.seek(0)
 
         assert 0 != len(files)
 
         support_bundle_state.files = files
-        support_bundle_state.fio.write(ctx)
-        support_bundle_state.fio.seek(0)
 
     @pytest.mark.dependency(depends=["download support bundle"])
     def test_logfile_exists(self, support_bundle_state):
@@ -369,18 +370,19 @@ class TestSupportBundleExtraNamespaces:
     def test_download(self, api_client, support_bundle_state, wait_timeout):
         wait_for_support_bundle_ready(api_client, support_bundle_state.uid, wait_timeout)
 
-        code, ctx = api_client.supportbundle.download(support_bundle_state.uid)
+        code, data = api_client.supportbundle.download_to(support_bundle_state.uid,
+                                                          support_bundle_state.fio)
 
-        assert 200 == code, (code, ctx)
+        assert 200 == code, (code, data)
 
-        with ZipFile(BytesIO(ctx), 'r') as zf:
+        support_bundle_state.fio.seek(0)
+        with ZipFile(support_bundle_state.fio, 'r') as zf:
             files = zf.namelist()
+        support_bundle_state.fio.seek(0)
 
         assert 0 != len(files)
 
         support_bundle_state.files = files
-        support_bundle_state.fio.write(ctx)
-        support_bundle_state.fio.seek(0)
 
     @pytest.mark.dependency(depends=["download support bundle"])
     def test_logfile_exists(self, api_client, support_bundle_state):
@@ -478,11 +480,12 @@ class TestSupportBundleCustomFileName:
         """Verify support bundle is created with custom filename pattern"""
         wait_for_support_bundle_ready(api_client, support_bundle_state.uid, wait_timeout)
 
-        code, ctx = api_client.supportbundle.download(support_bundle_state.uid)
+        fio = BytesIO()
+        code, data = api_client.supportbundle.download_to(support_bundle_state.uid, fio)
 
-        assert 200 == code, (code, ctx)
+        assert 200 == code, (code, data)
 
-        with ZipFile(BytesIO(ctx), 'r') as zf:
+        with ZipFile(fio, 'r') as zf:
             files = zf.namelist()
 
         assert 0 != len(files)
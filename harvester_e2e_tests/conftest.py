@@ -21,6 +21,8 @@ import yaml
 from datetime import datetime
 from pytest_dependency import DependencyManager as DepMgr
 
+from harvester_e2e_tests.fixtures.base import WAIT_STATS
+
 
 def check_depends(self, depends, item):
     # monkey patch `DependencyManager.checkDepends`
@@ -129,6 +131,46 @@ def pytest_addoption(parser):
         default=config_data['sleep-timeout'],
         help='Wait time for polling operations'
     )
+    parser.addoption(
+        '--api-rate-limit',
+        action='store',
+        type=float,
+        default=config_data.get('api-rate-limit', 0),
+        help='Requests per second to the cluster shared by all workers, 0 to disable'
+    )
+    parser.addoption(
+        '--api-max-concurrency',
+        action='store',
+        type=int,
+        default=config_data.get('api-max-concurrency', 16),
+        help='Max concurrent requests to the cluster per worker'
+    )
+    parser.addoption(
+        '--api-metrics-output',
+        action='store',
+        default=config_data.get('api-metrics-output', ''),
+        help='File to export latency of API requests, Prometheus text if ends with `.prom`'
+    )
+    parser.addoption(
+        '--api-cassette',
+        action='store',
+        default=config_data.get('api-cassette', ''),
+        help='Cassette file to record requests of the cluster into, or replay them from'
+    )
+    parser.addoption(
+        '--api-cassette-mode',
+        action='store',
+        choices=('record', 'replay'),
+        default=config_data.get('api-cassette-mode', 'replay'),
+        help='Record requests into the cassette or replay them'
+    )
+    parser.addoption(
+        '--vm-pool-size',
+        action='store',
+        type=int,
+        default=config_data.get('vm-pool-size', 1),
+        help='Pre-booted VMs kept per profile for tests leasing VMs from the pool'
+    )
     parser.addoption(
         '--node-scripts-location',
         action='store',
@@ -444,6 +486,19 @@ def pytest_collection_modifyitems(session, config, items):
     config.pluginmanager.get_plugin('terminalreporter').stats['deselected'] = deselected
 
 
+def pytest_terminal_summary(terminalreporter):
+    if not WAIT_STATS:
+        return
+    terminalreporter.section("slowest waits")
+    terminalreporter.write_line(f"{'elapsed':>9} {'max':>8} {'waits':>6} {'tries':>6}"
+                                f" {'timeouts':>8}  subject")
+    for s in WAIT_STATS.summary(top=15):
+        terminalreporter.write_line(
+            f"{s['elapsed']:>8.1f}s {s['max_elapsed']:>7.1f}s {s['waits']:>6} {s['attempts']:>6}"
+            f" {s['timeouts']:>8}  {s['subject']}"
+        )
+
+
 def pytest_html_results_table_header(cells):
     cells.insert(1, '<th class="sortable time" data-column-type="time">EndTime</th>')
 
@@ -1,20 +1,27 @@
 import re
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import partial
+from hashlib import sha1
+from itertools import count
 from io import StringIO
 from tempfile import NamedTemporaryFile
 from pathlib import Path
 from subprocess import run, PIPE
 from typing import Callable
-from time import sleep
 from inspect import getfullargspec
 
 import pytest
 from paramiko import SSHClient, RSAKey, MissingHostKeyPolicy
-from pkg_resources import parse_version
 from cryptography.hazmat import backends
 from cryptography.hazmat.primitives import asymmetric, serialization
 
 from harvester_api import HarvesterAPI
+from harvester_api.cassettes import Cassette
+from harvester_api.limiters import limiter_for
+from harvester_api.polling import poll_all
+from harvester_api.versions import parse_version
+
+from .base import SharedRegistry, worker_id
 
 
 @pytest.fixture(scope="session")
@@ -32,14 +39,34 @@ def harvester_metadata(pytestconfig):
     return harv
 
 
+@pytest.fixture(scope="session")
+def shared_registry(tmp_path_factory):
+    ''' Registry of resources shared by pytest-xdist workers (or the only process) '''
+    root = tmp_path_factory.getbasetemp()
+    if "master" != worker_id():
+        # base temp of workers is `<base>/popen-gw<N>`
+        root = root.parent
+    return SharedRegistry(root / "shared-resources")
+
+
 @pytest.fixture(scope="session")
 def api_client(request, harvester_metadata):
     endpoint = request.config.getoption("--endpoint")
     username = request.config.getoption("--username")
     password = request.config.getoption("--password")
     ssl_verify = request.config.getoption("--ssl_verify", False)
-
-    api = HarvesterAPI(endpoint)
+    rate_limit = request.config.getoption("--api-rate-limit")
+    limiter = limiter_for(
+        endpoint, shared=True, rate=rate_limit,
+        max_concurrency=request.config.getoption("--api-max-concurrency")
+    ) if rate_limit else None
+    cassette = request.config.getoption("--api-cassette")
+    transport = Cassette(
+        cassette, request.config.getoption("--api-cassette-mode")
+    ) if cassette else None
+
+    api = HarvesterAPI(endpoint, limiter=limiter, transport=transport)
+    # each worker logs in itself, tokens are not shared through the registry on disk
     api.authenticate(username, password, verify=ssl_verify)
 
     api.session.verify = ssl_verify
@@ -48,7 +75,32 @@ def api_client(request, harvester_metadata):
     harvester_metadata['Cluster Endpoint'] = endpoint
     harvester_metadata['Cluster Version'] = api.raw_version
 
-    return api
+    yield api
+
+    # connections created vs reused, to verify connections are kept warm
+    harvester_metadata['Cluster API Connections'] = api.pool_stats
+    harvester_metadata['Cluster API Retries'] = api.retry_stats
+    harvester_metadata['Cluster API Limiter'] = api.limiter_stats
+    if transport is not None:
+        # replay speed vs. the recorded run, as a benchmark of the client overhead
+        harvester_metadata['Cluster API Cassette'] = dict(
+            mode=transport.mode, played=transport.played,
+            recorded_seconds=round(transport.recorded_seconds, 1)
+        )
+        # the cassette is complete once its writer is closed
+        transport.close()
+
+    metrics = api.metrics
+    harvester_metadata['Cluster API Requests'] = dict(
+        count=metrics.count, seconds=round(metrics.elapsed, 1),
+        slowest=[f"{r['method']} {r['path']} ({r['manager'] or '-'}) x{r['count']}:"
+                 f" p50={r['p50']:.3f}s p95={r['p95']:.3f}s p99={r['p99']:.3f}s"
+                 f" total={r['total']:.1f}s" for r in metrics.summary()[:10]]
+    )
+    output = request.config.getoption("--api-metrics-output")
+    if output:
+        Path(output).write_text(metrics.to_prometheus() if output.endswith(".prom")
+                                else metrics.to_json(indent=2))
 
 
 @pytest.fixture(scope="session")
@@ -106,20 +158,37 @@ def host_state(request):
     return HostState(request.config.getoption("--node-scripts-location"))
 
 
+def _name_seeds(request):
+    ''' Seeds of names generated by the fixture, which are derived from its node ID when a
+    cassette is active, so names generated on record are the same on replay. None otherwise.
+    '''
+    if not request.config.getoption("--api-cassette"):
+        return None
+    digest = sha1(f"{request.node.nodeid}::{request.fixturename}".encode()).hexdigest()[:15]
+    return (f"{digest}-{i:05d}" for i in count())
+
+
+def _unique_name(seeds=None):
+    name = datetime.now().strftime("%Hh%Mm%Ss%f-%m-%d") if seeds is None else next(seeds)
+    # names generated by workers of pytest-xdist at the same time should not collide
+    worker = worker_id()
+    return name if "master" == worker else f"{name}-{worker}"
+
+
 @pytest.fixture(scope='module')
-def unique_name():
+def unique_name(request):
     """Default unique name"""
-    return datetime.now().strftime("%Hh%Mm%Ss%f-%m-%d")
+    return _unique_name(_name_seeds(request))
 
 
 @pytest.fixture(scope='module')
-def gen_unique_name():
+def gen_unique_name(request):
     """Generate unique name on-demand"""
-    return lambda: datetime.now().strftime("%Hh%Mm%Ss%f-%m-%d")
+    return partial(_unique_name, _name_seeds(request))
 
 
-@pytest.fixture(scope="module")
-def ssh_keypair():
+def generate_ssh_keypair():
+    """Return (public key in OpenSSH format, private key in PEM)"""
     private_key = asymmetric.rsa.generate_private_key(
         public_exponent=65537,
         key_size=4096,
@@ -140,6 +209,11 @@ def ssh_keypair():
     return public_key_ssh.decode('utf-8'), private_key_pem.decode('utf-8')
 
 
+@pytest.fixture(scope="module")
+def ssh_keypair():
+    return generate_ssh_keypair()
+
+
 @pytest.fixture(scope="session")
 def fake_image_file():
     with NamedTemporaryFile("wb") as f:
@@ -354,21 +428,24 @@ def host_shell(request):
 
 @pytest.fixture(scope="session")
 def polling_for(wait_timeout, sleep_timeout):
-    # TODO: Try to redesign refer to multiprocessing package (e.g. apply_async and map_async)
     def _polling_for(subject: str,
                      checker: Callable[..., bool],
                      poller: Callable, *args,
-                     timeout=wait_timeout):
-        """ Polling expected confition for `timeout`s every `sleep_timeout`s
+                     timeout=wait_timeout, detail=False):
+        """ Polling expected confition for `timeout`s, testees are polled concurrently and
+        each one every `sleep_timeout`s.
 
         Arguments:
           subject: str, what is waiting for
           checker: Callable, check `poller` output and returns bool
-          args: list, [*poller_args, testee]
+          args: list, [*poller_args, testee], `testee` could be a list of testees
           poller: Callable, poller(*poller_args, testee) for each testee
+          detail: bool, to return `PollResult` of each testee
 
         Returns:
           Any: `poller` output if qualified by `checker`
+          dict: `poller` output of each testee, if `testee` is a list
+          list[PollResult]: outputs and timings of testees, if `detail`
 
         Raises:
           AssertionError: if still NOT qualified within `timeout`s
@@ -377,21 +454,24 @@ def polling_for(wait_timeout, sleep_timeout):
         testees = testee if isinstance(testee, list) else [testee]
         checker_args_len = len(getfullargspec(checker).args)
 
-        endtime = datetime.now() + timedelta(seconds=timeout)
-        while endtime > datetime.now():
-            for testee in testees[:]:
-                output = poller(*poller_args, testee)
-                # unpack poller output according to checker signature
-                qualified = checker(*output) if checker_args_len > 1 else checker(output)
-                if qualified:
-                    testees.remove(testee)
-            if not testees:
-                return output
-            sleep(sleep_timeout)
-        else:
+        results = poll_all(
+            testees,
+            lambda testee: poller(*poller_args, testee),
+            # unpack poller output according to checker signature
+            lambda output: checker(*output) if checker_args_len > 1 else checker(output),
+            timeout, sleep_timeout
+        )
+        pending = [r for r in results if not r.qualified]
+        if pending:
             raise AssertionError(
                 f'Timeout {timeout}s waiting for {subject}\n'
-                f'Got error: {output}'
+                f'Still pending: {[r.testee for r in pending]}\n'
+                + "\n".join(f'Got error of {r.testee}: {r.output}' for r in pending)
             )
+        if detail:
+            return results
+        if isinstance(testee, list):
+            return {r.testee: r.output for r in results}
+        return results[0].output
 
     return _polling_for
@@ -1,18 +1,245 @@
-from datetime import datetime, timedelta
-from time import sleep
+import json
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from threading import Event, Lock, Thread
+from time import monotonic, sleep
 
+from filelock import FileLock
+from harvester_api.retries import deadline
 
-def wait_until(timeout, snooze=3):
+#: Max seconds to wait for pump threads of closed watches
+WATCH_CLOSE_TIMEOUT = 5
+#: Seconds to sleep after the first call of `wait_until`, doubled up to `snooze` afterwards
+MIN_SNOOZE = 0.5
+
+WaitRecord = namedtuple("WaitRecord", "subject attempts elapsed outcome")
+
+
+class WaitStats:
+    ''' Session-wide collector of waits, outcome is one of `qualified`, `timeout` or `error` '''
+    def __init__(self):
+        self.records = []
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def record(self, subject, attempts, elapsed, outcome):
+        with self._lock:
+            self.records.append(WaitRecord(subject, attempts, elapsed, outcome))
+
+    def summary(self, top=None):
+        ''' Aggregate records by subject, sorted by total elapsed seconds in descending order
+
+        Returns:
+            list[dict]: subject, waits, attempts, elapsed, max_elapsed and timeouts
+        '''
+        by_subject = dict()
+        with self._lock:
+            records = list(self.records)
+        for r in records:
+            s = by_subject.setdefault(r.subject, dict(subject=r.subject, waits=0, attempts=0,
+                                                      elapsed=0., max_elapsed=0., timeouts=0))
+            s['waits'] += 1
+            s['attempts'] += r.attempts
+            s['elapsed'] += r.elapsed
+            s['max_elapsed'] = max(s['max_elapsed'], r.elapsed)
+            s['timeouts'] += "timeout" == r.outcome
+        return sorted(by_subject.values(), key=lambda s: s['elapsed'], reverse=True)[:top]
+
+
+#: Waits of the session, reported in the terminal summary
+WAIT_STATS = WaitStats()
+
+
+@contextmanager
+def snoozer(watches, snooze):
+    ''' Yield a function to snooze `snooze`s (or `timeout`s), i.e. `wait(timeout=snooze)`,
+    which returns early on the next event from any of `watches`.
+
+    Watches are closed on exit, and their pump threads are joined.
+
+    Args:
+        watches: list of watch iterators (e.g. `api_client.vms.watch(name)`) or None
+        snooze: seconds to snooze by default
+    '''
+    watches = [w for w in (watches or []) if w]
+    changed, alive, pumps = Event(), [], []
+
+    def pump(watch):
+        try:
+            for _ in watch:
+                changed.set()
+        except Exception:
+            pass
+        finally:
+            alive.remove(watch)
+            changed.set()
+
+    for w in watches:
+        alive.append(w)
+        pumps.append(Thread(target=pump, args=(w,), daemon=True))
+        pumps[-1].start()
+
+    def wait(timeout=snooze):
+        if alive:
+            if changed.wait(timeout):
+                changed.clear()
+        else:
+            sleep(timeout)
+
+    try:
+        yield wait
+    finally:
+        for w in watches:
+            w.close()
+        endtime = monotonic() + WATCH_CLOSE_TIMEOUT
+        for t in pumps:
+            t.join(max(endtime - monotonic(), 0))
+
+
+def wait_until(timeout, snooze=3, watch=None, subject=None):
+    ''' Decorator to call `api_func` until qualified or timed out
+
+    `api_func` is re-called after `MIN_SNOOZE`s at first and the interval is doubled up to
+    `snooze`s. The wait is a `harvester_api.retries.deadline`, so requests (and their
+    retries) of `api_func` and nested waits share the earliest endtime. Each wait is
+    recorded into `WAIT_STATS`.
+
+    Args:
+        timeout: seconds to wait
+        snooze: max seconds to sleep between calls if `watch` is unavailable
+        watch: Callable, watch(*args, timeout=timeout, **kwargs) returns watch iterator of
+               the resource, opened if the first call is not qualified, then `api_func` is
+               also re-called on its events
+        subject: str, name of the wait in `WAIT_STATS`, qualified name of `api_func` if None
+    '''
     def wait_until_decorator(api_func):
+        name = subject or api_func.__qualname__.rsplit("<locals>.", 1)[-1]
+
+        def watching(args, kwargs, remaining):
+            try:
+                return [watch(*args, timeout=remaining, **kwargs)] if watch else None
+            except NotImplementedError:
+                return None
+
+        @wraps(api_func)
         def wrapped(*args, **kwargs):
-            endtime = datetime.now() + timedelta(seconds=timeout)
-            while endtime > datetime.now():
-                qualified, (code, data) = api_func(*args, **kwargs)
-                if qualified:
-                    break
-                sleep(snooze)
+            started = monotonic()
+            with deadline(timeout) as endtime:
+                attempts, outcome, interval = 1, "error", min(MIN_SNOOZE, snooze)
+                try:
+                    qualified, (code, data) = api_func(*args, **kwargs)
+                    remaining = endtime - monotonic()
+                    if not qualified and remaining > 0:
+                        # the watch is only opened if the first call is not qualified
+                        with snoozer(watching(args, kwargs, remaining), snooze) as wait:
+                            while not qualified and remaining > 0:
+                                wait(min(interval, remaining))
+                                interval = min(interval * 2, snooze)
+                                attempts += 1
+                                qualified, (code, data) = api_func(*args, **kwargs)
+                                remaining = endtime - monotonic()
+                    outcome = "qualified" if qualified else "timeout"
+                finally:
+                    WAIT_STATS.record(name, attempts, monotonic() - started, outcome)
             return qualified, (code, data)
 
         return wrapped
 
     return wait_until_decorator
+
+
+def worker_id():
+    ''' Name of the pytest-xdist worker, e.g. `gw0`, or `master` if not distributed '''
+    return os.environ.get("PYTEST_XDIST_WORKER", "master")
+
+
+class SharedRegistry:
+    ''' Registry of resources shared by pytest-xdist workers, kept in a directory shared by
+    workers of the run.
+
+    The first worker acquiring a resource creates it with the entry's file lock held, so the
+    others block until it is ready, then they reuse its identity. References are counted per
+    worker, and the last worker releasing it cleans it up and deletes the entry.
+    Entries are only readable by the user, but identities should not hold secrets anyway.
+    '''
+    def __init__(self, root, worker=None):
+        self.root = Path(root)
+        self.worker = worker or worker_id()
+        self.root.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    def __repr__(self):
+        return f"SharedRegistry({str(self.root)!r}, {self.worker!r})"
+
+    def _path(self, key):
+        return self.root / f"{key}.json"
+
+    def _read(self, key):
+        try:
+            return json.loads(self._path(key).read_text())
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key, entry):
+        tmp = self._path(key).with_suffix(f".{self.worker}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps(entry))
+        tmp.replace(self._path(key))
+
+    @contextmanager
+    def locked(self, key):
+        with FileLock(str(self.root / f"{key}.lock")):
+            yield
+
+    def acquire(self, key, create):
+        ''' Return identity of the shared resource, `create()` is called if absent
+
+        Args:
+            key: str, name of the resource in the registry, e.g. `image-ubuntu`
+            create: Callable, returns JSON serializable identity of the created resource
+        '''
+        with self.locked(key):
+            entry = self._read(key)
+            if entry is None:
+                entry = dict(identity=create(), owner=self.worker, refs=dict())
+            entry['refs'][self.worker] = entry['refs'].get(self.worker, 0) + 1
+            self._write(key, entry)
+            return entry['identity']
+
+    def release(self, key, cleanup=None):
+        ''' Drop a reference of the worker, `cleanup(identity)` is called by the last one
+
+        Returns:
+            bool: the resource is cleaned up
+        '''
+        with self.locked(key):
+            entry = self._read(key)
+            if entry is None:
+                return False
+            refs = entry['refs']
+            refs[self.worker] = refs.get(self.worker, 1) - 1
+            if refs[self.worker] <= 0:
+                del refs[self.worker]
+            if refs:
+                self._write(key, entry)
+                return False
+            try:
+                if cleanup is not None:
+                    cleanup(entry['identity'])
+            finally:
+                self._path(key).unlink()
+            return True
+
+    @contextmanager
+    def shared(self, key, create, cleanup=None):
+        ''' Context manager to acquire the resource and release it on exit '''
+        identity = self.acquire(key, create)
+        try:
+            yield identity
+        finally:
+            self.release(key, cleanup)
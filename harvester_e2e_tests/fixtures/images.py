@@ -1,3 +1,10 @@
+import re
+import warnings
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from hashlib import sha1
+from threading import Lock
 from urllib.parse import urlparse, urljoin
 
 import pytest
@@ -81,14 +88,17 @@ def image_checker(api_client, wait_timeout, sleep_timeout):
         def __init__(self):
             self.images = api_client.images
 
-        @wait_until(wait_timeout, sleep_timeout)
+        def _watch(self, image_name, timeout):
+            return self.images.watch(image_name, timeout=timeout)
+
+        @wait_until(wait_timeout, sleep_timeout, watch=_watch)
         def wait_downloaded(self, image_name):
             code, data = self.images.get(image_name)
             if data.get('status', {}).get('progress') == 100:
                 return True, (code, data)
             return False, (code, data)
 
-        @wait_until(wait_timeout, sleep_timeout)
+        @wait_until(wait_timeout, sleep_timeout, watch=_watch)
         def wait_deleted(self, image_name):
             code, data = self.images.get(image_name)
             if code == 404:
@@ -96,3 +106,111 @@ def image_checker(api_client, wait_timeout, sleep_timeout):
             return False, (code, data)
 
     return ImageChecker()
+
+
+class ImagePool:
+    ''' Images shared by test modules, each distinct (url, checksum, storageclass) is
+    downloaded once per run (across pytest-xdist workers by the registry), and deleted at the
+    end of the session.
+    '''
+    def __init__(self, api_client, registry, image_checker, max_workers=4):
+        self.images = api_client.images
+        self.registry = registry
+        self.image_checker = image_checker
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="image-pool")
+        self._leases = dict()  # key => Future of the identity
+        self._holds = Counter()  # key => number of resources are backed by the image
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f"{__class__.__name__}({sorted(self._leases)})"
+
+    @staticmethod
+    def key(image, storageclass=None):
+        ''' Name of the pooled image, which is also the key in the registry '''
+        digest = sha1(
+            f"{image.url}|{image.image_checksum or ''}|{storageclass or ''}".encode()
+        ).hexdigest()[:10]
+        name = re.sub(r"[^a-z0-9-]+", "-", image.name.lower()).strip("-")[:40]
+        return f"pool-{name}-{digest}"
+
+    def prefetch(self, image, storageclass=None):
+        ''' Start downloading the image in background if it is not leased yet
+
+        Returns:
+            Future: resolves to the identity of the image
+        '''
+        key = self.key(image, storageclass)
+        with self._lock:
+            future = self._leases.get(key)
+            if future is None:
+                create = partial(self._create, key, image, storageclass)
+                future = self._executor.submit(self.registry.acquire, key, create)
+                self._leases[key] = future
+        return future
+
+    def lease(self, image, storageclass=None):
+        ''' Block until the image is downloaded, the image must NOT be modified or deleted
+
+        Returns:
+            dict: `id` (namespace/name), `name`, `namespace`, `uid`, `user`, `first_nic`
+                  and `info` (metadata and status of the image)
+        '''
+        identity = self.prefetch(image, storageclass).result()
+        return dict(identity, user=image.ssh_user, first_nic=image.first_nic)
+
+    def hold(self, image_id):
+        ''' Mark the leased image (by `id` of `lease`) is backing a resource, e.g. a VM's disk,
+        which will be deleted by someone else than the test module leasing it. Held images are
+        kept by `close` until they are `unhold`.
+        '''
+        with self._lock:
+            self._holds[image_id.split("/")[-1]] += 1
+
+    def unhold(self, image_id):
+        ''' The resource backed by the image (by `id` of `lease`) has been deleted '''
+        with self._lock:
+            self._holds[image_id.split("/")[-1]] -= 1
+
+    def _create(self, name, image, storageclass):
+        code, data = self.images.create_by_url(name, image.url, image.image_checksum,
+                                               display_name=name, storageclass=storageclass)
+        # 409: the image was left by an interrupted run, which is the same one
+        assert code in (201, 409), (code, data)
+
+        downloaded, (code, data) = self.image_checker.wait_downloaded(name)
+        assert downloaded, f"Failed to download Image {name} with error:\nStatus({code}): {data}"
+        metadata = data['metadata']
+        return dict(id=f"{metadata['namespace']}/{name}", name=name,
+                    namespace=metadata['namespace'], uid=metadata['uid'],
+                    info=dict(metadata=metadata, status=data['status']))
+
+    def close(self):
+        ''' Release leased images but held ones, images are deleted by the last worker using it '''
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for key, future in self._leases.items():
+            if self._holds[key] > 0:
+                # still backing resources, e.g. a VM failed to be deleted
+                warnings.warn(UserWarning(f"Image {key} is kept, {self._holds[key]} holding"))
+                continue
+            if not future.cancelled() and future.exception() is None:
+                self.registry.release(key, lambda identity: self.images.delete(identity['name']))
+
+
+@pytest.fixture(scope="session")
+def image_pool(api_client, shared_registry, image_checker):
+    pool = ImagePool(api_client, shared_registry, image_checker)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def image_pool_prefetch(request):
+    ''' Download images to be leased by collected tests in background at session start '''
+    items = [item for item in request.session.items if "image_pool" in item.fixturenames]
+    if not items:
+        return
+    pool = request.getfixturevalue("image_pool")
+    for name in ("image_opensuse", "image_ubuntu"):
+        if any(name in item.fixturenames for item in items):
+            pool.prefetch(request.getfixturevalue(name))
@@ -1,8 +1,8 @@
 import warnings
 
 import pytest
-from pkg_resources import parse_version
 
+from harvester_api.versions import parse_version
 from rancher_api import RancherAPI
 
 
@@ -20,7 +20,10 @@ def rancher_api_client(request, harvester_metadata):
     harvester_metadata['Rancher Endpoint'] = endpoint
     harvester_metadata['Rancher Version'] = api.raw_version
 
-    return api
+    yield api
+
+    harvester_metadata['Rancher API Connections'] = api.pool_stats
+    harvester_metadata['Rancher API Retries'] = api.retry_stats
 
 
 def _pickup_k8s_version(versions, target_version):
@@ -1,25 +1,31 @@
-import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from io import StringIO
+from itertools import count
+from queue import Empty, Queue
+from threading import Lock
 from time import sleep
 from datetime import datetime, timedelta
 from ipaddress import ip_network
 from contextlib import contextmanager
 
 import pytest
+import yaml
 from paramiko import SSHClient, RSAKey, MissingHostKeyPolicy
 from paramiko.ssh_exception import ChannelException, NoValidConnectionsError
 
+from harvester_api.managers import DEFAULT_NAMESPACE
+from .api_client import generate_ssh_keypair
+from .base import snoozer, wait_until, worker_id
+
 
 @pytest.fixture(scope="session")
 def vm_mgmt_static(api_client):
-    code, data = api_client.hosts.get()
-    assert 200 == code, (code, data)
-
-    for node in data['data']:
-        rke2_args = node['metadata']['annotations']['rke2.io/node-args']
-        match = re.search(r'cluster-cidr[\",]+((?:\d+\.?)+\/\d+)\"', rke2_args)
-        if match:
-            cluster_cidr = match.group(1)
+    for node in api_client.hosts.iter_views():
+        args = node.node_args
+        if "--cluster-cidr" in args[:-1]:
+            # the first one of dual-stack CIDRs, e.g. `10.52.0.0/16,2001:cafe:42::/56`
+            cluster_cidr = args[args.index("--cluster-cidr") + 1].split(",")[0]
             break
     else:
         raise AssertionError("cluster-cidr is not available")
@@ -170,15 +176,26 @@ def vm_checker(api_client, wait_timeout, sleep_timeout, vm_shell):
             finally:
                 self.snooze, self.wait_timeout = s, t
 
+        def _watching(self, vm_name, endtime, vm=True, vmi=False, **kws):
+            ''' context manager yields a function to block until the next event of VM/VMI '''
+            ns = kws.get('namespace', DEFAULT_NAMESPACE)
+            timeout = max((endtime - datetime.now()).total_seconds(), 0)
+            watches = [
+                vm and self.vms.watch(vm_name, ns, timeout=timeout),
+                vmi and self.vms.watch_status(vm_name, ns, timeout=timeout)
+            ]
+            return snoozer(watches, self.snooze)
+
         def wait_getable(self, vm_name, endtime=None, callback=default_cb, **kws):
             endtime = endtime or self._endtime()
-            while endtime > datetime.now():
-                ctx = ResponseContext('vm.get', *self.vms.get(vm_name, **kws))
-                if 200 == ctx.code and callback(ctx):
-                    break
-                sleep(self.snooze)
-            else:
-                return False, ctx
+            with self._watching(vm_name, endtime, **kws) as snooze:
+                while endtime > datetime.now():
+                    ctx = ResponseContext('vm.get', *self.vms.get(vm_name, **kws))
+                    if 200 == ctx.code and callback(ctx):
+                        break
+                    snooze()
+                else:
+                    return False, ctx
             return True, ctx
 
         def wait_stopped(self, vm_name, endtime=None, callback=default_cb, **kws):
@@ -187,13 +204,14 @@ def vm_checker(api_client, wait_timeout, sleep_timeout, vm_shell):
                 return False, ctx
 
             endtime = endtime or self._endtime()
-            while endtime > datetime.now():
-                ctx = ResponseContext('get_status', *self.vms.get_status(vm_name, **kws))
-                if 404 == ctx.code and callback(ctx):
-                    break
-                sleep(self.snooze)
-            else:
-                return False, ctx
+            with self._watching(vm_name, endtime, vmi=True, **kws) as snooze:
+                while endtime > datetime.now():
+                    ctx = ResponseContext('get_status', *self.vms.get_status(vm_name, **kws))
+                    if 404 == ctx.code and callback(ctx):
+                        break
+                    snooze()
+                else:
+                    return False, ctx
             return True, ctx
 
         def wait_status_stopped(self, vm_name, endtime=None, callback=default_cb, **kws):
@@ -211,14 +229,15 @@ def vm_checker(api_client, wait_timeout, sleep_timeout, vm_shell):
 
         def wait_status_running(self, vm_name, endtime=None, callback=default_cb, **kws):
             endtime = endtime or self._endtime()
-            while endtime > datetime.now():
-                ctx = ResponseContext('vm.get', *self.vms.get(vm_name, **kws))
-                status = ctx.data.get('status', {}).get('printableStatus')
-                if 200 == ctx.code and "Running" == status and callback(ctx):
-                    break
-                sleep(self.snooze)
-            else:
-                return False, ctx
+            with self._watching(vm_name, endtime, **kws) as snooze:
+                while endtime > datetime.now():
+                    ctx = ResponseContext('vm.get', *self.vms.get(vm_name, **kws))
+                    status = ctx.data.get('status', {}).get('printableStatus')
+                    if 200 == ctx.code and "Running" == status and callback(ctx):
+                        break
+                    snooze()
+                else:
+                    return False, ctx
             return True, ctx
 
         def wait_deleted(self, vm_name, endtime=None, callback=default_cb, **kws):
@@ -227,15 +246,16 @@ def vm_checker(api_client, wait_timeout, sleep_timeout, vm_shell):
                 return False, ctx
 
             endtime = endtime or self._endtime()
-            while endtime > datetime.now():
-                # Use get (VM) but not only get_status (VMI) because the VM controller handles
-                # resource relations includes snapshot PVC.
-                ctx = ResponseContext('vm.get', *self.vms.get(vm_name, **kws))
-                if 404 == ctx.code and callback(ctx):
-                    break
-                sleep(self.snooze)
-            else:
-                return False, ctx
+            with self._watching(vm_name, endtime, **kws) as snooze:
+                while endtime > datetime.now():
+                    # Use get (VM) but not only get_status (VMI) because the VM controller
+                    # handles resource relations includes snapshot PVC.
+                    ctx = ResponseContext('vm.get', *self.vms.get(vm_name, **kws))
+                    if 404 == ctx.code and callback(ctx):
+                        break
+                    snooze()
+                else:
+                    return False, ctx
             return True, ctx
 
         def wait_restarted(self, vm_name, endtime=None, callback=default_cb, **kws):
@@ -249,17 +269,18 @@ def vm_checker(api_client, wait_timeout, sleep_timeout, vm_shell):
                 return False, ctx
 
             endtime = endtime or self._endtime()
-            while endtime > datetime.now():
-                ctx = ResponseContext('vm.get_status', *self.vms.get_status(vm_name, **kws),
-                                      ctx.options)
-                if 404 != ctx.code:
-                    old_pods = ctx.options['old_pods']
-                    cur_pods = ctx.data['status'].get('activePods', {}).items()
-                    if old_pods.difference(cur_pods or old_pods) and callback(ctx):
-                        break
-                sleep(self.snooze)
-            else:
-                return False, ctx
+            with self._watching(vm_name, endtime, vm=False, vmi=True, **kws) as snooze:
+                while endtime > datetime.now():
+                    ctx = ResponseContext('vm.get_status', *self.vms.get_status(vm_name, **kws),
+                                          ctx.options)
+                    if 404 != ctx.code:
+                        old_pods = ctx.options['old_pods']
+                        cur_pods = ctx.data['status'].get('activePods', {}).items()
+                        if old_pods.difference(cur_pods or old_pods) and callback(ctx):
+                            break
+                    snooze()
+                else:
+                    return False, ctx
             return self.wait_started(vm_name, endtime, callback, **kws)
 
         def wait_started(self, vm_name, endtime=None, callback=default_cb, **kws):
@@ -268,17 +289,18 @@ def vm_checker(api_client, wait_timeout, sleep_timeout, vm_shell):
                 return False, ctx
 
             endtime = endtime or self._endtime()
-            while endtime > datetime.now():
-                ctx = ResponseContext('vm.get_status', *self.vms.get_status(vm_name, **kws))
-                if (
-                    200 == ctx.code
-                    and "Running" == ctx.data.get('status', {}).get('phase')
-                    and callback(ctx)
-                ):
-                    break
-                sleep(self.snooze)
-            else:
-                return False, ctx
+            with self._watching(vm_name, endtime, vm=False, vmi=True, **kws) as snooze:
+                while endtime > datetime.now():
+                    ctx = ResponseContext('vm.get_status', *self.vms.get_status(vm_name, **kws))
+                    if (
+                        200 == ctx.code
+                        and "Running" == ctx.data.get('status', {}).get('phase')
+                        and callback(ctx)
+                    ):
+                        break
+                    snooze()
+                else:
+                    return False, ctx
             return True, ctx
 
         def wait_agent_connected(self, vm_name, endtime=None, callback=default_cb, **kws):
@@ -479,3 +501,233 @@ def vm_calc():
                 return val * (inc_base ** exp)
 
     return VMResourceCalc
+
+
+@dataclass
+class PooledVM:
+    ''' VM leased from `VMPool`, which is running with the guest agent connected '''
+    name: str
+    namespace: str
+    user: str
+    pkey: str = field(repr=False)
+    pub_key: str = field(repr=False)
+    snapshot: str
+    profile: tuple = field(repr=False)
+    image: str = field(repr=False)
+
+
+class VMPool:
+    ''' Pre-booted VMs per profile (image, cpu, memory and other options of the Spec).
+
+    Each VM is booted until the guest agent connected, then a golden snapshot is taken.
+    Returned VMs are reset by restoring the snapshot (or replaced if it is failed) in
+    background. `size` VMs (leased, ready or warming) are kept per profile, more VMs are
+    booted only while all of them are leased, and they are deleted once returned.
+    '''
+    def __init__(self, api_client, vm_checker, image_pool, wait_timeout, snooze=3, size=1,
+                 max_workers=4):
+        self.api = api_client
+        self.vm_checker = vm_checker
+        self.image_pool = image_pool
+        self.size = size
+        self.pub_key, self.pkey = generate_ssh_keypair()
+        self.wait_snapshot_ready = wait_until(wait_timeout, snooze)(self._snapshot_ready)
+
+        worker = worker_id()
+        self._prefix = "pool-vm" if "master" == worker else f"pool-vm-{worker}"
+        self._ids = count()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="vm-pool")
+        self._lock = Lock()
+        self._ready = dict()  # profile => Queue of PooledVM or exception of warming
+        self._warming = dict()  # profile => number of VMs are warming
+        self._leased = dict()  # profile => number of VMs are leased
+        self._waiting = dict()  # profile => number of leases are waiting for a VM
+        self._vms = dict()  # name => PooledVM, all VMs of the pool
+
+    def __repr__(self):
+        return f"{__class__.__name__}(size={self.size}, vms={sorted(self._vms)})"
+
+    @staticmethod
+    def profile(image, cpu=1, mem=2, **options):
+        return (image, cpu, mem, tuple(sorted(options.items())))
+
+    def prefetch(self, image, cpu=1, mem=2, **options):
+        ''' Start warming VMs of the profile in background '''
+        profile = self.profile(image, cpu, mem, **options)
+        with self._lock:
+            self._top_up(profile)
+        return profile
+
+    def lease(self, image, cpu=1, mem=2, *, timeout=None, **options):
+        ''' Block until a VM of the profile is ready, it must be returned by `release`
+
+        Raises:
+            AssertionError: if no VM is ready within `timeout`s
+        '''
+        profile = self.profile(image, cpu, mem, **options)
+        with self._lock:
+            self._waiting[profile] = self._waiting.get(profile, 0) + 1
+            self._top_up(profile)
+        try:
+            vm = self._ready[profile].get(timeout=timeout)
+        except Empty:
+            raise AssertionError(f"No VM of {profile} is ready in {timeout}s")
+        finally:
+            with self._lock:
+                self._waiting[profile] -= 1
+        if isinstance(vm, Exception):
+            raise vm
+        with self._lock:
+            self._leased[profile] = self._leased.get(profile, 0) + 1
+        return vm
+
+    def release(self, vm, replace=False):
+        ''' Return the VM to be reset in background, or to be replaced if `replace`.
+        The VM is deleted instead if the pool has enough VMs of the profile without it.
+        '''
+        with self._lock:
+            self._leased[vm.profile] -= 1
+            waiting = self._waiting.get(vm.profile, 0)
+            surplus = 0 == waiting and self._owned(vm.profile) >= self.size
+        if surplus:
+            self._executor.submit(self._delete, vm)
+        else:
+            self._executor.submit(self._recycle, vm, replace)
+
+    @contextmanager
+    def leasing(self, image, cpu=1, mem=2, **options):
+        vm = self.lease(image, cpu, mem, **options)
+        try:
+            yield vm
+        finally:
+            self.release(vm)
+
+    def close(self):
+        ''' Delete all VMs of the pool with their golden snapshots and volumes '''
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for name, vm in list(self._vms.items()):
+            self._delete(vm)
+
+    def _owned(self, profile):
+        ''' Number of VMs of the profile, which are ready, warming or leased '''
+        return (self._ready[profile].qsize() + self._warming.get(profile, 0)
+                + self._leased.get(profile, 0))
+
+    def _top_up(self, profile):
+        ''' Warm VMs to keep `size` VMs of the profile, and one more for each waiting lease
+        which no ready or warming VM is left for. The lock must be held.
+        '''
+        self._ready.setdefault(profile, Queue())
+        spares = self._ready[profile].qsize() + self._warming.get(profile, 0)
+        lacks = max(self.size - self._owned(profile), self._waiting.get(profile, 0) - spares)
+        for _ in range(lacks):
+            self._warming[profile] = self._warming.get(profile, 0) + 1
+            self._executor.submit(self._warm, profile)
+
+    def _snapshot_ready(self, name, namespace):
+        code, data = self.api.vm_snapshots.get(name, namespace)
+        return 200 == code and data.get('status', {}).get('readyToUse'), (code, data)
+
+    def _claims(self, name, namespace):
+        code, data = self.api.vms.get(name, namespace)
+        if 200 != code:
+            return set()
+        spec = self.api.vms.Spec.from_dict(data)
+        return {v['volume']['persistentVolumeClaim']['claimName']
+                for v in spec.volumes if 'persistentVolumeClaim' in v['volume']}
+
+    def _warm(self, profile):
+        vm = None
+        try:
+            vm = self._create(profile)
+            self._boot(vm)
+            result = vm
+        except Exception as e:
+            if vm is not None:
+                # partially created, it is neither ready nor warming
+                try:
+                    self._executor.submit(self._delete, vm)
+                except RuntimeError:
+                    pass  # the pool is closing, which deletes it
+            result = e
+        with self._lock:
+            self._warming[profile] -= 1
+            self._ready[profile].put(result)
+
+    def _create(self, profile):
+        image_info, cpu, mem, options = profile
+        image = self.image_pool.lease(image_info)
+        name = f"{self._prefix}-{next(self._ids)}"
+        spec = self.api.vms.Spec(cpu, mem, **dict(options))
+        spec.add_image("disk-0", image['id'], image_uid=image['uid'])
+        userdata = yaml.safe_load(spec.user_data)
+        userdata['ssh_authorized_keys'] = [self.pub_key]
+        spec.user_data = yaml.dump(userdata)
+
+        code, data = self.api.vms.create(name, spec)
+        assert 201 == code, (code, data)
+        vm = PooledVM(name, data['metadata']['namespace'], image['user'], self.pkey,
+                      self.pub_key, f"{name}-golden", profile, image['id'])
+        # the image backs the VM's disk, it must be kept until the VM is deleted
+        self.image_pool.hold(image['id'])
+        self._vms[name] = vm
+        return vm
+
+    def _boot(self, vm):
+        booted, (code, data) = self.vm_checker.wait_agent_connected(vm.name)
+        assert booted, f"Failed to boot pooled VM {vm.name}\nStatus({code}): {data}"
+
+        code, data = self.api.vm_snapshots.create(vm.name, vm.snapshot, vm.namespace)
+        assert 201 == code, (code, data)
+        ready, (code, data) = self.wait_snapshot_ready(vm.snapshot, vm.namespace)
+        assert ready, f"Snapshot {vm.snapshot} is not ready\nStatus({code}): {data}"
+        return vm
+
+    def _recycle(self, vm, replace=False):
+        if not replace:
+            try:
+                self._reset(vm)
+            except Exception:
+                replace = True
+        if replace:
+            self._delete(vm)
+            with self._lock:
+                self._warming[vm.profile] += 1
+            self._warm(vm.profile)
+        else:
+            self._ready[vm.profile].put(vm)
+
+    def _reset(self, vm):
+        claims = self._claims(vm.name, vm.namespace)
+        stopped, (code, data) = self.vm_checker.wait_stopped(vm.name)
+        assert stopped, (code, data)
+
+        spec = self.api.vm_snapshots.RestoreSpec.for_existing()
+        code, data = self.api.vm_snapshots.restore(vm.snapshot, spec, vm.namespace)
+        assert 201 == code, (code, data)
+        running, (code, data) = self.vm_checker.wait_status_running(vm.name)
+        assert running, (code, data)
+        connected, (code, data) = self.vm_checker.wait_agent_connected(vm.name)
+        assert connected, (code, data)
+
+        # volumes replaced by the restore are retained (snapshots only support `retain`)
+        for claim in claims - self._claims(vm.name, vm.namespace):
+            self.api.volumes.delete(claim, vm.namespace)
+
+    def _delete(self, vm):
+        claims = self._claims(vm.name, vm.namespace)
+        deleted, (code, data) = self.vm_checker.wait_deleted(vm.name)
+        self.api.vm_snapshots.delete(vm.snapshot, vm.namespace)
+        for claim in claims:
+            self.api.volumes.delete(claim, vm.namespace)
+        self._vms.pop(vm.name, None)
+        if deleted or 404 == code:
+            self.image_pool.unhold(vm.image)
+
+
+@pytest.fixture(scope="session")
+def vm_pool(request, api_client, vm_checker, image_pool, wait_timeout, sleep_timeout):
+    pool = VMPool(api_client, vm_checker, image_pool, wait_timeout, sleep_timeout,
+                  size=request.config.getoption("--vm-pool-size"))
+    yield pool
+    pool.close()
@@ -2,10 +2,8 @@ import concurrent.futures
 import filecmp
 import hashlib
 import json
-import re
 import threading
 from time import sleep, time
-import zlib
 from datetime import datetime, timedelta
 from pathlib import Path
 from tempfile import NamedTemporaryFile
@@ -429,19 +427,15 @@ class TestImageWithStorageNetwork:
         assert unique_name == data["metadata"]["name"], (code, data)
 
     @pytest.mark.dependency(depends=["create_image_by_file"])
-    def test_download_image(self, api_client, fake_image_file, tmp_path, unique_name):
-        resp = api_client.images.download(unique_name)
-        assert resp.ok, f"Fail to download fake image with error: {resp.status_code}, {resp.text}"
-
-        filename = re.search(r'filename=(\S+)', resp.headers.get("Content-Disposition"))
-        assert filename, f"No filename info in the response header: {resp.headers}"
-        filename = filename.groups()[0]
+    def test_download_image(
+        self, api_client, fake_image_file, tmp_path, unique_name, record_property
+    ):
+        code, data = api_client.images.download_ranged(unique_name, tmp_path)
+        assert code in (200, 206), f"Fail to download fake image with error: {code}, {data}"
+        record_property("download_throughput", data.throughput)
+        assert data.filename, f"No filename info in the response header: {data}"
 
-        tmp_image_file = tmp_path / filename
-        tmp_image_file.write_bytes(
-            zlib.decompress(resp.content, 32+15) if ".gz" in filename else resp.content
-        )
-        assert filecmp.cmp(fake_image_file, tmp_image_file), (
+        assert filecmp.cmp(fake_image_file, data.path), (
             "Contents of downloaded image is NOT identical to the fake image"
         )
 
@@ -74,33 +74,8 @@ def bogus_vlan_net(request, api_client):
 
 
 @pytest.fixture(scope="module")
-def image(api_client, image_opensuse, unique_name, wait_timeout):
-    unique_image_id = f'image-{unique_name}'
-    code, data = api_client.images.create_by_url(
-        unique_image_id, image_opensuse.url, display_name=f"{unique_name}-{image_opensuse.name}"
-    )
-
-    assert 201 == code, (code, data)
-
-    endtime = datetime.now() + timedelta(seconds=wait_timeout)
-    while endtime > datetime.now():
-        code, data = api_client.images.get(unique_image_id)
-        if 100 == data.get('status', {}).get('progress', 0):
-            break
-        sleep(3)
-    else:
-        raise AssertionError(
-            "Failed to create Image with error:\n"
-            f"Status({code}): {data}"
-        )
-
-    yield dict(
-        id=f"{data['metadata']['namespace']}/{unique_image_id}",
-        user=image_opensuse.ssh_user,
-        info=dict(metadata=data['metadata'], status=data['status'])
-    )
-
-    code, data = api_client.images.delete(unique_image_id)
+def image(image_pool, image_opensuse):
+    return image_pool.lease(image_opensuse)
 
 
 @pytest.fixture(scope="module")
@@ -161,29 +136,15 @@ def stopped_vm(api_client, ssh_keypair, wait_timeout, image, unique_vm_name):
 
 
 @pytest.fixture(scope="class")
-def configured_vm(api_client, image, unique_vm_name, vm_checker):
-    unique_vm_name = f"configured-{datetime.now().strftime('%m%S%f')}-{unique_vm_name}"
-    cpu, mem = 1, 2
-    # reserved memory
-    vm = api_client.vms.Spec(cpu, mem, reserved_mem=RESERVED_MEM)
-    vm.add_image("disk-0", image['id'], image_uid=image['info']['metadata']['uid'])
+def pooled_vm(vm_pool, image_opensuse):
+    # reserved memory is checked on cloned VMs, others lease the same profile to reuse the VM
+    with vm_pool.leasing(image_opensuse, 1, 2, reserved_mem=RESERVED_MEM) as vm:
+        yield vm
 
-    code, data = api_client.vms.create(unique_vm_name, vm)
-    assert 201 == code, (code, data)
-    vm_running, (code, data) = vm_checker.wait_status_running(unique_vm_name)
-    assert vm_running, (
-        f"Failed to start VM({unique_vm_name}) with errors:\n"
-        f"Status({code}): {data}"
-    )
-
-    yield unique_vm_name, image['user']
 
-    code, data = api_client.vms.get(unique_vm_name)
-    vm_spec = api_client.vms.Spec.from_dict(data)
-    vm_checker.wait_deleted(unique_vm_name)
-    for vol in vm_spec.volumes:
-        vol_name = vol['volume']['persistentVolumeClaim']['claimName']
-        api_client.volumes.delete(vol_name)
+@pytest.fixture(scope="class")
+def configured_vm(pooled_vm):
+    return pooled_vm.name, pooled_vm.user
 
 
 @pytest.fixture
@@ -738,11 +699,11 @@ class TestVMResource:
         # make sure VM stopped and configure as minimal resource
         vm_stopped, (code, data) = vm_checker.wait_status_stopped(unique_vm_name)
         assert vm_stopped, (code, data)
-        sleep(1)  # to avoid code 409 conflict: 'object has been modified'
         code, data = api_client.vms.get(unique_vm_name)
         vm_spec = api_client.vms.Spec.from_dict(data)
         vm_spec.cpu_cores, vm_spec.memory = 1, 2
-        code, data = api_client.vms.update(unique_vm_name, vm_spec)
+        # patched with conflicts (code 409: 'object has been modified') retried
+        code, data = api_client.vms.patch(unique_vm_name, vm_spec, old=data)
         assert 200 == code, (code, data)
 
         # get the node having the maximum resource
@@ -2086,7 +2047,7 @@ class TestHotPlugVolume:
     - https://harvester.github.io/tests/manual/volumes/support-volume-hot-unplug/
 
     Steps:
-        1. Create and start VM
+        1. Lease a running VM
         2. Create Data volume
         3. Attach data volume
         4. Detach data volume
@@ -2122,14 +2083,10 @@ class TestHotPlugVolume:
 
     @pytest.mark.dependency(name="hot_plug_volume")
     def test_add(
-        self, api_client, ssh_keypair, wait_timeout, vm_checker,
-        host_shell, vm_shell, small_volume, stopped_vm
+        self, api_client, wait_timeout, vm_checker, host_shell, vm_shell, small_volume, pooled_vm
     ):
-        unique_vm_name, ssh_user = stopped_vm
-        pub_key, pri_key = ssh_keypair
+        unique_vm_name, ssh_user, pri_key = pooled_vm.name, pooled_vm.user, pooled_vm.pkey
 
-        # Start VM
-        code, data = api_client.vms.start(unique_vm_name)
         vm_got_ips, (code, data) = vm_checker.wait_ip_addresses(unique_vm_name, ['default'])
         assert vm_got_ips, (
             f"Failed to Start VM({unique_vm_name}) with errors:\n"
@@ -2194,10 +2151,9 @@ class TestHotPlugVolume:
 
     @pytest.mark.dependency(depends=["hot_plug_volume"])
     def test_remove(
-        self, api_client, ssh_keypair, wait_timeout, host_shell, vm_shell, small_volume, stopped_vm
+        self, api_client, wait_timeout, host_shell, vm_shell, small_volume, pooled_vm
     ):
-        unique_vm_name, ssh_user = stopped_vm
-        pub_key, pri_key = ssh_keypair
+        unique_vm_name, ssh_user, pri_key = pooled_vm.name, pooled_vm.user, pooled_vm.pkey
 
         # remove volume
         vol_name, vol_size = small_volume
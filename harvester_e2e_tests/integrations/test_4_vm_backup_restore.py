@@ -35,33 +35,8 @@ def conflict_retries():
 
 
 @pytest.fixture(scope="module")
-def image(api_client, unique_name, wait_timeout, image_opensuse):
-    unique_image_id = f'image-{unique_name}'
-    code, data = api_client.images.create_by_url(
-        unique_image_id, image_opensuse.url, display_name=f"{unique_name}-{image_opensuse.name}"
-    )
-
-    assert 201 == code, (code, data)
-
-    endtime = datetime.now() + timedelta(seconds=wait_timeout)
-    while endtime > datetime.now():
-        code, data = api_client.images.get(unique_image_id)
-        if 100 == data.get('status', {}).get('progress', 0):
-            break
-        sleep(3)
-    else:
-        raise AssertionError(
-            "Failed to create Image with error:\n"
-            f"Status({code}): {data}"
-        )
-
-    yield dict(
-        id=f"{data['metadata']['namespace']}/{unique_image_id}",
-        user=image_opensuse.ssh_user,
-        info=dict(metadata=data['metadata'], status=data['status'])
-    )
-
-    code, data = api_client.images.delete(unique_image_id)
+def image(image_pool, image_opensuse):
+    return image_pool.lease(image_opensuse)
 
 
 @pytest.fixture(scope='module')
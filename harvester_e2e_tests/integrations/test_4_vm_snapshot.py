@@ -43,34 +43,8 @@ def vm_snapshot_2_name():
 
 
 @pytest.fixture(scope="module")
-def image(api_client, image_opensuse, wait_timeout):
-    unique_image_id = unique_name("image")
-    display_name = f"{unique_image_id}-{image_opensuse.name}"
-    code, data = api_client.images.create_by_url(unique_image_id,
-                                                 image_opensuse.url,
-                                                 display_name=display_name)
-
-    assert 201 == code, (code, data)
-
-    deadline = datetime.now() + timedelta(seconds=wait_timeout)
-    while deadline > datetime.now():
-        code, data = api_client.images.get(unique_image_id)
-        if 100 == data.get('status', {}).get('progress', 0):
-            break
-        sleep(3)
-    else:
-        raise AssertionError(
-            "Failed to create Image with error:\n"
-            f"Status({code}): {data}"
-        )
-
-    yield dict(
-        id=f"{data['metadata']['namespace']}/{unique_image_id}",
-        user=image_opensuse.ssh_user,
-        info=dict(metadata=data['metadata'], status=data['status'])
-    )
-
-    code, data = api_client.images.delete(unique_image_id)
+def image(image_pool, image_opensuse):
+    return image_pool.lease(image_opensuse)
 
 
 def create_vm(name, api_client, ssh_keypair, image, timeout_secs):
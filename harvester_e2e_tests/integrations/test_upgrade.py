@@ -95,32 +95,8 @@ def upgrade_target(request, unique_name):
 
 
 @pytest.fixture(scope="module")
-def image(api_client, image_ubuntu, unique_name, wait_timeout):
-    unique_image_id = f'image-{unique_name}'
-    code, data = api_client.images.create_by_url(
-        unique_image_id, image_ubuntu.url, display_name=f"{unique_name}-{image_ubuntu.name}"
-    )
-
-    assert 201 == code, (code, data)
-
-    endtime = datetime.now() + timedelta(seconds=wait_timeout)
-    while endtime > datetime.now():
-        code, data = api_client.images.get(unique_image_id)
-        if 100 == data.get('status', {}).get('progress', 0):
-            break
-        sleep(3)
-    else:
-        raise AssertionError(
-            "Failed to create Image with error:\n"
-            f"Status({code}): {data}"
-        )
-
-    yield dict(id=f"{data['metadata']['namespace']}/{unique_image_id}",
-               uid=data['metadata']['uid'],
-               user=image_ubuntu.ssh_user,
-               first_nic=image_ubuntu.first_nic)
-
-    code, data = api_client.images.delete(unique_image_id)
+def image(image_pool, image_ubuntu):
+    return image_pool.lease(image_ubuntu)
 
 
 @pytest.fixture(scope='module')
@@ -565,10 +541,10 @@ class TestInvalidUpgrade:
         pv_name = data["spec"]["volumeName"]
 
         # Make the volume becomes degraded
-        code, data = api_client.lhreplicas.get()
-        assert code == 200 and data['items'], f"Failed to get longhorn replicas ({code}): {data}"
-        replica = next(r for r in data["items"] if pv_name == r['spec']['volumeName'])
-        api_client.lhreplicas.delete(name=replica['metadata']['name'])
+        replicas = api_client.lhreplicas.iter_list()
+        replica = next((r for r in replicas if pv_name == r['spec']['volumeName']), None)
+        assert replica, f"Failed to get longhorn replica of volume {pv_name}"
+        code, data = api_client.lhreplicas.delete(name=replica['metadata']['name'])
         lhvolume_degraded = volume_checker.wait_lhvolume_degraded(pv_name)
         assert lhvolume_degraded, (code, data)
 